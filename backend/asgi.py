@@ -14,4 +14,14 @@ from decouple import config
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', config('DJANGO_SETTINGS_MODULE'))
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from users.realtime import WEBSOCKET_PATH, websocket_application
+
+async def application(scope, receive, send):
+    if scope['type'] != 'websocket':
+        return await django_application(scope, receive, send)
+    if scope['path'] != WEBSOCKET_PATH:
+        await send({"type": "websocket.close"})
+        return
+    return await websocket_application(scope, receive, send)
@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_process_init
 from celery.schedules import crontab
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', os.environ['DJANGO_SETTINGS_MODULE'])
@@ -11,7 +12,19 @@ app.autodiscover_tasks()
 
 @app.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
-    from mist_worker.tasks import reset_mistbox_opens_task, reset_prompts_task, send_daily_prompts_notification_task
+    from mist_worker.tasks import ban_impermissible_authors_task, build_trending_snapshot_task, dispatch_notifications_task, prune_mistboxes_task, renormalize_trendscores_task, requeue_pending_posts_task, reset_mistbox_opens_task, reset_prompts_task, send_daily_prompts_notification_task
     sender.add_periodic_task(crontab(hour=17, minute=0), reset_mistbox_opens_task.s())
     sender.add_periodic_task(crontab(hour=16, minute=0), send_daily_prompts_notification_task.s())
-    sender.add_periodic_task(crontab(hour=15, minute=59), reset_prompts_task.s())
\ No newline at end of file
+    sender.add_periodic_task(crontab(hour=15, minute=59), reset_prompts_task.s())
+    sender.add_periodic_task(crontab(minute=30), renormalize_trendscores_task.s())
+    sender.add_periodic_task(crontab(), build_trending_snapshot_task.s())
+    sender.add_periodic_task(crontab(minute=15), prune_mistboxes_task.s())
+    sender.add_periodic_task(crontab(minute=45), ban_impermissible_authors_task.s())
+    sender.add_periodic_task(crontab(minute='*/5'), requeue_pending_posts_task.s())
+    # seconds, so pushes go out shortly after their notifications
+    sender.add_periodic_task(5.0, dispatch_notifications_task.s())
+
+@worker_process_init.connect
+def load_moderation_classifier(**kwargs):
+    from mist.moderation import load_classifier
+    load_classifier()
@@ -45,7 +45,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
@@ -57,6 +57,11 @@ REST_FRAMEWORK = {
     },
 }
 
+# Realtime events are published in-process unless overridden
+REALTIME_PUBSUB_BACKEND = 'users.realtime.InMemoryPubSub'
+
+PUSH_NOTIFICATION_SENDER = 'users.push.APNSSender'
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -172,6 +177,9 @@ if TESTING:
         'django.contrib.auth.hashers.MD5PasswordHasher',
     ]
 
+# Posts are ingested inline while testing instead of on the celery worker
+POST_INGESTION_SYNC = TESTING
+
 # PUSH NOTIFICATIONS
 apns_file_name = os.path.join(BASE_DIR, 'auth_key.p8')
 if os.environ.get('APNS_AUTH_KEY_FILE_TEXT'):
@@ -40,8 +40,16 @@ else:
 
 EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
 
+PUSH_NOTIFICATION_SENDER = 'users.push.FakeAPNSSender'
+
 # TODO: Pictures
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media') 
 MEDIA_URL = '/media/'
 
-CELERY_BROKER_URL = os.environ.get("REDIS_URL")
\ No newline at end of file
+CELERY_BROKER_URL = os.environ.get("REDIS_URL")
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
\ No newline at end of file
@@ -39,4 +39,19 @@ DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
 AWS_S3_CUSTOM_DOMAIN = os.environ.get('AWS_S3_CUSTOM_DOMAIN')
 
 CELERY_BROKER_URL = os.environ.get("REDIS_TLS_URL") + "?ssl_cert_reqs=none"
-CELERY_RESULT_BACKEND = os.environ.get("REDIS_TLS_URL") + "?ssl_cert_reqs=none"
\ No newline at end of file
+CELERY_RESULT_BACKEND = os.environ.get("REDIS_TLS_URL") + "?ssl_cert_reqs=none"
+
+REALTIME_PUBSUB_BACKEND = 'users.realtime.RedisPubSub'
+REALTIME_REDIS_URL = os.environ.get("REDIS_TLS_URL")
+REALTIME_REDIS_OPTIONS = {'ssl_cert_reqs': None}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get("REDIS_TLS_URL"),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'CONNECTION_POOL_KWARGS': {'ssl_cert_reqs': None},
+        },
+    }
+}
\ No newline at end of file
@@ -29,7 +29,7 @@ from mist.views.feature import FeatureView
 from mist.views.post_flag import PostFlagView
 from mist.views.friend import FriendRequestView, FriendshipView
 from mist.views.match import MatchRequestView, MatchView
-from mist.views.message import ConversationView, MessageView
+from mist.views.message import ConversationView, MessageView, ThreadView
 from mist.views.post import DeleteMistboxPostView, FavoritedPostsView, FeaturedPostsView, FriendPostsView, MatchedPostsView, MistboxView, PostView, SubmittedPostsView, TaggedPostsView
 from mist.views.tag import TagView
 from mist.views.post_vote import PostVoteView
@@ -88,6 +88,7 @@ urlpatterns = [
     path('api/matches/', MatchView.as_view()),
     path('api/friendships/', FriendshipView.as_view()),
     path('api/conversations/', ConversationView.as_view()),
+    path('api/threads/', ThreadView.as_view()),
     path('api/matched-posts/', MatchedPostsView.as_view({"get": "list"})),
     path('api/featured-posts/', FeaturedPostsView.as_view({"get": "list"})),
     path('api/friend-posts/', FriendPostsView.as_view({"get": "list"})),
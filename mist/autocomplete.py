@@ -0,0 +1,107 @@
+import bisect
+import heapq
+import time
+from django.db.models import Count, Q
+
+# Word Autocomplete
+AUTOCOMPLETE_REFRESH_INTERVAL = 60
+MAX_COMPLETIONS = 5
+# candidates whose counts are rechecked against the database
+MAX_CANDIDATES = 2*MAX_COMPLETIONS
+# candidates ranked by co-occurrence with the wrapper words
+MAX_WRAPPED_CANDIDATES = 50
+MAX_MEMOIZED_PREFIXES = 10000
+
+class AutocompleteIndex:
+    """
+    Sorted prefix index over the vocabulary, ranking the
+    completions of a prefix by their occurrences.
+    """
+    def __init__(self, words):
+        # (text, occurrences, id) sorted by text
+        self.words = sorted(words)
+        self.texts = [text for text, _, _ in self.words]
+        self.completions = {}
+
+    def add(self, words):
+        for word in words:
+            position = bisect.bisect_left(self.texts, word[0])
+            if position < len(self.texts) and self.texts[position] == word[0]: continue
+            self.words.insert(position, word)
+            self.texts.insert(position, word[0])
+        self.completions = {}
+
+    def complete(self, prefix, limit):
+        if (prefix, limit) in self.completions:
+            return self.completions[(prefix, limit)]
+
+        start = bisect.bisect_left(self.texts, prefix)
+        end = len(self.texts)
+        if prefix:
+            successor = prefix[:-1] + chr(ord(prefix[-1])+1)
+            end = bisect.bisect_left(self.texts, successor, start)
+        completions = [
+            word_id for _, _, word_id in heapq.nlargest(
+                limit,
+                self.words[start:end],
+                key=lambda word: (word[1], -word[2]))
+        ]
+
+        if len(self.completions) >= MAX_MEMOIZED_PREFIXES: self.completions = {}
+        self.completions[(prefix, limit)] = completions
+        return completions
+
+_index = None
+_index_time = 0
+
+def add_to_autocomplete_index(words):
+    """
+    Adds new (text, occurrences, id) words to this process's index,
+    other processes pick them up on their next refresh.
+    """
+    if _index is not None: _index.add(words)
+
+def get_autocomplete_index():
+    """
+    Returns this process's index, rebuilt every AUTOCOMPLETE_REFRESH_INTERVAL
+    seconds to pick up new counts and other processes' new words.
+    """
+    from .models import Word
+
+    global _index, _index_time
+    is_expired = time.monotonic() - _index_time > AUTOCOMPLETE_REFRESH_INTERVAL
+    if _index is None or is_expired:
+        _index = AutocompleteIndex(Word.objects.values_list('text', 'occurrences', 'id'))
+        _index_time = time.monotonic()
+    return _index
+
+def autocomplete(search_word, wrapper_words=[]):
+    """
+    Returns the words starting with search_word that occur in the most
+    posts, or in the most posts containing every wrapper word.
+    """
+    from .models import Post, Word
+
+    prefix = search_word.lower()
+    wrapper_words = [word for word in wrapper_words if word]
+    if not wrapper_words:
+        word_ids = get_autocomplete_index().complete(prefix, MAX_CANDIDATES)
+        # the index's counts may be up to a refresh interval old
+        words = Word.objects.filter(id__in=word_ids, occurrences__gt=0)
+        return sorted(words, key=lambda word: (-word.occurrences, word.id))[:MAX_COMPLETIONS]
+
+    word_ids = get_autocomplete_index().complete(prefix, MAX_WRAPPED_CANDIDATES)
+    words = list(Word.objects.filter(id__in=word_ids))
+    if not words: return []
+    # counted like calculate_occurrences, so both match what search returns
+    wrapping_posts = Post.search(wrapper_words).\
+        filter(ingestion_key__isnull=False, flags__isnull=True)
+    cooccurrences = wrapping_posts.aggregate(**{
+        str(word.id): Count('id', distinct=True, filter=(
+            Q(title__icontains=word.text) | Q(body__icontains=word.text)))
+        for word in words
+    })
+    for word in words:
+        word.occurrences = cooccurrences[str(word.id)]
+    words = [word for word in words if word.occurrences > 0]
+    return sorted(words, key=lambda word: (-word.occurrences, word.id))[:MAX_COMPLETIONS]
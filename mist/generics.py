@@ -1,4 +1,6 @@
 import math
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 
 # Comment Content Moderation
 LOWER_COMMENT_FLAG_BOUND = 2
@@ -9,12 +11,44 @@ def is_impermissible_comment(serialized_comment):
     flagcount = serialized_comment.get('flagcount')
     return flagcount > LOWER_COMMENT_FLAG_BOUND and flagcount*flagcount > votecount
 
-def is_beyond_impermissible_comment_limit(serialized_comments):
-    impermissible_comments = 0
-    for serialized_comment in serialized_comments:
-        if is_impermissible_comment(serialized_comment):
-            impermissible_comments += 1
-    return impermissible_comments > IMPERMISSIBLE_COMMENT_LIMIT
+def annotate_comment_ratings(queryset):
+    """
+    Annotates each comment with the sums of its votes' and flags' ratings.
+    """
+    from .models import CommentFlag, CommentVote
+
+    def total_rating(model):
+        return Coalesce(Subquery(model.objects.\
+            filter(comment=OuterRef('pk')).\
+            values('comment').\
+            annotate(total=Sum('rating')).\
+            values('total')), Value(0.0))
+
+    return queryset.annotate(
+        total_votecount=total_rating(CommentVote),
+        total_flagcount=total_rating(CommentFlag),
+    )
+
+def filter_permissible_comments(queryset):
+    """
+    SQL equivalent of excluding is_impermissible_comment,
+    given comments annotated by annotate_comment_ratings.
+    """
+    return queryset.\
+        annotate(squared_flagcount=F('total_flagcount')*F('total_flagcount')).\
+        filter(
+            Q(total_flagcount__lte=LOWER_COMMENT_FLAG_BOUND) |
+            Q(squared_flagcount__lte=F('total_votecount')))
+
+def filter_impermissible_comments(queryset):
+    """
+    Complement of filter_permissible_comments.
+    """
+    return queryset.\
+        annotate(squared_flagcount=F('total_flagcount')*F('total_flagcount')).\
+        filter(
+            total_flagcount__gt=LOWER_COMMENT_FLAG_BOUND,
+            squared_flagcount__gt=F('total_votecount'))
 
 # Post Content Moderation
 LOWER_POST_FLAG_BOUND = 2
@@ -24,10 +58,3 @@ def is_impermissible_post(serialized_post):
     votecount = serialized_post.get('votecount')
     flagcount = serialized_post.get('flagcount')
     return flagcount > LOWER_POST_FLAG_BOUND and flagcount*flagcount > votecount
-
-def is_beyond_impermissible_post_limit(serialized_posts):
-    impermissible_posts = 0
-    for serialized_post in serialized_posts:
-        if is_impermissible_post(serialized_post):
-            impermissible_posts += 1
-    return impermissible_posts > IMPERMISSIBLE_POST_LIMIT
\ No newline at end of file
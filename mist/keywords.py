@@ -0,0 +1,75 @@
+from collections import deque
+import uuid
+from django.core.cache import cache
+
+# Mistbox Keyword Matching
+KEYWORDS_VERSION_KEY = 'mistbox-keywords-version'
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton that finds every keyword
+    contained in a text in a single pass over it.
+    """
+    def __init__(self, keywords):
+        self.transitions = [{}]
+        self.fallbacks = [0]
+        self.matches = [set()]
+        for keyword in keywords:
+            if not keyword: continue
+            state = 0
+            for char in keyword:
+                if char not in self.transitions[state]:
+                    self.transitions.append({})
+                    self.fallbacks.append(0)
+                    self.matches.append(set())
+                    self.transitions[state][char] = len(self.transitions)-1
+                state = self.transitions[state][char]
+            self.matches[state].add(keyword)
+
+        # breadth first, so every fallback is computed before it's needed
+        states = deque(self.transitions[0].values())
+        while states:
+            state = states.popleft()
+            for char, next_state in self.transitions[state].items():
+                states.append(next_state)
+                fallback = self.fallbacks[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fallbacks[fallback]
+                if state and char in self.transitions[fallback]:
+                    self.fallbacks[next_state] = self.transitions[fallback][char]
+                self.matches[next_state] |= self.matches[self.fallbacks[next_state]]
+
+    def match(self, texts):
+        matched_keywords = set()
+        for text in texts:
+            state = 0
+            for char in text:
+                while state and char not in self.transitions[state]:
+                    state = self.fallbacks[state]
+                state = self.transitions[state].get(char, 0)
+                matched_keywords |= self.matches[state]
+        return matched_keywords
+
+_matcher = None
+_matcher_version = None
+
+def invalidate_keyword_matcher():
+    cache.set(KEYWORDS_VERSION_KEY, str(uuid.uuid4()), None)
+
+def get_keyword_matcher():
+    """
+    Returns this process's matcher over every mistbox keyword,
+    rebuilt whenever a mistbox changed its keywords since.
+    """
+    from .models import MistboxKeyword
+
+    global _matcher, _matcher_version
+    version = cache.get(KEYWORDS_VERSION_KEY)
+    if version is None:
+        invalidate_keyword_matcher()
+        version = cache.get(KEYWORDS_VERSION_KEY)
+    if _matcher is None or _matcher_version != version:
+        keywords = MistboxKeyword.objects.values_list('keyword', flat=True).distinct()
+        _matcher = KeywordMatcher(keywords)
+        _matcher_version = version
+    return _matcher
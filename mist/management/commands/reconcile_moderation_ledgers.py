@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from mist.models import ModerationLedger
+from users.models import User
+
+class Command(BaseCommand):
+    help = "Recounts the impermissible posts and comments of every user"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(user_ids), batch_size):
+            ModerationLedger.reconcile(user_ids[start:start+batch_size])
+            self.stdout.write(f"reconciled {min(start+batch_size, len(user_ids))}/{len(user_ids)} users")
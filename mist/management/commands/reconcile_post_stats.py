@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from mist.models import Post, PostStats
+
+class Command(BaseCommand):
+    help = "Backfills and recomputes the stats of every post"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        post_ids = list(Post.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(post_ids), batch_size):
+            PostStats.reconcile(post_ids[start:start+batch_size])
+            self.stdout.write(f"reconciled {min(start+batch_size, len(post_ids))}/{len(post_ids)} posts")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from mist.models import Post, Word
+
+class Command(BaseCommand):
+    help = "Relinks every ingested post to its words and recounts the occurrences of every word"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        WordPost = Word.posts.through
+
+        posts = Post.objects.filter(ingestion_key__isnull=False).order_by('id')
+        for start in range(0, posts.count(), batch_size):
+            post_words = {post.id: set(post.get_words()) for post in posts[start:start+batch_size]}
+            word_ids = dict(Word.objects.\
+                filter(text__in=set().union(*post_words.values())).\
+                values_list('text', 'id'))
+            WordPost.objects.bulk_create([
+                WordPost(word_id=word_ids[word], post_id=post_id)
+                for post_id, words in post_words.items()
+                for word in words if word in word_ids
+            ], ignore_conflicts=True)
+        self.stdout.write(f"relinked {posts.count()} posts")
+
+        words = Word.objects.order_by('id')
+        for word in words:
+            occurrences = word.calculate_occurrences()
+            if occurrences != word.occurrences:
+                Word.objects.filter(id=word.id).update(occurrences=occurrences)
+        self.stdout.write(f"recounted {words.count()} words")
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from mist.models import Comment, Message, Post
+from mist.moderation import classify_batch
+
+class Command(BaseCommand):
+    help = "Rescans posts, comments and messages for profanity, hiding profane posts and messages"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        hidden_posts = self.rescan(
+            Post.objects.exclude(is_hidden=True),
+            ('title', 'body', 'location_description'),
+            batch_size)
+        Post.objects.filter(id__in=hidden_posts).update(is_hidden=True)
+        self.stdout.write(f"hid {len(hidden_posts)} profane posts")
+
+        hidden_messages = self.rescan(
+            Message.objects.exclude(is_hidden=True),
+            ('body',),
+            batch_size)
+        Message.hide(Message.objects.filter(id__in=hidden_messages))
+        self.stdout.write(f"hid {len(hidden_messages)} profane messages")
+
+        # comments can't be hidden, so they're only reported
+        profane_comments = self.rescan(Comment.objects.all(), ('body',), batch_size)
+        self.stdout.write(f"found {len(profane_comments)} profane comments: {profane_comments}")
+
+    def rescan(self, queryset, fields, batch_size):
+        """
+        Returns the ids of the profane objects, classifying
+        a whole batch of them in a single model call.
+        """
+        profane_ids = []
+        last_id = 0
+        while True:
+            batch = list(queryset.\
+                filter(id__gt=last_id).\
+                order_by('id').\
+                values_list('id', *fields)[:batch_size])
+            if not batch: return profane_ids
+            verdicts = classify_batch([texts for _, *texts in batch])
+            profane_ids += [
+                object_id for (object_id, *_), verdict in zip(batch, verdicts)
+                if verdict
+            ]
+            last_id = batch[-1][0]
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-18 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0077_post_is_hidden'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-creation_time', '-id'], name='post_creation_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-timestamp', '-id'], name='post_timestamp_id_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.0.10 on 2026-10-18 01:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0078_post_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostStats',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='mist.post')),
+                ('votecount', models.FloatField(default=0)),
+                ('commentcount', models.IntegerField(default=0)),
+                ('flagcount', models.FloatField(default=0)),
+                ('superuser_flagcount', models.IntegerField(default=0)),
+                ('emoji_dict', models.JSONField(default=dict)),
+            ],
+        ),
+        # later migrations read the stats, so they're filled right away
+        # with what PostStats.reconcile would compute
+        migrations.RunSQL(
+            """
+            INSERT INTO mist_poststats (post_id, votecount, commentcount, flagcount, superuser_flagcount, emoji_dict)
+            SELECT
+                mist_post.id,
+                COALESCE((
+                    SELECT SUM(rating) FROM mist_postvote
+                    WHERE mist_postvote.post_id = mist_post.id
+                ), 0),
+                (
+                    SELECT COUNT(*) FROM mist_comment
+                    WHERE mist_comment.post_id = mist_post.id
+                ),
+                COALESCE((
+                    SELECT SUM(rating) FROM mist_postflag
+                    WHERE mist_postflag.post_id = mist_post.id
+                ), 0),
+                (
+                    SELECT COUNT(*) FROM mist_postflag
+                    JOIN auth_user ON auth_user.id = mist_postflag.flagger_id
+                    WHERE mist_postflag.post_id = mist_post.id AND auth_user.is_superuser
+                ),
+                COALESCE((
+                    SELECT jsonb_object_agg(emoji, rating) FROM (
+                        SELECT emoji, SUM(rating) AS rating FROM mist_postvote
+                        WHERE mist_postvote.post_id = mist_post.id
+                        GROUP BY emoji
+                        HAVING SUM(rating) <> 0
+                    ) AS emoji_ratings
+                ), '{}'::jsonb)
+            FROM mist_post;
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
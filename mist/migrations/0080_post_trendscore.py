@@ -0,0 +1,32 @@
+# Generated by Django 4.0.10 on 2026-10-18 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0079_poststats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trendscore',
+            field=models.FloatField(default=float("-inf")),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE mist_post SET trendscore =
+                ln(mist_poststats.votecount*(mist_poststats.commentcount+1))/ln(2) +
+                mist_post.timestamp/100000
+            FROM mist_poststats
+            WHERE mist_poststats.post_id = mist_post.id AND mist_poststats.votecount > 0
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-trendscore', '-id'], name='post_trendscore_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.10 on 2026-10-18 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0080_post_trendscore'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['latitude', 'longitude'], name='post_latitude_longitude_idx'),
+        ),
+    ]
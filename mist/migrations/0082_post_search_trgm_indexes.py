@@ -0,0 +1,38 @@
+from django.db import migrations
+
+SEARCHED_FIELDS = ['title', 'body', 'location_description']
+
+# icontains compiles to UPPER("field"::text) LIKE UPPER('%word%'),
+# which trigram indexes over the same expression can answer
+create_indexes = ''.join(
+    f'CREATE INDEX IF NOT EXISTS post_{field}_trgm_idx '
+    f'ON mist_post USING gin (UPPER({field}::text) gin_trgm_ops); '
+    for field in SEARCHED_FIELDS
+)
+drop_indexes = ''.join(
+    f'DROP INDEX IF EXISTS post_{field}_trgm_idx; '
+    for field in SEARCHED_FIELDS
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0081_post_latitude_longitude_index'),
+    ]
+
+    operations = [
+        # searches still work without the extension, just unindexed
+        migrations.RunSQL(
+            f"""
+            DO $$
+            BEGIN
+                IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+                    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                    {create_indexes}
+                END IF;
+            END $$;
+            """,
+            drop_indexes,
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.0.10 on 2026-10-18 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0082_post_search_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='ingestion_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        # existing posts were already moderated, indexed and delivered
+        # by Post.save, so they must not be delivered to mistboxes again
+        migrations.RunSQL(
+            "UPDATE mist_post SET ingestion_key = ''",
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.0.10 on 2026-10-18 02:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def index_all_mistbox_keywords(apps, schema_editor):
+    Mistbox = apps.get_model("mist", "Mistbox")
+    MistboxKeyword = apps.get_model("mist", "MistboxKeyword")
+    MistboxKeyword.objects.bulk_create([
+        MistboxKeyword(mistbox_id=mistbox_id, keyword=keyword)
+        for mistbox_id, keywords in Mistbox.objects.values_list('id', 'keywords')
+        for keyword in set(keywords) if keyword
+    ], ignore_conflicts=True)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0083_post_ingestion_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MistboxKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.TextField(db_index=True)),
+                ('mistbox', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indexed_keywords', to='mist.mistbox')),
+            ],
+            options={
+                'unique_together': {('mistbox', 'keyword')},
+            },
+        ),
+        migrations.RunPython(index_all_mistbox_keywords, migrations.RunPython.noop),
+    ]
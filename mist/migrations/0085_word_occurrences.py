@@ -0,0 +1,89 @@
+# Generated by Django 4.0.10 on 2026-10-18 02:08
+
+import string
+from django.db import migrations, models
+
+
+def merge_duplicate_words(apps, schema_editor):
+    Word = apps.get_model("mist", "Word")
+    WordPost = Word.posts.through
+    kept_words = {}
+    for word in Word.objects.order_by('id'):
+        text = word.text.lower()
+        kept_word = kept_words.get(text)
+        if not kept_word:
+            kept_words[text] = word
+            if word.text != text:
+                word.text = text
+                word.save()
+            continue
+        WordPost.objects.bulk_create([
+            WordPost(word_id=kept_word.id, post_id=post_id)
+            for post_id in WordPost.objects.filter(word_id=word.id).values_list('post_id', flat=True)
+        ], ignore_conflicts=True)
+        word.delete()
+
+def link_words_to_posts(apps, schema_editor):
+    """
+    Links every ingested post to its words, like the reconcile_words
+    command, since posts ingested before word links were kept have none.
+    """
+    Post = apps.get_model("mist", "Post")
+    Word = apps.get_model("mist", "Word")
+    WordPost = Word.posts.through
+    punctuation = str.maketrans('', '', string.punctuation)
+    batch_size = 1000
+    last_id = 0
+    while True:
+        posts = list(Post.objects.\
+            filter(id__gt=last_id, ingestion_key__isnull=False).\
+            order_by('id').\
+            values_list('id', 'title', 'body', 'location_description')[:batch_size])
+        if not posts: return
+        post_words = {
+            post_id: set(
+                word.lower()
+                for text in texts if text
+                for word in text.translate(punctuation).split()
+            )
+            for post_id, *texts in posts
+        }
+        word_ids = dict(Word.objects.\
+            filter(text__in=set().union(*post_words.values())).\
+            values_list('text', 'id'))
+        WordPost.objects.bulk_create([
+            WordPost(word_id=word_ids[word], post_id=post_id)
+            for post_id, words in post_words.items()
+            for word in words if word in word_ids
+        ], ignore_conflicts=True)
+        last_id = posts[-1][0]
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0084_mistboxkeyword'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='occurrences',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(merge_duplicate_words, migrations.RunPython.noop),
+        migrations.RunPython(link_words_to_posts, migrations.RunPython.noop),
+        migrations.RunSQL(
+            """
+            UPDATE mist_word SET occurrences = (
+                SELECT COUNT(*) FROM mist_post
+                WHERE (
+                    strpos(UPPER(mist_post.title), UPPER(mist_word.text)) > 0 OR
+                    strpos(UPPER(mist_post.body), UPPER(mist_word.text)) > 0
+                ) AND mist_post.ingestion_key IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM mist_postflag WHERE mist_postflag.post_id = mist_post.id
+                )
+            )
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-18 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0085_word_occurrences'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='word',
+            name='text',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.0.10 on 2026-10-18 02:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mist', '0086_word_unique_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('matched_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'matched_user')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Friendship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friendships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'friend')},
+            },
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO mist_friendship (user_id, friend_id)
+            SELECT sent.friend_requesting_user_id, sent.friend_requested_user_id
+            FROM mist_friendrequest AS sent
+            JOIN mist_friendrequest AS received
+                ON received.friend_requesting_user_id = sent.friend_requested_user_id
+                AND received.friend_requested_user_id = sent.friend_requesting_user_id;
+            INSERT INTO mist_match (user_id, matched_user_id)
+            SELECT sent.match_requesting_user_id, sent.match_requested_user_id
+            FROM mist_matchrequest AS sent
+            JOIN mist_matchrequest AS received
+                ON received.match_requesting_user_id = sent.match_requested_user_id
+                AND received.match_requested_user_id = sent.match_requesting_user_id;
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.0.10 on 2026-10-18 02:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from mist.generics import LOWER_COMMENT_FLAG_BOUND, LOWER_POST_FLAG_BOUND
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0056_user_collectibles'),
+        ('mist', '0087_friendship_match'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationLedger',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='moderation_ledger', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('impermissible_posts', models.IntegerField(default=0)),
+                ('impermissible_comments', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(
+            f"""
+            WITH impermissible_posts AS (
+                SELECT post.author_id, COUNT(*) AS total
+                FROM mist_post AS post
+                JOIN mist_poststats AS stats ON stats.post_id = post.id
+                WHERE stats.flagcount > {LOWER_POST_FLAG_BOUND}
+                    AND stats.flagcount * stats.flagcount > stats.votecount
+                GROUP BY post.author_id
+            ), comment_ratings AS (
+                SELECT comment.author_id,
+                    COALESCE((SELECT SUM(rating) FROM mist_commentvote WHERE comment_id = comment.id), 0) AS votecount,
+                    COALESCE((SELECT SUM(rating) FROM mist_commentflag WHERE comment_id = comment.id), 0) AS flagcount
+                FROM mist_comment AS comment
+            ), impermissible_comments AS (
+                SELECT author_id, COUNT(*) AS total
+                FROM comment_ratings
+                WHERE flagcount > {LOWER_COMMENT_FLAG_BOUND}
+                    AND flagcount * flagcount > votecount
+                GROUP BY author_id
+            )
+            INSERT INTO mist_moderationledger (user_id, impermissible_posts, impermissible_comments)
+            SELECT COALESCE(posts.author_id, comments.author_id), COALESCE(posts.total, 0), COALESCE(comments.total, 0)
+            FROM impermissible_posts AS posts
+            FULL OUTER JOIN impermissible_comments AS comments ON comments.author_id = posts.author_id;
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
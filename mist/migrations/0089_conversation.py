@@ -0,0 +1,47 @@
+# Generated by Django 4.0.10 on 2026-10-18 02:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mist', '0088_moderationledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_timestamp', models.FloatField(default=0)),
+                ('unread_count', models.IntegerField(default=0)),
+                ('read_timestamp', models.FloatField(default=0)),
+                ('counterpart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('last_message', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mist.message')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'counterpart')},
+            },
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO mist_conversation (user_id, counterpart_id, last_message_id, last_timestamp, unread_count, read_timestamp)
+            SELECT DISTINCT ON (user_id, counterpart_id)
+                user_id, counterpart_id, id, timestamp, 0, timestamp
+            FROM (
+                SELECT sender_id AS user_id, receiver_id AS counterpart_id, id, timestamp
+                FROM mist_message WHERE NOT is_hidden
+                UNION ALL
+                SELECT receiver_id AS user_id, sender_id AS counterpart_id, id, timestamp
+                FROM mist_message WHERE NOT is_hidden
+            ) AS messages
+            ORDER BY user_id, counterpart_id, timestamp DESC, id DESC;
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.0.10 on 2026-10-18 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0089_conversation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='is_moderated',
+            field=models.BooleanField(default=False),
+        ),
+        # posts ingested before the field existed were moderated then
+        migrations.RunSQL(
+            "UPDATE mist_post SET is_moderated = ingestion_key IS NOT NULL",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_moderated', False)), fields=['id'], name='post_pending_moderation_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.10 on 2026-10-18 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0090_post_is_moderated'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='poststats',
+            index=models.Index(fields=['-votecount', '-post'], name='poststats_votecount_post_idx'),
+        ),
+    ]
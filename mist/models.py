@@ -1,9 +1,17 @@
 from datetime import datetime
 from decimal import Decimal
+import hashlib
+import logging
+import math
 from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
 from django.contrib.postgres.fields import ArrayField
-from django.db import models
-from django.db.models import Q, Count
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection, models, transaction
+from django.db.models import Q, Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Ln
+from django.db.models.lookups import GreaterThan
 from django.forms import ValidationError
 from phonenumber_field.modelfields import PhoneNumberField
 import uuid
@@ -11,25 +19,38 @@ import string
 from users.generics import get_empty_keywords
 
 from users.models import User
+from users.realtime import RealtimeEventTypes, publish_event
+from .autocomplete import add_to_autocomplete_index
+from .generics import IMPERMISSIBLE_COMMENT_LIMIT, IMPERMISSIBLE_POST_LIMIT, LOWER_POST_FLAG_BOUND, annotate_comment_ratings, filter_impermissible_comments, is_impermissible_comment, is_impermissible_post
+from .keywords import get_keyword_matcher, invalidate_keyword_matcher
+from .moderation import classify_batch
+
+logger = logging.getLogger(__name__)
 
 def get_current_time():
     return datetime.now().timestamp()
 
+_has_trigram_extension = None
+
+def has_trigram_extension():
+    """
+    Whether pg_trgm is installed, which
+    0082_post_search_trgm_indexes skips where it is unavailable.
+    """
+    global _has_trigram_extension
+    if _has_trigram_extension is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _has_trigram_extension = cursor.fetchone()[0]
+    return _has_trigram_extension
+
 # Post Interactions
 class Post(models.Model):
     USC_LATITUDE = Decimal(34.0224)
     USC_LONGITUDE = Decimal(118.2851)
 
     NUMBER_OF_TOTAL_COLLECTIBLES = 30
-
-    BAD_WORDS = [
-        'fuck', 
-        'fuk', 
-        'dick', 
-        'sex',
-        'bitch',
-        'queef',
-    ]
+    TRENDING_NORM_CONSTANT = 100000
 
     uuid = models.CharField(max_length=36, default=uuid.uuid4, unique=True)
     title = models.CharField(max_length=40)
@@ -43,6 +64,24 @@ class Post(models.Model):
     collectible_type = models.PositiveIntegerField(null=True, blank=True)
     is_matched = models.BooleanField(default=False)
     is_hidden = models.BooleanField(default=False)
+    trendscore = models.FloatField(default=float('-inf'))
+    # hash of the content ingest_post last processed
+    ingestion_key = models.CharField(max_length=64, null=True, blank=True)
+    # whether ingest_post has moderated the current content,
+    # posts are left out of feeds until it has
+    is_moderated = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # keyset pagination seeks
+            models.Index(fields=['-creation_time', '-id'], name='post_creation_time_id_idx'),
+            models.Index(fields=['-timestamp', '-id'], name='post_timestamp_id_idx'),
+            models.Index(fields=['-trendscore', '-id'], name='post_trendscore_id_idx'),
+            # nearby bounding box prefilter
+            models.Index(fields=['latitude', 'longitude'], name='post_latitude_longitude_idx'),
+            # pending posts swept by requeue_pending_posts
+            models.Index(fields=['id'], condition=Q(is_moderated=False), name='post_pending_moderation_idx'),
+        ]
 
     def _str_(self):
         return self.title
@@ -59,96 +98,466 @@ class Post(models.Model):
         if flags.filter(flagger__in=superusers):
             return float('inf')
         return flags.count()
+
+    def trendscore_expression():
+        """
+        log2(votecount*(commentcount+1)) + timestamp/TRENDING_NORM_CONSTANT,
+        i.e. the log of the trending score without its -now/TRENDING_NORM_CONSTANT
+        term, which is the same for every post. Scores therefore never have
+        to decay in place. Posts without a positive votecount sink to the bottom.
+        """
+        stats = PostStats.objects.filter(post_id=OuterRef('pk'))
+        votecount = Subquery(stats.values('votecount'))
+        commentcount = Subquery(stats.values('commentcount'))
+        return Case(
+            When(
+                GreaterThan(votecount, 0),
+                then=(
+                    Ln(votecount*(commentcount+Value(1.0)))/Value(math.log(2)) +
+                    F('timestamp')/Value(float(Post.TRENDING_NORM_CONSTANT))
+                ),
+            ),
+            default=Value(float('-inf')),
+            output_field=FloatField(),
+        )
+
+    def update_trendscores(posts):
+        posts.update(trendscore=Post.trendscore_expression())
+
+    def search(words, posts=None):
+        """
+        Posts whose title or body contains every word, ignoring case.
+        These lookups are answered by the trigram indexes on the post.
+        """
+        if posts is None: posts = Post.objects.all()
+        query = Q()
+        for word in words:
+            if word: query &= (Q(title__icontains=word) | Q(body__icontains=word))
+        return posts.filter(query)
+
+    def rank_search(posts, words):
+        """
+        Annotates search_similarity, the summed trigram similarity of
+        the words to each post's title and body, or 0 without pg_trgm.
+        """
+        words = [word for word in words if word]
+        if not words or not has_trigram_extension():
+            return posts.annotate(search_similarity=Value(0.0))
+        similarities = [
+            TrigramSimilarity(field, word)
+            for word in words
+            for field in ('title', 'body')
+        ]
+        return posts.annotate(search_similarity=sum(similarities[1:], similarities[0]))
+    
+    def get_ingestion_key(self):
+        content = '\0'.join([
+            self.title or '', 
+            self.body or '', 
+            self.location_description or '',
+        ])
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get_moderated_texts(self):
+        return [self.title, self.body, self.location_description]
+
+    def is_profane(self):
+        return classify_batch([self.get_moderated_texts()])[0]
+
+    def get_words(self):
+        texts = [self.body, self.title, self.location_description]
+        return [
+            word.lower()
+            for text in texts if text
+            for word in text.translate(
+                str.maketrans('', '', string.punctuation)
+                ).split()
+        ]
+
+    def update_collectibles(author_ids):
+        """
+        Recomputes the sorted collectibles of the given authors.
+        """
+        collectibles = Post.objects.\
+            filter(author=OuterRef('pk'), collectible_type__isnull=False).\
+            values('author').\
+            annotate(collectibles=ArrayAgg('collectible_type', ordering='collectible_type')).\
+            values('collectibles')
+        User.objects.filter(id__in=author_ids).update(collectibles=Coalesce(
+            Subquery(collectibles),
+            Value([]),
+            output_field=ArrayField(models.PositiveIntegerField()),
+        ))
+
+    def is_counted_in_occurrences(post_id):
+        return Post.objects.\
+            filter(id=post_id, ingestion_key__isnull=False).\
+            exclude(flags__isnull=False).\
+            exists()
+
+    def index_words(self, words):
+        words = set(word for word in words if len(word) <= Word.MAX_INDEXED_LENGTH)
+        existing_words = set(Word.objects.\
+            filter(text__in=words).\
+            values_list('text', flat=True))
+
+        Word.objects.bulk_create([
+            Word(text=word) for word in words - existing_words
+        ], ignore_conflicts=True)
+        word_ids = dict(Word.objects.\
+            filter(text__in=words).\
+            values_list('text', 'id'))
+        # new words are counted in the already ingested posts,
+        # then every word in this post is counted once more
+        new_words = []
+        for word in words - existing_words:
+            new_word = Word(id=word_ids[word], text=word)
+            new_word.occurrences = new_word.calculate_occurrences()
+            Word.objects.\
+                filter(id=new_word.id).\
+                update(occurrences=new_word.occurrences)
+            new_words.append((new_word.text, new_word.occurrences, new_word.id))
+        add_to_autocomplete_index(new_words)
+        if not self.flags.exists():
+            Word.adjust_occurrences([self.title, self.body], 1)
+
+        WordPost = Word.posts.through
+        WordPost.objects.bulk_create([
+            WordPost(word_id=word_id, post_id=self.id)
+            for word_id in word_ids.values()
+        ], ignore_conflicts=True)
+
+    def deliver_to_mistboxes(self, words):
+        matched_keywords = get_keyword_matcher().match(words)
+        if not matched_keywords: return
+        mistbox_ids = MistboxKeyword.objects.\
+            filter(keyword__in=matched_keywords).\
+            exclude(mistbox__user_id=self.author_id).\
+            values_list('mistbox_id', flat=True).\
+            distinct()
+        MistboxPost = Mistbox.posts.through
+        MistboxPost.objects.bulk_create([
+            MistboxPost(mistbox_id=mistbox_id, post_id=self.id)
+            for mistbox_id in mistbox_ids
+        ], ignore_conflicts=True)
+
+    def start_ingestion_task(self):
+        if settings.POST_INGESTION_SYNC:
+            from mist_worker.tasks import ingest_post
+            ingest_post(self.id)
+            self.refresh_from_db(fields=['is_hidden', 'ingestion_key', 'is_moderated'])
+            return
+        from backend import celery_app
+        def send_ingestion_task():
+            # requeue_pending_posts picks up posts whose task was never sent
+            try:
+                celery_app.send_task(name="ingest_post_task", args=[self.id])
+            except Exception:
+                logger.exception(f"failed to start the ingestion of post {self.id}")
+        transaction.on_commit(send_ingestion_task)
     
     def save(self, *args, **kwargs):
-        from profanity_check import predict
-        
         # check if the post is new
-        is_new = (len(Post.objects.filter(id=self.id)) == 0)
-
-        # ai profanity check
-        if self.body and predict([self.body]):
-            self.is_hidden = True
-        if self.title and predict([self.title]):
-            self.is_hidden = True
-        if self.location_description and predict([self.location_description]):
-            self.is_hidden = True
-        
-        # manual profanity check
-        for word in self.BAD_WORDS:
-            if self.body and word in self.body.lower():
-                self.is_hidden = True
-                break
-            if self.title and word in self.title.lower():
-                self.is_hidden = True
-                break
-            if self.location_description and word in self.location_description.lower():
-                self.is_hidden = True
-                break
+        previous_post = Post.objects.filter(id=self.id).first()
+        is_new = previous_post is None
         
+        # words in the edited text replace those in the previous one
+        is_edited = not is_new and (
+            (previous_post.title, previous_post.body) != (self.title, self.body))
+        if is_edited and Post.is_counted_in_occurrences(self.id):
+            Word.start_occurrence_adjustment([previous_post.title, previous_post.body], -1)
+            Word.start_occurrence_adjustment([self.title, self.body], 1)
+
+        # edited posts are left out of feeds until they are moderated again
+        self.is_moderated = self.ingestion_key == self.get_ingestion_key()
+
         # save original post
         super(Post, self).save(*args, **kwargs)
-        # generate word
+        # collectibles are denormalized onto their authors
+        previous_collectible = (previous_post.author_id, previous_post.collectible_type) \
+            if previous_post else (self.author_id, None)
+        if previous_collectible != (self.author_id, self.collectible_type):
+            Post.update_collectibles([previous_collectible[0], self.author_id])
+            if Post.author.is_cached(self):
+                self.author.refresh_from_db(fields=['collectibles'])
+        # the saved trendscore may be stale or the timestamp may have changed
+        if not is_new:
+            Post.update_trendscores(Post.objects.filter(id=self.id))
         if is_new:
-            # gather all words in the post
-            words_in_text = []
-            words_in_title = []
-            words_in_loc = []
-
-            if self.body:
-                words_in_text = self.body.translate(
-                    str.maketrans('', '', string.punctuation)
-                    ).split()
-            if self.title:
-                words_in_title = self.title.translate(
-                    str.maketrans('', '', string.punctuation)
-                    ).split()
-            if self.location_description:
-                words_in_loc = self.location_description.translate(
-                    str.maketrans('', '', string.punctuation)
-                    ).split()
-            
-            words_in_post = words_in_text + words_in_title + words_in_loc
-            mistboxes = Mistbox.objects.all().\
-                exclude(user=self.author).\
-                select_related('user').\
-                prefetch_related('posts')
-            # sent_user_ids = []
-            # for each word ...            
-            for word in words_in_post:
-                lowercased_word = word.lower()
-                # ... if it doesn't exist create one
-                matching_word = Word.objects.filter(text__iexact=lowercased_word).first()
-                if not matching_word:
-                    matching_word = Word.objects.create(text=lowercased_word)
-                
-                for mistbox in mistboxes:
-                    for keyword in mistbox.keywords:
-                        if keyword in lowercased_word:
-                            mistbox.posts.add(self)
-                            mistbox.save()
-                            # if mistbox.user.id not in sent_user_ids:
-                            #     UserNotification.objects.create(
-                            #         user_id=mistbox.user.id,
-                            #         type=UserNotification.NotificationTypes.DAILY_MISTBOX,
-                            #         message="you got a new mist in your mistbox 💌",
-                            #     )
-                            #     sent_user_ids.append(mistbox.user.id)
+            PostStats.objects.create(post_id=self.id)
+        # moderation, words and mistboxes are handled by ingest_post
+        if self.ingestion_key != self.get_ingestion_key():
+            self.start_ingestion_task()
+
+    def delete(self, *args, **kwargs):
+        if Post.is_counted_in_occurrences(self.id):
+            Word.start_occurrence_adjustment([self.title, self.body], -1)
+        ModerationLedger.untrack_post(self.id)
+        deleted = super(Post, self).delete(*args, **kwargs)
+        if self.collectible_type is not None:
+            Post.update_collectibles([self.author_id])
+        return deleted
 
 class Word(models.Model):
-    text = models.CharField(max_length=100)
+    MAX_LENGTH = 100
+    # longer tokens aren't indexed, which bounds the substrings of a text
+    MAX_INDEXED_LENGTH = 30
+    SUBSTRING_BATCH_SIZE = 1000
+
+    text = models.CharField(max_length=MAX_LENGTH, unique=True)
     posts = models.ManyToManyField(Post)
+    # unflagged posts whose title or body contains the text,
+    # adjusted as posts are ingested, edited, flagged and deleted
+    occurrences = models.IntegerField(default=0)
     
     def calculate_occurrences(self, wrapper_words=[]):
-        query = (Q(title__icontains=self.text) | Q(body__icontains=self.text))
-        for wrapper_word in wrapper_words:
-            query &= (Q(title__icontains=wrapper_word) | Q(body__icontains=wrapper_word))
-        postset = Post.objects.filter(query).distinct()
+        # posts are only counted once ingested, like is_counted_in_occurrences
+        postset = Post.search([self.text] + wrapper_words).\
+            filter(ingestion_key__isnull=False).\
+            distinct()
         return postset\
             .annotate(flagcount=Count('flags'))\
             .exclude(flagcount__gt=0, flagcount__isnull=False)\
             .count()
 
+    def get_substrings(texts):
+        # words never contain whitespace, so only
+        # substrings of whitespace-free chunks can be words
+        substrings = set()
+        for text in texts:
+            if not text: continue
+            for chunk in text.lower().split():
+                for start in range(len(chunk)):
+                    end = min(len(chunk), start+Word.MAX_INDEXED_LENGTH)
+                    for stop in range(start+1, end+1):
+                        substrings.add(chunk[start:stop])
+        return list(substrings)
+
+    def adjust_occurrences(texts, change):
+        """
+        Adjusts the occurrences of every word contained in the texts.
+        """
+        substrings = Word.get_substrings(texts)
+        for start in range(0, len(substrings), Word.SUBSTRING_BATCH_SIZE):
+            Word.objects.\
+                filter(text__in=substrings[start:start+Word.SUBSTRING_BATCH_SIZE]).\
+                update(occurrences=F('occurrences')+change)
+
+    def start_occurrence_adjustment(texts, change):
+        """
+        Adjusts the occurrences on the celery worker once the
+        current transaction commits, since long texts have many substrings.
+        """
+        if settings.POST_INGESTION_SYNC:
+            Word.adjust_occurrences(texts, change)
+            return
+        from backend import celery_app
+        def send_adjustment_task():
+            # reconcile_words repairs the counts of lost adjustments
+            try:
+                celery_app.send_task(name="adjust_word_occurrences_task", args=[texts, change])
+            except Exception:
+                logger.exception("failed to start a word occurrence adjustment")
+        transaction.on_commit(send_adjustment_task)
+
+class PostStats(models.Model):
+    """
+    Aggregates of a post's votes, flags and comments, adjusted whenever
+    one of them is saved or deleted. Rows deleted in bulk (e.g. cascades
+    from a deleted user) are fixed by the reconcile_post_stats command.
+    """
+    post = models.OneToOneField(Post, primary_key=True, related_name='stats', on_delete=models.CASCADE)
+    votecount = models.FloatField(default=0)
+    commentcount = models.IntegerField(default=0)
+    flagcount = models.FloatField(default=0)
+    superuser_flagcount = models.IntegerField(default=0)
+    emoji_dict = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [
+            # keyset pagination seeks of posts in BEST order
+            models.Index(fields=['-votecount', '-post'], name='poststats_votecount_post_idx'),
+        ]
+
+    def adjust_emoji_dict(emoji, rating):
+        # emojis are dropped once their rating goes back to zero
+        adjusted_rating = "COALESCE((emoji_dict->>%s)::float8, 0) + %s"
+        return RawSQL(
+            f"CASE WHEN {adjusted_rating} = 0 THEN emoji_dict - %s "
+            f"ELSE jsonb_set(emoji_dict, ARRAY[%s::text], to_jsonb({adjusted_rating})) END",
+            (emoji, rating, emoji, emoji, emoji, rating),
+            output_field=models.JSONField(),
+        )
+
+    def adjust(post_id, votecount=0, commentcount=0, flagcount=0, superuser_flagcount=0, emoji=None):
+        updates = {
+            'votecount': models.F('votecount') + votecount,
+            'commentcount': models.F('commentcount') + commentcount,
+            'flagcount': models.F('flagcount') + flagcount,
+            'superuser_flagcount': models.F('superuser_flagcount') + superuser_flagcount,
+        }
+        if emoji:
+            updates['emoji_dict'] = PostStats.adjust_emoji_dict(emoji, votecount)
+        updated_rows = PostStats.objects.filter(post_id=post_id).update(**updates)
+        if not updated_rows:
+            PostStats.reconcile([post_id])
+        elif votecount or commentcount:
+            Post.update_trendscores(Post.objects.filter(id=post_id))
+        if updated_rows and (votecount or flagcount):
+            ModerationLedger.track_post(post_id, votecount, flagcount)
+
+    def calculate(post_ids):
+        """
+        Computes the stats of the given posts from scratch without saving
+        them, keyed by post id.
+        """
+        post_ids = list(Post.objects.filter(id__in=post_ids).values_list('id', flat=True))
+        votecounts = dict(PostVote.objects.\
+            filter(post_id__in=post_ids).\
+            values('post').\
+            annotate(total=Sum('rating')).\
+            values_list('post', 'total'))
+        commentcounts = dict(Comment.objects.\
+            filter(post_id__in=post_ids).\
+            values('post').\
+            annotate(total=Count('id')).\
+            values_list('post', 'total'))
+        flagcounts = dict(PostFlag.objects.\
+            filter(post_id__in=post_ids).\
+            values('post').\
+            annotate(total=Sum('rating')).\
+            values_list('post', 'total'))
+        superuser_flagcounts = dict(PostFlag.objects.\
+            filter(post_id__in=post_ids, flagger__is_superuser=True).\
+            values('post').\
+            annotate(total=Count('id')).\
+            values_list('post', 'total'))
+        emoji_dicts = {post_id: {} for post_id in post_ids}
+        emoji_ratings = PostVote.objects.\
+            filter(post_id__in=post_ids).\
+            values('post', 'emoji').\
+            annotate(total=Sum('rating')).\
+            values_list('post', 'emoji', 'total')
+        for post_id, emoji, rating in emoji_ratings:
+            if rating: emoji_dicts[post_id][emoji] = rating
+
+        return {
+            post_id: PostStats(
+                post_id=post_id,
+                votecount=votecounts.get(post_id, 0),
+                commentcount=commentcounts.get(post_id, 0),
+                flagcount=flagcounts.get(post_id, 0),
+                superuser_flagcount=superuser_flagcounts.get(post_id, 0),
+                emoji_dict=emoji_dicts[post_id],
+            )
+            for post_id in post_ids
+        }
+
+    def reconcile(post_ids):
+        """
+        Recomputes and saves the stats of the given posts from scratch.
+        """
+        stats = PostStats.calculate(post_ids)
+        with transaction.atomic():
+            PostStats.objects.filter(post_id__in=stats.keys()).delete()
+            PostStats.objects.bulk_create(stats.values())
+            Post.update_trendscores(Post.objects.filter(id__in=stats.keys()))
+
+class ModerationLedger(models.Model):
+    """
+    Number of each author's posts and comments that are currently
+    impermissible, adjusted whenever a vote, flag or deletion moves one
+    across the threshold. Rows drifted by bulk deletes are fixed by the
+    reconcile_moderation_ledgers command.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, primary_key=True, related_name='moderation_ledger', on_delete=models.CASCADE)
+    impermissible_posts = models.IntegerField(default=0)
+    impermissible_comments = models.IntegerField(default=0)
+
+    def adjust(user_id, impermissible_posts=0, impermissible_comments=0):
+        ModerationLedger.objects.bulk_create([
+            ModerationLedger(user_id=user_id)
+        ], ignore_conflicts=True)
+        ModerationLedger.objects.filter(user_id=user_id).update(
+            impermissible_posts=F('impermissible_posts') + impermissible_posts,
+            impermissible_comments=F('impermissible_comments') + impermissible_comments,
+        )
+
+    def get_post_status(post_id, votecount_change=0, flagcount_change=0):
+        """
+        Returns the post's author and whether the post is impermissible
+        now and was before its stats changed by the given amounts.
+        """
+        stats = PostStats.objects.\
+            filter(post_id=post_id).\
+            values('votecount', 'flagcount', 'post__author_id').\
+            first()
+        if not stats: return None, False, False
+        is_impermissible = is_impermissible_post(stats)
+        was_impermissible = is_impermissible_post({
+            'votecount': stats['votecount'] - votecount_change,
+            'flagcount': stats['flagcount'] - flagcount_change,
+        })
+        return stats['post__author_id'], is_impermissible, was_impermissible
+
+    def track_post(post_id, votecount_change, flagcount_change):
+        author_id, is_impermissible, was_impermissible = ModerationLedger.get_post_status(
+            post_id, votecount_change, flagcount_change)
+        if is_impermissible != was_impermissible:
+            ModerationLedger.adjust(author_id, impermissible_posts=1 if is_impermissible else -1)
+
+    def untrack_post(post_id):
+        author_id, is_impermissible, _ = ModerationLedger.get_post_status(post_id)
+        if is_impermissible: ModerationLedger.adjust(author_id, impermissible_posts=-1)
+
+    def track_comment(comment_id, was_impermissible):
+        if Comment.is_impermissible(comment_id) == was_impermissible: return
+        author_id = Comment.objects.filter(id=comment_id).values_list('author_id', flat=True).first()
+        if author_id:
+            ModerationLedger.adjust(author_id, impermissible_comments=-1 if was_impermissible else 1)
+
+    def is_beyond_impermissible_post_limit(user_id):
+        return ModerationLedger.objects.filter(
+            user_id=user_id, 
+            impermissible_posts__gt=IMPERMISSIBLE_POST_LIMIT,
+        ).exists()
+
+    def is_beyond_impermissible_comment_limit(user_id):
+        return ModerationLedger.objects.filter(
+            user_id=user_id, 
+            impermissible_comments__gt=IMPERMISSIBLE_COMMENT_LIMIT,
+        ).exists()
+
+    def reconcile(user_ids):
+        """
+        Recounts the impermissible posts and comments of the given users.
+        """
+        user_ids = list(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        impermissible_posts = dict(PostStats.objects.\
+            filter(post__author_id__in=user_ids, flagcount__gt=LOWER_POST_FLAG_BOUND).\
+            annotate(squared_flagcount=F('flagcount')*F('flagcount')).\
+            filter(squared_flagcount__gt=F('votecount')).\
+            values('post__author').\
+            annotate(total=Count('post')).\
+            values_list('post__author', 'total'))
+        impermissible_comments = dict(filter_impermissible_comments(
+            annotate_comment_ratings(Comment.objects.filter(author_id__in=user_ids))).\
+            values('author').\
+            annotate(total=Count('id')).\
+            values_list('author', 'total'))
+
+        with transaction.atomic():
+            ModerationLedger.objects.filter(user_id__in=user_ids).delete()
+            ModerationLedger.objects.bulk_create([
+                ModerationLedger(
+                    user_id=user_id,
+                    impermissible_posts=impermissible_posts.get(user_id, 0),
+                    impermissible_comments=impermissible_comments.get(user_id, 0),
+                )
+                for user_id in user_ids
+                if user_id in impermissible_posts or user_id in impermissible_comments
+            ])
+
 class PostVote(models.Model):
     DEFAULT_RATING = 1
     DEFAULT_EMOJI = "❤️"
@@ -165,6 +574,26 @@ class PostVote(models.Model):
     def _str_(self):
         return self.voter.pk
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous_vote = None
+            if self.pk: previous_vote = PostVote.objects.filter(pk=self.pk).first()
+            super().save(*args, **kwargs)
+            if previous_vote: previous_vote.remove_from_stats()
+            self.add_to_stats()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            self.remove_from_stats()
+        return deleted
+
+    def add_to_stats(self):
+        PostStats.adjust(self.post_id, votecount=self.rating, emoji=self.emoji)
+
+    def remove_from_stats(self):
+        PostStats.adjust(self.post_id, votecount=-self.rating, emoji=self.emoji)
+
 class PostFlag(models.Model):
     DEFAULT_RATING = 1
     VERY_LARGE_RATING = 1000
@@ -183,7 +612,38 @@ class PostFlag(models.Model):
     def save(self, *args, **kwargs):
         if self.flagger.is_superuser: 
             self.rating = self.VERY_LARGE_RATING
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous_flag = None
+            if self.pk: previous_flag = PostFlag.objects.filter(pk=self.pk).first()
+            # the post stops counting towards word occurrences
+            is_first_flag = not previous_flag and Post.is_counted_in_occurrences(self.post_id)
+            super().save(*args, **kwargs)
+            if previous_flag: previous_flag.remove_from_stats()
+            self.add_to_stats()
+            if is_first_flag: self.adjust_word_occurrences(-1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            self.remove_from_stats()
+            if Post.is_counted_in_occurrences(self.post_id): self.adjust_word_occurrences(1)
+        return deleted
+
+    def adjust_word_occurrences(self, change):
+        post = Post.objects.get(id=self.post_id)
+        Word.start_occurrence_adjustment([post.title, post.body], change)
+
+    def add_to_stats(self):
+        PostStats.adjust(
+            self.post_id, 
+            flagcount=self.rating, 
+            superuser_flagcount=int(self.flagger.is_superuser))
+
+    def remove_from_stats(self):
+        PostStats.adjust(
+            self.post_id, 
+            flagcount=-self.rating, 
+            superuser_flagcount=-int(self.flagger.is_superuser))
 
 class Comment(models.Model):
     uuid = models.CharField(max_length=36, default=uuid.uuid4, unique=True)
@@ -194,6 +654,33 @@ class Comment(models.Model):
 
     def _str_(self):
         return self.text
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous_post_id = None
+            if self.pk: previous_post_id = Comment.objects.filter(pk=self.pk).values_list('post_id', flat=True).first()
+            super().save(*args, **kwargs)
+            if previous_post_id != self.post_id:
+                if previous_post_id: PostStats.adjust(previous_post_id, commentcount=-1)
+                PostStats.adjust(self.post_id, commentcount=1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if Comment.is_impermissible(self.id):
+                ModerationLedger.adjust(self.author_id, impermissible_comments=-1)
+            deleted = super().delete(*args, **kwargs)
+            PostStats.adjust(self.post_id, commentcount=-1)
+        return deleted
+
+    def is_impermissible(comment_id):
+        ratings = annotate_comment_ratings(Comment.objects.filter(id=comment_id)).\
+            values('total_votecount', 'total_flagcount').\
+            first()
+        if not ratings: return False
+        return is_impermissible_comment({
+            'votecount': ratings['total_votecount'],
+            'flagcount': ratings['total_flagcount'],
+        })
     
     def calculate_votecount(self):
         return CommentVote.objects.filter(comment_id=self.pk).count()
@@ -255,6 +742,19 @@ class CommentVote(models.Model):
     def _str_(self):
         return self.voter.pk
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            was_impermissible = Comment.is_impermissible(self.comment_id)
+            super().save(*args, **kwargs)
+            ModerationLedger.track_comment(self.comment_id, was_impermissible)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            was_impermissible = Comment.is_impermissible(self.comment_id)
+            deleted = super().delete(*args, **kwargs)
+            ModerationLedger.track_comment(self.comment_id, was_impermissible)
+        return deleted
+
 class CommentFlag(models.Model):
     DEFAULT_RATING = 1
     VERY_LARGE_RATING = 1000
@@ -273,7 +773,17 @@ class CommentFlag(models.Model):
     def save(self, *args, **kwargs):
         if self.flagger.is_superuser:
             self.rating = self.VERY_LARGE_RATING
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            was_impermissible = Comment.is_impermissible(self.comment_id)
+            super().save(*args, **kwargs)
+            ModerationLedger.track_comment(self.comment_id, was_impermissible)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            was_impermissible = Comment.is_impermissible(self.comment_id)
+            deleted = super().delete(*args, **kwargs)
+            ModerationLedger.track_comment(self.comment_id, was_impermissible)
+        return deleted
 
 class Favorite(models.Model):
     timestamp = models.FloatField(default=get_current_time)
@@ -304,6 +814,42 @@ class FriendRequest(models.Model):
     class Meta:
         unique_together = ('friend_requesting_user', 'friend_requested_user',)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        is_mutual = FriendRequest.objects.filter(
+            friend_requesting_user_id=self.friend_requested_user_id,
+            friend_requested_user_id=self.friend_requesting_user_id,
+        ).exists()
+        if is_mutual:
+            Friendship.objects.bulk_create([
+                Friendship(user_id=self.friend_requesting_user_id, friend_id=self.friend_requested_user_id),
+                Friendship(user_id=self.friend_requested_user_id, friend_id=self.friend_requesting_user_id),
+            ], ignore_conflicts=True)
+
+    def delete(self, *args, **kwargs):
+        Friendship.objects.filter(
+            Q(user_id=self.friend_requesting_user_id, friend_id=self.friend_requested_user_id) |
+            Q(user_id=self.friend_requested_user_id, friend_id=self.friend_requesting_user_id)
+        ).delete()
+        return super().delete(*args, **kwargs)
+
+class Friendship(models.Model):
+    """
+    Both directions of every pair of mutual friend requests,
+    kept by FriendRequest.save and FriendRequest.delete.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='friendships', on_delete=models.CASCADE)
+    friend = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('user', 'friend',)
+
+    def are_friends(user_id, other_user_id):
+        return Friendship.objects.filter(user_id=user_id, friend_id=other_user_id).exists()
+
+    def get_friend_ids(user_id):
+        return Friendship.objects.filter(user_id=user_id).values('friend_id')
+
 class MatchRequest(models.Model):
     match_requesting_user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='match_requesting_user', on_delete=models.CASCADE)
     match_requested_user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='match_requested_user', on_delete=models.CASCADE)
@@ -314,7 +860,15 @@ class MatchRequest(models.Model):
         unique_together = ('match_requesting_user', 'match_requested_user')
     
     def save(self, *args, **kwargs):
+        from .serializers import MatchRequestSerializer
+
+        is_new = self._state.adding
         super().save(*args, **kwargs)
+        if is_new:
+            publish_event(
+                [self.match_requested_user_id],
+                RealtimeEventTypes.MATCH_REQUEST,
+                MatchRequestSerializer(self).data)
 
         oppposite_requests = MatchRequest.objects.filter(
             match_requesting_user=self.match_requested_user,
@@ -333,6 +887,34 @@ class MatchRequest(models.Model):
                 if request.post:
                     request.post.is_matched = True
                     request.post.save()
+            Match.objects.bulk_create([
+                Match(user_id=self.match_requesting_user_id, matched_user_id=self.match_requested_user_id),
+                Match(user_id=self.match_requested_user_id, matched_user_id=self.match_requesting_user_id),
+            ], ignore_conflicts=True)
+
+    def delete(self, *args, **kwargs):
+        Match.objects.filter(
+            Q(user_id=self.match_requesting_user_id, matched_user_id=self.match_requested_user_id) |
+            Q(user_id=self.match_requested_user_id, matched_user_id=self.match_requesting_user_id)
+        ).delete()
+        return super().delete(*args, **kwargs)
+
+class Match(models.Model):
+    """
+    Both directions of every pair of mutual match requests,
+    kept by MatchRequest.save and MatchRequest.delete.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='matches', on_delete=models.CASCADE)
+    matched_user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('user', 'matched_user',)
+
+    def are_matched(user_id, other_user_id):
+        return Match.objects.filter(user_id=user_id, matched_user_id=other_user_id).exists()
+
+    def get_matched_user_ids(user_id):
+        return Match.objects.filter(user_id=user_id).values('matched_user_id')
 
 
 class Message(models.Model):
@@ -346,6 +928,105 @@ class Message(models.Model):
     def _str_(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        from .serializers import MessageSerializer
+
+        is_new = self._state.adding
+        with transaction.atomic():
+            super(Message, self).save(*args, **kwargs)
+            if not is_new:
+                Conversation.refresh([(self.sender_id, self.receiver_id)])
+            elif not self.is_hidden:
+                Conversation.add_message(self)
+                publish_event(
+                    [self.sender_id, self.receiver_id],
+                    RealtimeEventTypes.MESSAGE,
+                    MessageSerializer(self).data)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            deleted = super(Message, self).delete(*args, **kwargs)
+            Conversation.refresh([(self.sender_id, self.receiver_id)])
+        return deleted
+
+    def hide(messages):
+        """
+        Hides the messages in bulk, refreshing the conversations they were in.
+        """
+        with transaction.atomic():
+            pairs = set(messages.values_list('sender_id', 'receiver_id'))
+            messages.update(is_hidden=True)
+            Conversation.refresh(pairs)
+
+class Conversation(models.Model):
+    """
+    Summary of the visible messages between a user and a counterpart,
+    kept by Message.save, Message.delete and Message.hide.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='conversations', on_delete=models.CASCADE)
+    counterpart = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    last_message = models.ForeignKey(Message, related_name='+', null=True, on_delete=models.SET_NULL)
+    last_timestamp = models.FloatField(default=0)
+    unread_count = models.IntegerField(default=0)
+    read_timestamp = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'counterpart',)
+
+    def get_messages(user_id, counterpart_id):
+        return Message.objects.\
+            filter(
+                Q(sender_id=user_id, receiver_id=counterpart_id) |
+                Q(sender_id=counterpart_id, receiver_id=user_id)).\
+            exclude(is_hidden=True)
+
+    def add_message(message):
+        Conversation.objects.bulk_create([
+            Conversation(user_id=message.sender_id, counterpart_id=message.receiver_id),
+            Conversation(user_id=message.receiver_id, counterpart_id=message.sender_id),
+        ], ignore_conflicts=True)
+        conversations = Conversation.objects.filter(
+            Q(user_id=message.sender_id, counterpart_id=message.receiver_id) |
+            Q(user_id=message.receiver_id, counterpart_id=message.sender_id))
+        conversations.\
+            filter(last_timestamp__lte=message.timestamp).\
+            update(last_message=message, last_timestamp=message.timestamp)
+        conversations.\
+            filter(user_id=message.receiver_id, read_timestamp__lt=message.timestamp).\
+            update(unread_count=F('unread_count')+1)
+
+    def refresh(pairs):
+        """
+        Recomputes the conversations between each pair of users
+        from their visible messages, e.g. after messages were hidden.
+        """
+        refreshed_pairs = set(tuple(sorted(pair)) for pair in pairs)
+        for first_user_id, second_user_id in refreshed_pairs:
+            messages = Conversation.get_messages(first_user_id, second_user_id)
+            last_message = messages.order_by('-timestamp', '-id').first()
+            if not last_message:
+                Conversation.objects.filter(
+                    Q(user_id=first_user_id, counterpart_id=second_user_id) |
+                    Q(user_id=second_user_id, counterpart_id=first_user_id)).\
+                    delete()
+                continue
+
+            for user_id, counterpart_id in ((first_user_id, second_user_id), (second_user_id, first_user_id)):
+                conversation, _ = Conversation.objects.get_or_create(
+                    user_id=user_id,
+                    counterpart_id=counterpart_id)
+                conversation.last_message = last_message
+                conversation.last_timestamp = last_message.timestamp
+                conversation.unread_count = messages.filter(
+                    sender_id=counterpart_id,
+                    timestamp__gt=conversation.read_timestamp).count()
+                conversation.save()
+
+    def mark_read(user_id, counterpart_id):
+        Conversation.objects.\
+            filter(user_id=user_id, counterpart_id=counterpart_id).\
+            update(unread_count=0, read_timestamp=F('last_timestamp'))
+
 class Mistbox(models.Model):
     NUMBER_OF_KEYWORDS = 10
     MAX_DAILY_SWIPES = 10
@@ -356,6 +1037,39 @@ class Mistbox(models.Model):
     posts = models.ManyToManyField(Post, blank=True)
     opens_used_today = models.IntegerField(default=0)
 
+    def save(self, *args, **kwargs):
+        super(Mistbox, self).save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'keywords' in update_fields:
+            MistboxKeyword.index_keywords(self)
+
+class MistboxKeyword(models.Model):
+    """
+    Inverted index from each keyword to the mistboxes subscribed to it.
+    """
+    mistbox = models.ForeignKey(Mistbox, related_name='indexed_keywords', on_delete=models.CASCADE)
+    keyword = models.TextField(db_index=True)
+
+    class Meta:
+        unique_together = ('mistbox', 'keyword',)
+
+    def index_keywords(mistbox):
+        keywords = set(keyword for keyword in mistbox.keywords if keyword)
+        indexed_keywords = set(MistboxKeyword.objects.\
+            filter(mistbox=mistbox).\
+            values_list('keyword', flat=True))
+        if keywords == indexed_keywords: return
+
+        MistboxKeyword.objects.\
+            filter(mistbox=mistbox).\
+            exclude(keyword__in=keywords).\
+            delete()
+        MistboxKeyword.objects.bulk_create([
+            MistboxKeyword(mistbox=mistbox, keyword=keyword)
+            for keyword in keywords - indexed_keywords
+        ], ignore_conflicts=True)
+        invalidate_keyword_matcher()
+
 class AccessCode(models.Model):
     code_string = models.CharField(max_length=6, unique=True)
     claimed_user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='access_code', on_delete=models.CASCADE, null=True)
@@ -0,0 +1,74 @@
+import hashlib
+from django.core.cache import cache
+
+# Profanity Moderation
+BAD_WORDS = [
+    'fuck',
+    'fuk',
+    'dick',
+    'sex',
+    'bitch',
+    'queef',
+]
+VERDICT_CACHE_TIMEOUT = 7*24*60*60
+
+_predict = None
+
+def load_classifier():
+    """
+    Loads the profanity model once per process. Celery workers call
+    this at boot, web processes the first time they classify a text.
+    """
+    global _predict
+    if _predict is None:
+        from profanity_check import predict
+        _predict = predict
+    return _predict
+
+def get_verdict_key(text):
+    return f'profanity:{hashlib.sha256(text.encode()).hexdigest()}'
+
+def contains_bad_word(text):
+    lowercased_text = text.lower()
+    for word in BAD_WORDS:
+        if word in lowercased_text: return True
+    return False
+
+def classify_texts(texts):
+    """
+    Returns whether each text is profane. Texts without a cached
+    verdict are classified together in a single model call.
+    """
+    verdict_keys = {text: get_verdict_key(text) for text in texts if text}
+    verdicts = cache.get_many(verdict_keys.values())
+
+    new_verdicts = {}
+    unclassified_texts = []
+    for text, verdict_key in verdict_keys.items():
+        if verdict_key in verdicts: continue
+        if contains_bad_word(text):
+            new_verdicts[verdict_key] = True
+        else:
+            unclassified_texts.append(text)
+    if unclassified_texts:
+        predictions = load_classifier()(unclassified_texts)
+        for text, prediction in zip(unclassified_texts, predictions):
+            new_verdicts[verdict_keys[text]] = bool(prediction)
+
+    cache.set_many(new_verdicts, VERDICT_CACHE_TIMEOUT)
+    verdicts.update(new_verdicts)
+    return [bool(text) and verdicts[verdict_keys[text]] for text in texts]
+
+def classify_batch(batch):
+    """
+    Returns whether any text of each item in the batch is profane,
+    e.g. the title, body and location of every post in a page.
+    """
+    verdicts = iter(classify_texts([text for texts in batch for text in texts]))
+    return [
+        any([next(verdicts) for _ in texts])
+        for texts in batch
+    ]
+
+def is_profane(texts):
+    return classify_batch([texts])[0]
@@ -0,0 +1,61 @@
+import base64
+import binascii
+import json
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+def encode_cursor(state):
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+def decode_cursor(cursor):
+    if not cursor: return {}
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise ValidationError({"cursor": "Invalid cursor"})
+    if not isinstance(state, dict):
+        raise ValidationError({"cursor": "Invalid cursor"})
+    return state
+
+def seek_query(fields, position, ascending=False):
+    """
+    Row comparison (field1, field2, ...) < (value1, value2, ...)
+    expanded into a filter that postgres can match to an index.
+    Ascending pages compare with > instead.
+    """
+    lookup = 'gt' if ascending else 'lt'
+    bound = 'gte' if ascending else 'lte'
+    query = Q()
+    matching_prefix = Q()
+    for field, value in zip(fields, position):
+        query |= matching_prefix & Q(**{f'{field}__{lookup}': value})
+        matching_prefix &= Q(**{field: value})
+    # the redundant bound on the first field lets postgres
+    # seek an index of a joined table instead of filtering it
+    query &= Q(**{f'{fields[0]}__{bound}': position[0]})
+    return query
+
+def keyset_paginate(queryset, fields, position, page_size, ascending=False):
+    """
+    Returns one page of the queryset ordered descending (or ascending)
+    by fields, starting after position, and the position of the page's
+    last row. The last field must be unique (usually id).
+    """
+    direction = '' if ascending else '-'
+    queryset = queryset.order_by(*[f'{direction}{field}' for field in fields])
+    if position:
+        valid_position = (
+            isinstance(position, list) and
+            len(position) == len(fields) and
+            all(isinstance(value, (int, float)) for value in position)
+        )
+        if not valid_position:
+            raise ValidationError({"cursor": "Invalid cursor"})
+        queryset = queryset.filter(seek_query(fields, position, ascending))
+
+    page = list(queryset[:page_size+1])
+    if len(page) <= page_size: return page, None
+
+    page = page[:page_size]
+    last_row = page[-1]
+    return page, [getattr(last_row, field) for field in fields]
@@ -1,5 +1,5 @@
 from rest_framework import permissions
-from mist.models import Block, FriendRequest
+from mist.models import Block, Friendship
 from users.generics import get_user_from_request
 
 def requested_user_is_the_posted_user(request, user_property):
@@ -32,17 +32,7 @@ class PostPermission(permissions.BasePermission):
             if not request.query_params.get('author'): return True
             author_pk = int(request.query_params.get('author'))
             if requesting_user.pk == author_pk: return True
-            user_friend_requested_author = FriendRequest.objects.filter(
-                friend_requesting_user_id=requesting_user.pk,
-                friend_requested_user_id=author_pk,
-            )
-            author_friend_requested_user = FriendRequest.objects.filter(
-                friend_requesting_user_id=author_pk,
-                friend_requested_user_id=requesting_user.pk,
-            )
-            user_and_author_are_friends = (user_friend_requested_author and 
-                                            author_friend_requested_user)
-            return user_and_author_are_friends
+            return Friendship.are_friends(requesting_user.pk, author_pk)
         elif request.method == "POST":
             return requested_user_is_the_posted_user(request, 'author')
         return True
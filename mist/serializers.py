@@ -1,21 +1,38 @@
 from psycopg2 import IntegrityError
 # from profanity_check import predict
 from rest_framework import serializers
-from users.generics import get_current_time
 
 from users.serializers import ReadOnlyUserSerializer
-from .models import AccessCode, Block, CommentFlag, CommentVote, Favorite, Feature, Mistbox, PostFlag, FriendRequest, MatchRequest, Post, Comment, Message, Tag, PostVote, View, Word
+from .models import AccessCode, Block, CommentFlag, CommentVote, Favorite, Feature, Mistbox, PostFlag, FriendRequest, MatchRequest, Post, Comment, Conversation, Message, PostStats, Tag, PostVote, View, Word
+
+class MemoizedListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # posts and users repeated across the list are serialized once
+        self.context.setdefault('serialized_posts', {})
+        self.context.setdefault('serialized_users', {})
+        return super().to_representation(data)
+
+def serialize_once(context, cache_name, key, serialize):
+    """
+    Returns the representation memoized in the context by a list
+    serializer, or a fresh one outside of lists.
+    """
+    serialized_objects = context.get(cache_name)
+    if serialized_objects is None: return serialize()
+    if key not in serialized_objects:
+        serialized_objects[key] = serialize()
+    return serialized_objects[key]
 
 class WordSerializer(serializers.ModelSerializer):
-    occurrences = serializers.SerializerMethodField()
-
     class Meta:
         model = Word
         fields = ('id', 'text', 'occurrences')
-    
-    def get_occurrences(self, obj):
-        if obj.occurrences != None: return obj.occurrences
-        return obj.calculate_occurrences()
+
+class PostListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        PostSerializer.load_stats(posts)
+        return super().to_representation(posts)
 
 class PostSerializer(serializers.ModelSerializer):
     votecount = serializers.SerializerMethodField()
@@ -31,32 +48,44 @@ class PostSerializer(serializers.ModelSerializer):
         'emoji_dict', 'commentcount', 'flagcount', 'votecount', 'collectible_type',
         'is_matched')
         read_only_fields = ('is_matched', )
+        list_serializer_class = PostListSerializer
+
+    def load_stats(posts):
+        """
+        Attaches the stats of every post that wasn't fetched with
+        select_related('stats'), so a page of posts is serialized
+        without a query per post. Missing stats are computed but not
+        saved, reads leave their repair to reconcile_post_stats.
+        """
+        unloaded_posts = {
+            post.pk: post for post in posts
+            if post.pk and not Post.stats.is_cached(post)
+        }
+        if not unloaded_posts: return
+        stats = PostStats.objects.in_bulk(unloaded_posts.keys())
+        missing_post_ids = unloaded_posts.keys() - stats.keys()
+        if missing_post_ids:
+            stats.update(PostStats.calculate(missing_post_ids))
+        for post_id, post in unloaded_posts.items():
+            if post_id in stats: post.stats = stats[post_id]
     
+    def get_stats(self, obj):
+        try: return obj.stats
+        except PostStats.DoesNotExist:
+            if not obj.pk: return PostStats()
+            return PostStats.calculate([obj.pk]).get(obj.pk, PostStats())
+
     def get_flagcount(self, obj):
-        try: obj.flags
-        except: obj.flags = PostFlag.objects.filter(post_id=self.pk)
-        return sum([flag.rating for flag in obj.flags.all()])
+        return self.get_stats(obj).flagcount
     
     def get_commentcount(self, obj):
-        try: obj.comments
-        except: obj.comments = Comment.objects.filter(post=self.pk)
-        return obj.comments.count()
+        return self.get_stats(obj).commentcount
 
     def get_votecount(self, obj):
-        try: obj.votes
-        except: obj.votes = PostVote.objects.filter(post_id=obj.id)
-        return sum([vote.rating for vote in obj.votes.all()])
-
-    def get_trendscore(self, obj):
-        try: obj.votes
-        except: obj.votes = PostVote.objects.filter(post_id=obj.id)
-        return sum([vote.rating*(vote.timestamp/get_current_time()) 
-            for vote in obj.votes.all()])
+        return self.get_stats(obj).votecount
 
     def get_emoji_dict(self, obj):
-        try: votes = obj.votes
-        except: votes = PostVote.objects.filter(post_id=obj.id)
-        return self.convert_votes_to_emoji_dict(votes.all())
+        return self.get_stats(obj).emoji_dict
 
     def validate_body(self, body):
         # [is_offensive] = predict([body])
@@ -64,14 +93,6 @@ class PostSerializer(serializers.ModelSerializer):
         #     raise serializers.ValidationError("Avoid offensive language.")
         return body
 
-    def convert_votes_to_emoji_dict(self, votes):
-        emoji_tuple = {}
-        for vote in votes:
-            if vote.emoji not in emoji_tuple:
-                emoji_tuple[vote.emoji] = 0
-            emoji_tuple[vote.emoji] += vote.rating
-        return emoji_tuple
-
 class PostVoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = PostVote
@@ -93,9 +114,12 @@ class TagSerializer(serializers.ModelSerializer):
             'tagged_phone_number': {'required': False},
             'tagged_user': {'required': False},
         }
+        list_serializer_class = MemoizedListSerializer
 
     def get_post(self, obj):
-        return PostSerializer(obj.comment.post).data
+        return serialize_once(
+            self.context, 'serialized_posts', obj.comment.post_id,
+            lambda: PostSerializer(obj.comment.post).data)
     
     def validate(self, data):
         tagged_phone_number = data.get('tagged_phone_number')
@@ -175,22 +199,28 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'body', 'timestamp', 
         'post', 'author', 'read_only_author',
         'votecount', 'flagcount', 'tags')
+        list_serializer_class = MemoizedListSerializer
 
     def get_read_only_author(self, obj):
-        return ReadOnlyUserSerializer(obj.author).data
+        return serialize_once(
+            self.context, 'serialized_users', obj.author_id,
+            lambda: ReadOnlyUserSerializer(obj.author).data)
     
     def get_tags(self, obj):
         tags = []
         try: tags = obj.tags
         except: tags = Tag.objects.filter(comment_id=obj.id)
-        return [TagSerializer(tag).data for tag in tags.all()]
+        return [TagSerializer(tag, context=self.context).data for tag in tags.all()]
 
     def get_flagcount(self, obj):
+        # lists read the annotations of annotate_comment_ratings
+        if hasattr(obj, 'total_flagcount'): return obj.total_flagcount
         try: obj.flags
-        except: obj.flags = CommentFlag.objects.filter(comment_id=self.pk)
+        except: obj.flags = CommentFlag.objects.filter(comment_id=obj.id)
         return sum([flag.rating for flag in obj.flags.all()])
 
     def get_votecount(self, obj):
+        if hasattr(obj, 'total_votecount'): return obj.total_votecount
         try: obj.votes
         except: obj.votes = CommentVote.objects.filter(comment_id=obj.id)
         return sum([vote.rating for vote in obj.votes.all()])
@@ -215,6 +245,13 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = ('id', 'body', 'timestamp', 'sender', 'receiver', 'post')
+
+class ConversationSerializer(serializers.ModelSerializer):
+    last_message = MessageSerializer(read_only=True)
+
+    class Meta:
+        model = Conversation
+        fields = ('counterpart', 'last_message', 'last_timestamp', 'unread_count')
     
 class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -238,11 +275,11 @@ class MistboxSerializer(serializers.ModelSerializer):
         return [keyword.lower() for keyword in keywords]
     
     def get_posts(self, obj):
-        from mist.views.post import Order
-        try: obj.posts
-        except: obj.posts = Post.objects.none()
-        sorted_posts = sorted(obj.posts.all(), key=Order.recent, reverse=True)
-        return [PostSerializer(post).data for post in sorted_posts]
+        posts = self.context.get('posts')
+        if posts is None:
+            try: posts = obj.posts.select_related('stats').order_by('-timestamp', '-id')
+            except: posts = Post.objects.none()
+        return PostSerializer(posts, many=True).data
 
 class AccessCodeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,16 +1,18 @@
 from datetime import date
 from unittest.mock import patch
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from freezegun import freeze_time
 from rest_framework import status
 from rest_framework.test import APIRequestFactory
 from mist.models import Comment, CommentFlag, Post, Tag
-from mist.serializers import CommentSerializer, TagSerializer
+from mist.serializers import CommentSerializer, PostSerializer, TagSerializer
 from mist.views.comment import CommentView
 
 from users.models import User
 from users.serializers import ReadOnlyUserSerializer
-from users.tests.generics import create_dummy_user_and_token_given_id
+from users.tests.generics import create_dummy_device, create_dummy_user_and_token_given_id, dispatch_fake_notifications
 
 class NotificationServiceMock:
     sent_notifications = []
@@ -94,6 +96,57 @@ class CommentTest(TestCase):
         self.assertEqual(response_comment.get('tags'), [serialized_tag])
         return
     
+    def test_get_should_use_constant_queries_given_any_thread_length(self):
+        def count_list_queries():
+            request = APIRequestFactory().get(
+                '/api/comments',
+                {
+                    'post': self.post.pk,
+                },
+                format="json",
+                HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+            )
+            with CaptureQueriesContext(connection) as queries:
+                response = CommentView.as_view({'get':'list'})(request)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(response.data), len(queries)
+
+        Tag.objects.create(comment=self.comment1, tagging_user=self.user1, tagged_user=self.user2)
+        short_thread_length, short_thread_queries = count_list_queries()
+        for author in [self.user2, self.user3, self.user2]:
+            comment = Comment.objects.create(
+                body='FakeTextForComment',
+                post=self.post,
+                author=author,
+            )
+            Tag.objects.create(comment=comment, tagging_user=author, tagged_user=self.user1)
+        long_thread_length, long_thread_queries = count_list_queries()
+
+        self.assertGreater(long_thread_length, short_thread_length)
+        self.assertEqual(short_thread_queries, long_thread_queries)
+        return
+
+    def test_get_should_serialize_tagged_post_once(self):
+        for tagged_user in [self.user2, self.user3]:
+            Tag.objects.create(comment=self.comment1, tagging_user=self.user1, tagged_user=tagged_user)
+
+        request = APIRequestFactory().get(
+            '/api/comments',
+            {
+                'post': self.post.pk,
+            },
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        with patch.object(PostSerializer, 'to_representation', 
+            autospec=True, side_effect=PostSerializer.to_representation) as to_representation:
+            response = CommentView.as_view({'get':'list'})(request)
+        response_tags = response.data[0].get('tags')
+
+        self.assertEqual(to_representation.call_count, 1)
+        self.assertEqual(response_tags[0].get('post'), response_tags[1].get('post'))
+        return
+
     def test_get_should_not_return_comment_given_invalid_post_pk(self):
         request = APIRequestFactory().get(
             '/api/comments',
@@ -133,6 +186,67 @@ class CommentTest(TestCase):
         self.assertTrue(serialized_comment not in response_comments)
         return
     
+    def test_get_should_only_return_permissible_comments(self):
+        comment2 = Comment.objects.create(
+            body='FakeTextForComment',
+            post=self.post,
+            author=self.user2,
+            timestamp=1,
+        )
+        CommentFlag.objects.create(flagger=self.user1, comment=self.comment1)
+        CommentFlag.objects.create(flagger=self.user2, comment=self.comment1)
+        CommentFlag.objects.create(flagger=self.user3, comment=self.comment1)
+        CommentFlag.objects.create(flagger=self.user3, comment=comment2)
+
+        request = APIRequestFactory().get(
+            '/api/comments',
+            {
+                'post': self.post.pk,
+            },
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        response = CommentView.as_view({'get':'list'})(request)
+        response_comment_ids = [comment.get('id') for comment in response.data]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response_comment_ids, [comment2.id])
+        self.assertEqual(response.data[0].get('flagcount'), 1)
+        return
+
+    def test_get_should_return_comments_page_by_page_given_cursor(self):
+        for timestamp in range(1, 4):
+            Comment.objects.create(
+                body='FakeTextForComment',
+                post=self.post,
+                author=self.user2,
+                timestamp=timestamp,
+            )
+        expected_comment_ids = list(Comment.objects.\
+            order_by('timestamp', 'id').\
+            values_list('id', flat=True))
+
+        response_comment_ids = []
+        cursor = ''
+        with patch.object(CommentView, 'PAGE_SIZE', 3):
+            while cursor is not None:
+                request = APIRequestFactory().get(
+                    '/api/comments',
+                    {
+                        'post': self.post.pk,
+                        'cursor': cursor,
+                    },
+                    format="json",
+                    HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+                )
+                response = CommentView.as_view({'get':'list'})(request)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                response_comment_ids += [comment.get('id') for comment in response.data.get('results')]
+                cursor = response.data.get('next_cursor')
+
+        self.assertEqual(response_comment_ids, expected_comment_ids)
+        return
+
     def test_get_should_not_return_comments_with_superuser_flags(self):
         superuser = User.objects.create(
             email="superuser@usc.edu",
@@ -215,6 +329,7 @@ class CommentTest(TestCase):
         return
 
     def test_post_should_send_notification_given_valid_comment(self):
+        create_dummy_device(self.post.author)
         test_comment = Comment(
             body='FakeTextForTestComment',
             post=self.post,
@@ -231,11 +346,12 @@ class CommentTest(TestCase):
         response = CommentView.as_view({'post':'create'})(request)
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertTrue(NotificationServiceMock.sent_notifications)
+        self.assertTrue(dispatch_fake_notifications())
         return
     
     def test_post_should_not_send_notification_given_valid_comment(self):
         non_existent_user_id = -1
+        create_dummy_device(self.post.author)
 
         test_comment = Comment(
             body='FakeTextForTestComment',
@@ -253,7 +369,7 @@ class CommentTest(TestCase):
         )
         response = CommentView.as_view({'post':'create'})(request)
 
-        self.assertFalse(NotificationServiceMock.sent_notifications)
+        self.assertFalse(dispatch_fake_notifications())
         return
     
     # def test_post_should_not_create_given_profanity(self):
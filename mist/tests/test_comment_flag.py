@@ -6,7 +6,7 @@ from freezegun import freeze_time
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIRequestFactory
-from mist.models import Comment, CommentFlag, Post
+from mist.models import Comment, CommentFlag, CommentVote, ModerationLedger, Post
 from mist.serializers import CommentFlagSerializer
 from mist.views.comment_flag import CommentFlagView
 
@@ -195,4 +195,28 @@ class CommentFlagTest(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(CommentFlag.objects.filter(pk=flag.pk))
-        return
\ No newline at end of file
+        return
+
+    def test_flags_should_count_impermissible_comment_in_ledger(self):
+        def impermissible_comments():
+            ledger = ModerationLedger.objects.filter(user=self.user).first()
+            return ledger.impermissible_comments if ledger else 0
+
+        flaggers = [create_dummy_user_and_token_given_id(i)[0] for i in range(30, 33)]
+        flags = [CommentFlag.objects.create(flagger=flagger, comment=self.comment) for flagger in flaggers]
+        self.assertEqual(impermissible_comments(), 1)
+
+        flags[0].delete()
+        self.assertEqual(impermissible_comments(), 0)
+
+        CommentFlag.objects.create(flagger=self.user, comment=self.comment)
+        self.assertEqual(impermissible_comments(), 1)
+        for voter in flaggers:
+            CommentVote.objects.create(voter=voter, comment=self.comment, rating=3)
+        self.assertEqual(impermissible_comments(), 0)
+
+        CommentVote.objects.filter(comment=self.comment).first().delete()
+        self.assertEqual(impermissible_comments(), 1)
+        self.comment.delete()
+        self.assertEqual(impermissible_comments(), 0)
+        return
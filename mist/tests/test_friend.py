@@ -4,7 +4,7 @@ from freezegun import freeze_time
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIRequestFactory
-from mist.models import FriendRequest, Post
+from mist.models import FriendRequest, Friendship, Post
 from mist.serializers import FriendRequestSerializer
 from mist.views.friend import FriendRequestView, FriendshipView
 
@@ -360,3 +360,31 @@ class FriendshipViewTest(TestCase):
         response = FriendshipView.as_view()(request)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         return
+
+    def test_get_should_not_return_user1_given_deleted_friend_request(self):
+        FriendRequest.objects.get(friend_requesting_user=self.user1).delete()
+
+        request = APIRequestFactory().get(
+            '/api/matches',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token2}',
+        )
+        response = FriendshipView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data)
+        self.assertFalse(Friendship.are_friends(self.user1.id, self.user2.id))
+        self.assertFalse(Friendship.are_friends(self.user2.id, self.user1.id))
+        return
+
+    def test_are_friends_should_only_hold_for_mutual_requests(self):
+        user3, _ = create_dummy_user_and_token_given_id(3)
+        FriendRequest.objects.create(
+            friend_requesting_user=self.user1,
+            friend_requested_user=user3,
+        )
+
+        self.assertTrue(Friendship.are_friends(self.user1.id, self.user2.id))
+        self.assertTrue(Friendship.are_friends(self.user2.id, self.user1.id))
+        self.assertFalse(Friendship.are_friends(self.user1.id, user3.id))
+        return
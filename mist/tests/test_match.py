@@ -5,14 +5,14 @@ from freezegun import freeze_time
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIRequestFactory
-from mist.models import MatchRequest, Message, Post
+from mist.models import Match, MatchRequest, Message, Post
 from mist.serializers import MatchRequestSerializer
 from mist.tests.generics import NotificationServiceMock
 from mist.views.match import MatchRequestView, MatchView
 
 from users.models import User
 from users.serializers import ReadOnlyUserSerializer
-from users.tests.generics import create_dummy_user_and_token_given_id
+from users.tests.generics import create_dummy_device, create_dummy_user_and_token_given_id, dispatch_fake_notifications
 
 
 @freeze_time("2020-01-01")
@@ -158,6 +158,7 @@ class MatchRequestTest(TestCase):
         return
 
     def test_post_should_send_device_notification_given_valid_match_request(self):
+        create_dummy_device(self.user2)
         match_request = MatchRequest(
             match_requesting_user=self.user1,
             match_requested_user=self.user2,
@@ -170,7 +171,7 @@ class MatchRequestTest(TestCase):
             match_requested_user=match_request.match_requested_user,
             post=self.post,
         ))
-        self.assertFalse(NotificationServiceMock.sent_notifications)
+        self.assertFalse(dispatch_fake_notifications())
 
         request = APIRequestFactory().post(
             '/api/match_requests',
@@ -181,8 +182,9 @@ class MatchRequestTest(TestCase):
         response = MatchRequestView.as_view({'post':'create'})(request)
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertTrue(NotificationServiceMock.sent_notifications)
-        self.assertEqual(NotificationServiceMock.badges, 1)
+        pushes = dispatch_fake_notifications()
+        self.assertTrue(pushes)
+        self.assertEqual(pushes[0].badge, 1)
         return
 
     def test_post_should_mark_post_as_matched_given_completing_match_request(self):
@@ -525,4 +527,20 @@ class MatchViewTest(TestCase):
         )
         response = MatchView.as_view()(request)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
-        return
\ No newline at end of file
+        return
+
+    def test_get_should_not_return_user1_given_deleted_match_request(self):
+        MatchRequest.objects.get(match_requesting_user=self.user1).delete()
+
+        request = APIRequestFactory().get(
+            '/api/matches',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token2}',
+        )
+        response = MatchView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data)
+        self.assertFalse(Match.are_matched(self.user1.id, self.user2.id))
+        self.assertFalse(Match.are_matched(self.user2.id, self.user1.id))
+        return
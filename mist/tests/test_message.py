@@ -6,13 +6,13 @@ from freezegun import freeze_time
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIRequestFactory
-from mist.models import Block, MatchRequest, Message, Post
+from mist.models import Block, Conversation, MatchRequest, Message, Post
 from mist.serializers import MessageSerializer
 from mist.tests.generics import NotificationServiceMock
-from mist.views.message import ConversationView, MessageView
+from mist.views.message import ConversationView, MessageView, ThreadView
 
 from users.models import User
-from users.tests.generics import create_dummy_user_and_token_given_id
+from users.tests.generics import create_dummy_user_and_token_given_id, dispatch_fake_notifications
 
 @freeze_time("2020-01-01")
 @patch('push_notifications.models.APNSDeviceQuerySet.send_message', 
@@ -229,10 +229,11 @@ class MessageTest(TestCase):
         response = MessageView.as_view({'post':'create'})(request)
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        pushes = dispatch_fake_notifications()
         self.assertIn(
             f"{message.sender.username}: {message.body}",
-            NotificationServiceMock.sent_notifications)
-        self.assertEqual(NotificationServiceMock.badges, 1)
+            [push.alert for push in pushes])
+        self.assertEqual(pushes[0].badge, 1)
         return
     
     def test_post_should_not_create_message_given_invalid_message(self):
@@ -428,12 +429,12 @@ class ConversationViewTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
     
     def test_get_should_return_all_user_conversations_given_no_parameters(self):
-        user1_to_user2 = Message.objects.create(
+        Message.objects.create(
             sender=self.user1,
             receiver=self.user2,
             body='TestMessageBody1'
         )
-        user1_to_user3 = Message.objects.create(
+        Message.objects.create(
             sender=self.user1,
             receiver=self.user3,
             body='TestMessageBody2'
@@ -443,12 +444,12 @@ class ConversationViewTest(TestCase):
             receiver=self.user1,
             body='TestMessageBody3'
         )
-        user2_to_user3 = Message.objects.create(
+        Message.objects.create(
             sender=self.user2,
             receiver=self.user3,
             body='TestMessageBody4'
         )
-        user3_to_user2 = Message.objects.create(
+        Message.objects.create(
             sender=self.user3,
             receiver=self.user2,
             body='TestMessageBody5'
@@ -458,16 +459,34 @@ class ConversationViewTest(TestCase):
             receiver=self.user1,
             body='TestMessageBody6'
         )
-        expected_response_data = {
-            self.user2.pk: [
-                MessageSerializer(user1_to_user2).data,
-                MessageSerializer(user2_to_user1).data,
-            ],
-            self.user3.pk: [
-                MessageSerializer(user1_to_user3).data,
-                MessageSerializer(user3_to_user1).data,
-            ]
-        }
+        expected_response_data = [
+            {
+                'counterpart': self.user3.pk,
+                'last_message': MessageSerializer(user3_to_user1).data,
+                'last_timestamp': user3_to_user1.timestamp,
+                'unread_count': 1,
+            },
+            {
+                'counterpart': self.user2.pk,
+                'last_message': MessageSerializer(user2_to_user1).data,
+                'last_timestamp': user2_to_user1.timestamp,
+                'unread_count': 1,
+            },
+        ]
+
+        request = APIRequestFactory().get(
+            'api/conversations', 
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}')
+        response = ConversationView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, expected_response_data)
+        return
+
+    def test_get_should_not_return_conversations_given_blocked_counterpart(self):
+        Message.objects.create(sender=self.user1, receiver=self.user2, body='TestMessageBody1')
+        Message.objects.create(sender=self.user1, receiver=self.user3, body='TestMessageBody2')
+        Block.objects.create(blocking_user=self.user2, blocked_user=self.user1)
 
         request = APIRequestFactory().get(
             'api/conversations', 
@@ -475,6 +494,86 @@ class ConversationViewTest(TestCase):
         response = ConversationView.as_view()(request)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data.get(self.user2.pk), expected_response_data.get(self.user2.pk))
-        self.assertEqual(response.data.get(self.user3.pk), expected_response_data.get(self.user3.pk))
-        return
\ No newline at end of file
+        self.assertEqual([conversation['counterpart'] for conversation in response.data], [self.user3.pk])
+        return
+
+    def test_hide_should_refresh_conversations(self):
+        user1_to_user2 = Message.objects.create(sender=self.user1, receiver=self.user2, body='TestMessageBody1')
+        user2_to_user1 = Message.objects.create(sender=self.user2, receiver=self.user1, body='TestMessageBody2')
+
+        Message.hide(Message.objects.filter(id=user2_to_user1.id))
+
+        conversation = Conversation.objects.get(user=self.user1, counterpart=self.user2)
+        self.assertEqual(conversation.last_message, user1_to_user2)
+        self.assertEqual(conversation.unread_count, 0)
+
+        user1_to_user2.delete()
+
+        self.assertFalse(Conversation.objects.filter(user=self.user1))
+        self.assertFalse(Conversation.objects.filter(user=self.user2))
+        return
+
+class ThreadViewTest(TestCase):
+    def setUp(self):
+        self.user1, self.auth_token1 = create_dummy_user_and_token_given_id(1)
+        self.user2, self.auth_token2 = create_dummy_user_and_token_given_id(2)
+        self.user3, self.auth_token3 = create_dummy_user_and_token_given_id(3)
+        return
+
+    def get_thread(self, counterpart, cursor=None):
+        params = {'counterpart': counterpart}
+        if cursor: params['cursor'] = cursor
+        request = APIRequestFactory().get(
+            '/api/threads/',
+            params,
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}')
+        return ThreadView.as_view()(request)
+
+    def test_get_should_return_pages_of_thread_newest_first(self):
+        messages = []
+        for timestamp in range(ThreadView.PAGE_SIZE+5):
+            sender, receiver = (self.user1, self.user2) if timestamp % 2 else (self.user2, self.user1)
+            messages.append(Message.objects.create(
+                sender=sender,
+                receiver=receiver,
+                body=f'TestMessageBody{timestamp}',
+                timestamp=timestamp))
+        Message.objects.create(sender=self.user3, receiver=self.user1, body='OtherThread', timestamp=0)
+
+        first_response = self.get_thread(self.user2.pk)
+        second_response = self.get_thread(self.user2.pk, first_response.data['next_cursor'])
+
+        self.assertEqual(first_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            first_response.data['results'] + second_response.data['results'],
+            MessageSerializer(reversed(messages), many=True).data)
+        self.assertEqual(len(first_response.data['results']), ThreadView.PAGE_SIZE)
+        self.assertIsNone(second_response.data['next_cursor'])
+        return
+
+    def test_get_should_mark_conversation_read(self):
+        Message.objects.create(sender=self.user2, receiver=self.user1, body='TestMessageBody1')
+        Message.objects.create(sender=self.user2, receiver=self.user1, body='TestMessageBody2')
+        self.assertEqual(Conversation.objects.get(user=self.user1, counterpart=self.user2).unread_count, 2)
+
+        self.get_thread(self.user2.pk)
+
+        self.assertEqual(Conversation.objects.get(user=self.user1, counterpart=self.user2).unread_count, 0)
+        self.assertEqual(Conversation.objects.get(user=self.user2, counterpart=self.user1).unread_count, 0)
+        return
+
+    def test_get_should_not_return_thread_given_blocked_counterpart(self):
+        Message.objects.create(sender=self.user2, receiver=self.user1, body='TestMessageBody1')
+        Block.objects.create(blocking_user=self.user1, blocked_user=self.user2)
+
+        response = self.get_thread(self.user2.pk)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+        return
+
+    def test_get_should_return_status_error_given_invalid_counterpart(self):
+        response = self.get_thread('invalid')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        return
@@ -1,15 +1,24 @@
 from datetime import date
 from decimal import Decimal
+from io import StringIO
+import math
 from unittest.mock import patch
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from freezegun import freeze_time
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIRequestFactory
 
-from mist.models import Comment, Favorite, Feature, Mistbox, PostFlag, FriendRequest, MatchRequest, Post, PostVote, Tag, View, Word
+from mist.models import Comment, Favorite, Feature, Message, Mistbox, MistboxKeyword, PostFlag, FriendRequest, MatchRequest, Post, PostStats, PostVote, Tag, View, Word, get_current_time, has_trigram_extension
+from mist.keywords import KeywordMatcher
+from mist.moderation import classify_batch
 from mist.serializers import PostSerializer
 from mist.tests.generics import NotificationServiceMock
+from mist_worker.tasks import build_trending_snapshot, ingest_post
 from mist.views.post import DeleteMistboxPostView, FavoritedPostsView, FeaturedPostsView, MatchedPostsView, MistboxView, Order, PostView, SubmittedPostsView, TaggedPostsView
 from users.models import User
 from users.tests.generics import create_dummy_user_and_token_given_id
@@ -64,6 +73,100 @@ class PostTest(TestCase):
         PostFlag.objects.create(post=self.post1, flagger=self.user1)
         return self.assertEqual(PostSerializer().get_flagcount(self.post1), 1)
 
+    def test_post_stats_should_track_votes_flags_and_comments(self):
+        vote1 = PostVote.objects.create(voter=self.user1, post=self.post1, emoji="😭")
+        vote2 = PostVote.objects.create(voter=self.user2, post=self.post1, emoji="😭")
+        PostVote.objects.create(voter=self.user3, post=self.post1)
+        comment = Comment.objects.create(body='FakeTextForComment', post=self.post1, author=self.user1)
+        PostFlag.objects.create(post=self.post1, flagger=self.user2)
+
+        vote2.emoji = PostVote.DEFAULT_EMOJI
+        vote2.save()
+        vote1.delete()
+        comment.delete()
+
+        stats = PostStats.objects.get(post=self.post1)
+        self.assertEqual(stats.votecount, 2)
+        self.assertEqual(stats.commentcount, 0)
+        self.assertEqual(stats.flagcount, 1)
+        self.assertEqual(stats.superuser_flagcount, 0)
+        self.assertEqual(stats.emoji_dict, {PostVote.DEFAULT_EMOJI: 2})
+
+    def test_post_stats_should_track_superuser_flags(self):
+        superuser = User.objects.create(
+            email="superuser@usc.edu",
+            username="superuser",
+            date_of_birth=date(2000, 1, 1),
+            is_superuser=True,
+        )
+        PostFlag.objects.create(flagger=superuser, post=self.post1)
+
+        stats = PostStats.objects.get(post=self.post1)
+        self.assertEqual(stats.flagcount, PostFlag.VERY_LARGE_RATING)
+        self.assertEqual(stats.superuser_flagcount, 1)
+
+    def test_reconcile_post_stats_should_repair_stats(self):
+        PostVote.objects.create(voter=self.user1, post=self.post1)
+        PostVote.objects.create(voter=self.user2, post=self.post1)
+        Comment.objects.create(body='FakeTextForComment', post=self.post2, author=self.user1)
+        PostStats.objects.filter(post=self.post1).update(votecount=100, emoji_dict={})
+        PostStats.objects.filter(post=self.post2).delete()
+
+        call_command('reconcile_post_stats', stdout=StringIO())
+
+        stats1 = PostStats.objects.get(post=self.post1)
+        stats2 = PostStats.objects.get(post=self.post2)
+        self.assertEqual(stats1.votecount, 2)
+        self.assertEqual(stats1.emoji_dict, {PostVote.DEFAULT_EMOJI: 2})
+        self.assertEqual(stats2.commentcount, 1)
+
+    def test_serialize_should_compute_missing_stats_without_saving(self):
+        PostVote.objects.create(voter=self.user1, post=self.post1)
+        Comment.objects.create(body='FakeTextForComment', post=self.post2, author=self.user1)
+        PostStats.objects.filter(post__in=[self.post1, self.post2]).delete()
+
+        serialized_posts = PostSerializer(
+            Post.objects.filter(id__in=[self.post1.id, self.post2.id]).order_by('id'),
+            many=True).data
+        serialized_post = PostSerializer(Post.objects.get(id=self.post2.id)).data
+
+        self.assertEqual(serialized_posts[0].get('votecount'), 1)
+        self.assertEqual(serialized_posts[0].get('emoji_dict'), {PostVote.DEFAULT_EMOJI: 1})
+        self.assertEqual(serialized_posts[1].get('commentcount'), 1)
+        self.assertEqual(serialized_post.get('commentcount'), 1)
+        self.assertFalse(PostStats.objects.filter(post__in=[self.post1, self.post2]).exists())
+
+    def test_rescan_profanity_should_hide_profane_posts_and_messages(self):
+        Post.objects.filter(id=self.post1.id).update(body='fuck')
+        message = Message.objects.create(
+            sender=self.user1,
+            receiver=self.user2,
+            body='fuck',
+        )
+        out = StringIO()
+
+        call_command('rescan_profanity', '--batch-size=2', stdout=out)
+
+        self.assertTrue(Post.objects.get(id=self.post1.id).is_hidden)
+        self.assertFalse(Post.objects.get(id=self.post2.id).is_hidden)
+        self.assertTrue(Message.objects.get(id=message.id).is_hidden)
+        self.assertIn('hid 1 profane posts', out.getvalue())
+
+    def test_classify_batch_should_classify_every_post_in_one_call(self):
+        self.addCleanup(cache.clear)
+        batch = [
+            [self.post1.title, self.post1.body, None],
+            ['FakeTitle', 'you bitch', 'FakeLocation'],
+        ]
+        with patch('mist.moderation.cache.get_many', return_value={}):
+            with patch('mist.moderation.load_classifier') as load_classifier:
+                load_classifier.return_value.return_value = [False, False, False, False]
+                verdicts = classify_batch(batch)
+
+        self.assertEqual(verdicts, [False, True])
+        load_classifier.return_value.assert_called_once_with(
+            [self.post1.title, self.post1.body, 'FakeTitle', 'FakeLocation'])
+
     def test_save_should_create_words_in_post(self):
         Post.objects.create(
             title='TitleWord',
@@ -132,6 +235,55 @@ class PostTest(TestCase):
         self.assertNotIn(post4, test_mistbox.posts.all())
         return
 
+    def test_ingest_should_count_new_words_once_given_pending_post(self):
+        with override_settings(POST_INGESTION_SYNC=False):
+            pending_post = Post.objects.create(
+                title='quokka',
+                body='FakeTextForPendingPost',
+                author=self.user2,
+            )
+        Post.objects.create(
+            title='quokka',
+            body='FakeTextForIngestedPost',
+            author=self.user2,
+        )
+        self.assertEqual(Word.objects.get(text='quokka').occurrences, 1)
+
+        ingest_post(pending_post.id)
+
+        word = Word.objects.get(text='quokka')
+        self.assertEqual(word.occurrences, 2)
+        self.assertEqual(word.calculate_occurrences(), 2)
+        return
+
+    @override_settings(POST_INGESTION_SYNC=False)
+    @patch('backend.celery_app.send_task')
+    def test_save_should_start_ingestion_task_after_commit(self, send_task):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title='FakeTitleForPost',
+                body='fuck',
+                author=self.user2,
+            )
+
+        send_task.assert_called_once_with(name="ingest_post_task", args=[post.id])
+        self.assertFalse(Post.objects.get(id=post.id).is_hidden)
+        return
+
+    @override_settings(POST_INGESTION_SYNC=False)
+    @patch('backend.celery_app.send_task', side_effect=ConnectionError)
+    def test_save_should_leave_post_pending_given_broker_error(self, send_task):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title='FakeTitleForPost',
+                body='FakeTextForPost',
+                author=self.user2,
+            )
+
+        send_task.assert_called_once_with(name="ingest_post_task", args=[post.id])
+        self.assertFalse(Post.objects.get(id=post.id).is_moderated)
+        return
+
     # def test_save_should_send_notifications_with_keywords_in_post(self):
     #     mistbox = Mistbox.objects.create(user=self.user1)
     #     mistbox.keywords = ['these', 'are', 'cool', 'keywords', 'key']
@@ -284,6 +436,47 @@ class PostTest(TestCase):
             collectible_type=collectible_type,
         ))
 
+    def test_post_should_update_author_collectibles(self):
+        collectible_post = Post.objects.create(
+            title='SomeFakeTitle',
+            body='SomeFakeBody',
+            author=self.user1,
+            collectible_type=3,
+        )
+        Post.objects.create(
+            title='SomeFakeTitle',
+            body='SomeFakeBody',
+            author=self.user1,
+            collectible_type=1,
+        )
+        self.assertEqual(User.objects.get(id=self.user1.id).collectibles, [1, 3])
+
+        collectible_post.author = self.user2
+        collectible_post.save()
+        self.assertEqual(User.objects.get(id=self.user1.id).collectibles, [1])
+        self.assertEqual(User.objects.get(id=self.user2.id).collectibles, [3])
+
+        collectible_post.delete()
+        self.assertEqual(User.objects.get(id=self.user2.id).collectibles, [])
+        return
+
+    def test_user_save_should_not_overwrite_collectibles_given_stale_user(self):
+        stale_user = User.objects.get(id=self.user1.id)
+        Post.objects.create(
+            title='SomeFakeTitle',
+            body='SomeFakeBody',
+            author=self.user1,
+            collectible_type=2,
+        )
+
+        stale_user.first_name = 'FakeFirstName'
+        stale_user.save()
+
+        user = User.objects.get(id=self.user1.id)
+        self.assertEqual(user.first_name, 'FakeFirstName')
+        self.assertEqual(user.collectibles, [2])
+        return
+
     def test_post_should_hide_post_given_profanity(self):
         test_post = Post(
             title='fuck you',
@@ -350,6 +543,43 @@ class PostTest(TestCase):
         self.assertCountEqual(serialized_posts, response_posts)
         return
 
+    def test_get_should_use_constant_queries_given_any_page_size(self):
+        def count_list_queries():
+            request = APIRequestFactory().get(
+                '/api/posts',
+                format="json",
+                HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+            )
+            with CaptureQueriesContext(connection) as queries:
+                response = PostView.as_view({'get':'list'})(request)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(response.data), len(queries)
+
+        small_page_size, small_page_queries = count_list_queries()
+        for i in range(10):
+            post = Post.objects.create(
+                title=f'FakeTitleForExtraPost{i}',
+                body='FakeTextForExtraPost',
+                author=self.user2,
+            )
+            PostVote.objects.create(voter=self.user3, post=post, emoji='🔥')
+        large_page_size, large_page_queries = count_list_queries()
+
+        self.assertGreater(large_page_size, small_page_size)
+        self.assertEqual(small_page_queries, large_page_queries)
+        return
+
+    def test_serialize_many_should_load_stats_in_bulk(self):
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            serialized_posts = PostSerializer(posts, many=True).data
+        self.assertEqual(len(serialized_posts), 3)
+
+        PostStats.objects.filter(post=self.post3).delete()
+        PostSerializer(Post.objects.all(), many=True).data
+        self.assertFalse(PostStats.objects.filter(post=self.post3).exists())
+        return
+
     def test_get_should_not_return_hidden_posts_for_generic_users(self):
         self.post1.is_hidden = True
         self.post1.save()
@@ -372,6 +602,34 @@ class PostTest(TestCase):
         self.assertCountEqual(serialized_posts, response_posts)
         return
     
+    @override_settings(POST_INGESTION_SYNC=False)
+    def test_get_should_not_return_unmoderated_posts(self):
+        self.post1.body = 'FakeTextForEditedPost'
+        self.post1.save()
+        Post.objects.create(
+            title='FakeTitleForPendingPost',
+            body='FakeTextForPendingPost',
+            author=self.user2,
+        )
+
+        serialized_posts = [
+            PostSerializer(self.post2).data,
+            PostSerializer(self.post3).data,
+        ]
+
+        request = APIRequestFactory().get(
+            '/api/posts',
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+
+        response = PostView.as_view({'get':'list'})(request)
+        response_posts = [post_data for post_data in response.data]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(serialized_posts, response_posts)
+        return
+
     def test_get_should_return_all_computed_properties(self):
         request = APIRequestFactory().get(
             '/api/posts',
@@ -473,7 +731,141 @@ class PostTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertFalse(response_posts)
         return
-    
+
+    @patch.object(PostView, 'PAGE_SIZE', 2)
+    def test_get_should_return_remaining_posts_given_second_page_number(self):
+        serialized_posts = [
+            PostSerializer(self.post3).data,
+            PostSerializer(self.post2).data,
+            PostSerializer(self.post1).data,
+        ]
+
+        first_request = APIRequestFactory().get(
+            f'/api/posts?order={Order.RECENT.value}&page={1}',
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        second_request = APIRequestFactory().get(
+            f'/api/posts?order={Order.RECENT.value}&page={2}',
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        first_response = PostView.as_view({'get':'list'})(first_request)
+        second_response = PostView.as_view({'get':'list'})(second_request)
+
+        self.assertEqual(first_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(second_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(serialized_posts[:2], first_response.data)
+        self.assertEqual(serialized_posts[2:], second_response.data)
+        return
+
+    @patch.object(PostView, 'PAGE_SIZE', 2)
+    def test_get_should_return_posts_page_by_page_given_cursor(self):
+        PostVote.objects.create(voter=self.user1, post=self.post1)
+        PostVote.objects.create(voter=self.user2, post=self.post1)
+        PostVote.objects.create(voter=self.user3, post=self.post1)
+        PostVote.objects.create(voter=self.user1, post=self.post2)
+        PostVote.objects.create(voter=self.user2, post=self.post2)
+        PostVote.objects.create(voter=self.user1, post=self.post3)
+
+        serialized_posts = [
+            PostSerializer(self.post1).data,
+            PostSerializer(self.post2).data,
+            PostSerializer(self.post3).data,
+        ]
+
+        first_request = APIRequestFactory().get(
+            f'/api/posts?order={Order.BEST.value}&cursor=',
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        first_response = PostView.as_view({'get':'list'})(first_request)
+        next_cursor = first_response.data.get('next_cursor')
+
+        second_request = APIRequestFactory().get(
+            f'/api/posts?order={Order.BEST.value}&cursor={next_cursor}',
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        second_response = PostView.as_view({'get':'list'})(second_request)
+
+        self.assertEqual(first_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(second_response.status_code, status.HTTP_200_OK)
+        self.assertTrue(next_cursor)
+        self.assertEqual(serialized_posts[:2], first_response.data.get('results'))
+        self.assertEqual(serialized_posts[2:], second_response.data.get('results'))
+        self.assertIsNone(second_response.data.get('next_cursor'))
+        return
+
+    @patch.object(PostView, 'PAGE_SIZE', 1)
+    def test_get_should_seek_stats_votecount_given_best_order_and_cursor(self):
+        PostVote.objects.create(voter=self.user1, post=self.post1)
+        PostVote.objects.create(voter=self.user2, post=self.post1)
+        PostVote.objects.create(voter=self.user1, post=self.post2)
+        PostStats.objects.filter(post=self.post3).delete()
+
+        first_request = APIRequestFactory().get(
+            f'/api/posts?order={Order.BEST.value}&cursor=',
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        first_response = PostView.as_view({'get':'list'})(first_request)
+        next_cursor = first_response.data.get('next_cursor')
+
+        second_request = APIRequestFactory().get(
+            f'/api/posts?order={Order.BEST.value}&cursor={next_cursor}',
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        with CaptureQueriesContext(connection) as queries:
+            second_response = PostView.as_view({'get':'list'})(second_request)
+
+        self.assertEqual([post.get('id') for post in first_response.data.get('results')], [self.post1.id])
+        self.assertEqual([post.get('id') for post in second_response.data.get('results')], [self.post2.id])
+        self.assertIsNone(second_response.data.get('next_cursor'))
+        # the uncoalesced bound is what lets postgres seek poststats_votecount_post_idx
+        self.assertTrue(any(
+            '"mist_poststats"."votecount" <= ' in query['sql']
+            for query in queries.captured_queries))
+        return
+
+    def test_get_should_return_400_given_invalid_cursor(self):
+        request = APIRequestFactory().get(
+            '/api/posts?cursor=notacursor',
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        response = PostView.as_view({'get':'list'})(request)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        return
+
+    def test_annotate_scores_should_match_python_scores(self):
+        self.post1.timestamp = self.post1.creation_time
+        self.post1.save()
+
+        PostVote.objects.create(voter=self.user1, post=self.post1)
+        PostVote.objects.create(voter=self.user2, post=self.post1)
+        Comment.objects.create(body='FakeTextForComment', post=self.post1, author=self.user2)
+        View.objects.create(post=self.post1, user=self.user1)
+        PostFlag.objects.create(post=self.post2, flagger=self.user2)
+
+        annotated_posts = Order.annotate_scores(Post.objects.all(), self.user1)
+        annotated_post1 = annotated_posts.get(id=self.post1.id)
+        annotated_post2 = annotated_posts.get(id=self.post2.id)
+        self.post1.viewcount = 1
+        # stored trendscores leave out the -now/TRENDING_NORM_CONSTANT term
+        trendscore = math.log2(Order.trendscore(self.post1)) + \
+            get_current_time()/Post.TRENDING_NORM_CONSTANT
+
+        self.assertEqual(annotated_post1.total_votecount, Order.votecount(self.post1))
+        self.assertEqual(annotated_post1.total_commentcount, Order.commentcount(self.post1))
+        self.assertEqual(annotated_post2.total_flagcount, Order.flagcount(self.post2))
+        self.assertAlmostEqual(Order.viewed_trendscore(annotated_post1), trendscore)
+        self.assertEqual(annotated_post2.trendscore, float('-inf'))
+        self.assertNotIn(self.post2, Order.permissible_posts(annotated_posts))
+        return
+
     def test_get_should_return_posts_in_trending_order_as_default(self):
         self.post1.timestamp = self.post1.creation_time+3600
         self.post2.timestamp = self.post2.creation_time
@@ -507,6 +899,39 @@ class PostTest(TestCase):
         self.assertEqual(serialized_posts[2], response_posts[2])
         return
 
+    def test_get_should_return_trending_posts_from_snapshot_given_no_parameters(self):
+        self.addCleanup(cache.clear)
+        PostVote.objects.create(voter=self.user1, post=self.post2)
+        build_trending_snapshot()
+
+        post4 = Post.objects.create(
+            title='FakeTitleForFourthPost',
+            body='FakeTextForFourthPost',
+            author=self.user1,
+        )
+        PostVote.objects.create(voter=self.user2, post=post4)
+        
+        request = APIRequestFactory().get(
+            '/api/posts',
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        response = PostView.as_view({'get':'list'})(request)
+        response_post_ids = [post_data['id'] for post_data in response.data]
+
+        filtered_request = APIRequestFactory().get(
+            f'/api/posts?author={self.user1.id}',
+            format="json",
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        filtered_response = PostView.as_view({'get':'list'})(filtered_request)
+        filtered_response_post_ids = [post_data['id'] for post_data in filtered_response.data]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response_post_ids, [self.post2.id, self.post3.id, self.post1.id])
+        self.assertEqual(filtered_response_post_ids[0], post4.id)
+        return
+
     def test_get_should_return_viewed_posts_later_in_the_order(self):
         self.post1.timestamp = self.post1.creation_time+3600
         self.post2.timestamp = self.post2.creation_time
@@ -782,6 +1207,42 @@ class PostTest(TestCase):
         self.assertCountEqual(serialized_posts, response_posts)
         return
 
+    def test_get_should_return_posts_with_matching_words_given_words_and_ids(self):
+        serialized_posts = [PostSerializer(self.post2).data]
+
+        request = APIRequestFactory().get(
+            f'/api/posts?words=Fake&ids={self.post2.id}',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+
+        response = PostView.as_view({'get':'list'})(request)
+        response_posts = [post_data for post_data in response.data]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(serialized_posts, response_posts)
+        return
+
+    def test_get_should_rank_posts_by_similarity_given_words(self):
+        if not has_trigram_extension(): self.skipTest("pg_trgm is unavailable")
+        closest_post = Post.objects.create(
+            title='FakeTitle',
+            body='FakeText',
+            author=self.user1,
+        )
+
+        request = APIRequestFactory().get(
+            '/api/posts?words=FakeText',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+
+        response = PostView.as_view({'get':'list'})(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0].get('id'), closest_post.id)
+        return
+
     def test_get_should_return_posts_with_matching_timestamp_given_timestamp(self):
         serialized_posts = [PostSerializer(self.post1).data]
 
@@ -1370,6 +1831,41 @@ class SubmittedPostsViewTest(TestCase):
         self.assertEqual(response_post, serialized_post)
         return
 
+    @patch.object(SubmittedPostsView, 'PAGE_SIZE', 1)
+    def test_get_should_return_newest_submitted_posts_first_given_cursor(self):
+        newer_post = Post.objects.create(
+            title='FakeTitleForNewerPost',
+            body='FakeTextForNewerPost',
+            author=self.user1,
+            creation_time=self.post.creation_time+1,
+        )
+        serialized_posts = [
+            PostSerializer(newer_post).data,
+            PostSerializer(self.post).data,
+        ]
+
+        first_request = APIRequestFactory().get(
+            '/api/submitted-posts/?cursor=',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        first_response = SubmittedPostsView.as_view({'get':'list'})(first_request)
+        next_cursor = first_response.data.get('next_cursor')
+
+        second_request = APIRequestFactory().get(
+            f'/api/submitted-posts/?cursor={next_cursor}',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        second_response = SubmittedPostsView.as_view({'get':'list'})(second_request)
+
+        self.assertEqual(first_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(second_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(serialized_posts[:1], first_response.data.get('results'))
+        self.assertEqual(serialized_posts[1:], second_response.data.get('results'))
+        self.assertIsNone(second_response.data.get('next_cursor'))
+        return
+
     def test_get_should_not_return_anything_given_stranger(self):
         request = APIRequestFactory().get(
             '/api/submitted-posts/',
@@ -1617,6 +2113,22 @@ class MistboxViewTest(TestCase):
         self.assertFalse(response_posts)
         return
 
+    def test_get_should_not_modify_mistbox(self):
+        View.objects.create(post=self.post1, user=self.user1)
+        mistbox = Mistbox.objects.get(user=self.user1)
+        mistbox_posts = set(mistbox.posts.values_list('id', flat=True))
+        
+        request = APIRequestFactory().get(
+            '/api/mistbox/',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        response = MistboxView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(mistbox.posts.values_list('id', flat=True)), mistbox_posts)
+        return
+
     def test_get_should_return_posts_in_recency_order(self):
         self.post1.timestamp = 1000
         self.post1.save()
@@ -1665,6 +2177,42 @@ class MistboxViewTest(TestCase):
         self.assertEqual(patched_mistbox.keywords, new_keywords)
         return
 
+    def test_patch_should_deliver_posts_with_new_keywords_only(self):
+        request = APIRequestFactory().patch(
+            '/api/mistbox/',
+            {
+                "keywords": ["second", "third"]
+            },
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        MistboxView.as_view()(request)
+
+        first_post = Post.objects.create(
+            title='AnotherFakeTitleForFirstPost',
+            body='FakeText',
+            author=self.user2,
+        )
+        second_post = Post.objects.create(
+            title='AnotherFakeTitleForSecondPost',
+            body='FakeText',
+            author=self.user2,
+        )
+        mistbox = Mistbox.objects.get(user=self.user1)
+
+        self.assertCountEqual(
+            MistboxKeyword.objects.filter(mistbox=mistbox).values_list('keyword', flat=True),
+            ["second", "third"])
+        self.assertNotIn(first_post, mistbox.posts.all())
+        self.assertIn(second_post, mistbox.posts.all())
+        return
+
+    def test_keyword_matcher_should_find_overlapping_keywords(self):
+        matcher = KeywordMatcher(['he', 'she', 'his', 'hers', 'missing'])
+        self.assertEqual(matcher.match(['ushers', 'this']), {'he', 'she', 'hers', 'his'})
+        self.assertEqual(matcher.match(['mis', 'sing']), set())
+        return
+
     def test_patch_should_create_mistbox_given_user_without_mistbox_and_keywords(self):
         new_keywords = ["new", "keywords"]
 
@@ -1826,6 +2374,32 @@ class DeleteMistboxPostViewTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(mistbox_before_delete, mistbox_after_delete)
 
+    def test_delete_should_keep_post_in_mistbox_given_opened_post_and_exceeded_daily_limit(self):
+        Mistbox.objects.filter(user=self.user1).update(opens_used_today=Mistbox.MAX_DAILY_SWIPES)
+
+        request = APIRequestFactory().delete(
+            f'api/delete-mistbox-posts/?post={self.post1.id}&opened=1',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        response = DeleteMistboxPostView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(self.post1, Mistbox.objects.get(user=self.user1).posts.all())
+
+    def test_delete_should_allow_last_open_of_the_day(self):
+        Mistbox.objects.filter(user=self.user1).update(opens_used_today=Mistbox.MAX_DAILY_SWIPES-1)
+
+        request = APIRequestFactory().delete(
+            f'api/delete-mistbox-posts/?post={self.post1.id}&opened=1',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        response = DeleteMistboxPostView.as_view()(request)
+        mistbox_after_delete = Mistbox.objects.get(user=self.user1)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertNotIn(self.post1, mistbox_after_delete.posts.all())
+        self.assertEqual(mistbox_after_delete.opens_used_today, Mistbox.MAX_DAILY_SWIPES)
+
     def test_delete_should_delete_post_given_unopened_post_and_exceeded_daily_limit(self):
         mistbox_before_delete = Mistbox.objects.get(user=self.user1)
         mistbox_before_delete.opens_used_today = Mistbox.MAX_DAILY_SWIPES
@@ -1,12 +1,14 @@
 from datetime import date
 import os
 from unittest import skipIf
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
 from freezegun import freeze_time
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIRequestFactory
-from mist.models import PostFlag, Post
+from mist.models import ModerationLedger, PostFlag, Post, PostVote
 from mist.serializers import PostFlagSerializer
 from mist.views.post_flag import PostFlagView
 
@@ -191,4 +193,44 @@ class PostFlagTest(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(PostFlag.objects.filter(pk=flag.pk))
-        return
\ No newline at end of file
+        return
+
+    def test_flags_should_count_impermissible_post_in_ledger(self):
+        def impermissible_posts():
+            ledger = ModerationLedger.objects.filter(user=self.user1).first()
+            return ledger.impermissible_posts if ledger else 0
+
+        flaggers = [create_dummy_user_and_token_given_id(i)[0] for i in range(30, 33)]
+        flags = [PostFlag.objects.create(flagger=flagger, post=self.post) for flagger in flaggers]
+        self.assertEqual(impermissible_posts(), 1)
+
+        flags[0].delete()
+        self.assertEqual(impermissible_posts(), 0)
+
+        PostFlag.objects.create(flagger=self.user2, post=self.post)
+        self.assertEqual(impermissible_posts(), 1)
+        for voter in flaggers:
+            PostVote.objects.create(voter=voter, post=self.post, rating=3)
+        self.assertEqual(impermissible_posts(), 0)
+        return
+
+    def test_delete_post_should_uncount_impermissible_post(self):
+        for i in range(30, 33):
+            flagger, _ = create_dummy_user_and_token_given_id(i)
+            PostFlag.objects.create(flagger=flagger, post=self.post)
+
+        self.post.delete()
+
+        self.assertEqual(ModerationLedger.objects.get(user=self.user1).impermissible_posts, 0)
+        return
+
+    def test_reconcile_moderation_ledgers_should_recount_impermissible_posts(self):
+        for i in range(30, 33):
+            flagger, _ = create_dummy_user_and_token_given_id(i)
+            PostFlag.objects.create(flagger=flagger, post=self.post)
+        ModerationLedger.objects.all().delete()
+
+        call_command('reconcile_moderation_ledgers', stdout=StringIO())
+
+        self.assertEqual(ModerationLedger.objects.get(user=self.user1).impermissible_posts, 1)
+        return
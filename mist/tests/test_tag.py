@@ -11,7 +11,7 @@ from mist.views.tag import TagView
 
 import sys
 
-from users.tests.generics import create_dummy_user_and_token_given_id
+from users.tests.generics import create_dummy_device, create_dummy_user_and_token_given_id, dispatch_fake_notifications
 sys.path.append("...")
 from twilio_config import TwillioTestClientMessages
 
@@ -216,6 +216,7 @@ class TagTest(TestCase):
         return
     
     def test_post_should_send_notification_given_valid_tag_with_tagged_user(self):
+        create_dummy_device(self.user2)
         tag = Tag(
             comment=self.comment,
             tagging_user=self.user1,
@@ -232,8 +233,9 @@ class TagTest(TestCase):
         response = TagView.as_view({'post':'create'})(request)
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertTrue(NotificationServiceMock.sent_notifications)
-        self.assertEqual(NotificationServiceMock.badges, 1)
+        pushes = dispatch_fake_notifications()
+        self.assertTrue(pushes)
+        self.assertEqual(pushes[0].badge, 1)
         return
 
     def test_post_should_send_text_given_valid_tag_with_phone_number(self):
@@ -394,7 +396,7 @@ class TagTest(TestCase):
         response = TagView.as_view({'post':'create'})(request)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertFalse(NotificationServiceMock.sent_notifications)
+        self.assertFalse(dispatch_fake_notifications())
         return
     
     def test_post_should_not_send_text_given_invalid_phone_number(self):
@@ -1,11 +1,16 @@
 from datetime import date
-from django.test import TestCase
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from freezegun import freeze_time
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIRequestFactory
-from mist.models import Post, PostFlag
+from mist.autocomplete import AutocompleteIndex
+from mist.models import Post, PostFlag, Word
 from mist.views.word import WordView
+from mist_worker.tasks import adjust_word_occurrences
 
 from users.models import User
 from users.tests.generics import create_dummy_user_and_token_given_id
@@ -124,6 +129,33 @@ class WordTest(TestCase):
             self.assertEqual(word.get('occurrences'), 0)
         return
 
+    def test_get_should_count_wrapped_occurrences_like_search_given_wrapper_words(self):
+        Post.objects.create(
+            title='kiwi',
+            body='quokka',
+            author=self.user1,
+        )
+        Post.objects.create(
+            title='kiwi',
+            body='FakeText',
+            location_description='quokka',
+            author=self.user1,
+        )
+
+        request = APIRequestFactory().get(
+            '/api/words?search_word=quo&wrapper_words=kiwi',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        response = WordView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(word.get('text'), word.get('occurrences')) for word in response.data],
+            [('quokka', Word.objects.get(text='quokka').calculate_occurrences(['kiwi']))])
+        self.assertEqual(response.data[0].get('occurrences'), 1)
+        return
+
     def test_get_should_not_return_count_of_flagged_posts_given_search_word(self):
         word_to_search = 'Fake'
         post = Post.objects.create(
@@ -147,4 +179,128 @@ class WordTest(TestCase):
         for word in response.data:
             self.assertTrue(word_to_search.lower() in word.get('text'))
             self.assertEqual(word.get('occurrences'), 0)
-        return
\ No newline at end of file
+        return
+
+    def test_occurrences_should_follow_post_edits_flags_and_deletes(self):
+        post1 = Post.objects.create(
+            title='FakeTitle',
+            body='FakeText',
+            author=self.user1,
+        )
+        post2 = Post.objects.create(
+            title='AnotherFakeTitle',
+            body='AnotherText',
+            author=self.user1,
+        )
+        word = Word.objects.get(text='faketitle')
+        self.assertEqual(Word.objects.get(id=word.id).occurrences, 2)
+        self.assertIn(post1, word.posts.all())
+        self.assertNotIn(post2, word.posts.all())
+
+        flag = PostFlag.objects.create(post=post1, flagger=self.user2)
+        self.assertEqual(Word.objects.get(id=word.id).occurrences, 1)
+        flag.delete()
+        self.assertEqual(Word.objects.get(id=word.id).occurrences, 2)
+
+        post2.title = 'AnotherTitle'
+        post2.save()
+        self.assertEqual(Word.objects.get(id=word.id).occurrences, 1)
+
+        post1.delete()
+        self.assertEqual(Word.objects.get(id=word.id).occurrences, 0)
+        return
+
+    @patch('backend.celery_app.send_task')
+    def test_flag_should_adjust_occurrences_on_worker_after_commit(self, send_task):
+        post = Post.objects.create(
+            title='FakeTitle',
+            body='FakeText',
+            author=self.user1,
+        )
+
+        with override_settings(POST_INGESTION_SYNC=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                PostFlag.objects.create(post=post, flagger=self.user2)
+
+        send_task.assert_called_once_with(
+            name="adjust_word_occurrences_task",
+            args=[['FakeTitle', 'FakeText'], -1])
+        self.assertEqual(Word.objects.get(text='faketitle').occurrences, 1)
+
+        adjust_word_occurrences(['FakeTitle', 'FakeText'], -1)
+
+        self.assertEqual(Word.objects.get(text='faketitle').occurrences, 0)
+        return
+
+    def test_long_tokens_should_not_be_indexed(self):
+        long_token = 'a'*(Word.MAX_INDEXED_LENGTH+1)
+        Post.objects.create(
+            title='FakeTitle',
+            body=long_token,
+            author=self.user1,
+        )
+
+        self.assertFalse(Word.objects.filter(text=long_token).exists())
+        self.assertEqual(
+            max(len(substring) for substring in Word.get_substrings([long_token])),
+            Word.MAX_INDEXED_LENGTH)
+        return
+
+    def test_reconcile_words_should_recount_occurrences(self):
+        post = Post.objects.create(
+            title='FakeTitle',
+            body='FakeText',
+            author=self.user1,
+        )
+        Word.objects.update(occurrences=10)
+        Word.posts.through.objects.all().delete()
+
+        call_command('reconcile_words', stdout=StringIO())
+
+        word = Word.objects.get(text='faketitle')
+        self.assertEqual(word.occurrences, 1)
+        self.assertIn(post, word.posts.all())
+        return
+
+    def test_get_should_return_most_frequent_completions_first(self):
+        Post.objects.create(title='popular', body='popcorn', author=self.user1)
+        Post.objects.create(title='popular', body='unpopular', author=self.user1)
+
+        request = APIRequestFactory().get(
+            '/api/words?search_word=Pop',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        response = WordView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(word.get('text'), word.get('occurrences')) for word in response.data],
+            [('popular', 2), ('popcorn', 1)])
+        return
+
+    def test_autocomplete_index_should_rank_completions_of_prefix(self):
+        index = AutocompleteIndex([
+            ('apple', 1, 1), 
+            ('applesauce', 3, 2), 
+            ('apply', 2, 3), 
+            ('apricot', 5, 4), 
+            ('banana', 9, 5),
+        ])
+        self.assertEqual(index.complete('appl', 2), [2, 3])
+        self.assertEqual(index.complete('b', 5), [5])
+        self.assertEqual(index.complete('c', 5), [])
+        return
+
+    def test_autocomplete_index_should_complete_added_words(self):
+        index = AutocompleteIndex([
+            ('apple', 1, 1),
+            ('apricot', 5, 2),
+        ])
+        self.assertEqual(index.complete('app', 5), [1])
+
+        index.add([('application', 3, 3), ('apple', 1, 1)])
+
+        self.assertEqual(index.texts, ['apple', 'application', 'apricot'])
+        self.assertEqual(index.complete('app', 5), [3, 1])
+        return
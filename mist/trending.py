@@ -0,0 +1,11 @@
+from django.core.cache import cache
+
+# Trending Feed Snapshot
+TRENDING_SNAPSHOT_KEY = 'trending-post-ids'
+TRENDING_SNAPSHOT_SIZE = 1000
+# outlives a few missed rebuilds, after which
+# the feed falls back to querying the database
+TRENDING_SNAPSHOT_TIMEOUT = 5*60
+
+def get_trending_snapshot():
+    return cache.get(TRENDING_SNAPSHOT_KEY)
@@ -1,9 +1,11 @@
 from rest_framework import viewsets
-from mist.generics import is_impermissible_comment
+from rest_framework.response import Response
+from mist.generics import annotate_comment_ratings, filter_permissible_comments
 from mist.permissions import CommentPermission
 from users.models import UserNotification, User
 from rest_framework.permissions import IsAuthenticated
 
+from ..pagination import decode_cursor, encode_cursor, keyset_paginate
 from ..serializers import CommentSerializer
 
 from ..models import Comment, Post
@@ -12,6 +14,9 @@ class CommentView(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated, CommentPermission)
     serializer_class = CommentSerializer
 
+    PAGE_SIZE = 100
+    ORDERING_FIELDS = ('timestamp', 'id')
+
     def create(self, request, *args, **kwargs):
         comment_response = super().create(request, *args, **kwargs)
         post_id = comment_response.data.get('post')
@@ -30,18 +35,27 @@ class CommentView(viewsets.ModelViewSet):
         return comment_response
 
     def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        # serialized_posts = response.data.get('results')
-        # response.data['results'] = self.filter_serialized_comments(serialized_posts)
-        response.data = self.filter_serialized_comments(response.data)
-        return response
-    
-    def filter_serialized_comments(self, serialized_comments):
-        filtered_comments = []
-        for serialized_comment in serialized_comments:
-            if not is_impermissible_comment(serialized_comment):
-                filtered_comments.append(serialized_comment)
-        return filtered_comments
+        # impermissible comments are filtered out before they're loaded
+        queryset = filter_permissible_comments(self.filter_queryset(self.get_queryset()))
+        if 'cursor' not in request.query_params:
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+
+        cursor = decode_cursor(request.query_params.get('cursor'))
+        page, next_position = keyset_paginate(
+            queryset, 
+            self.ORDERING_FIELDS, 
+            cursor.get('position'),
+            self.PAGE_SIZE,
+            ascending=True)
+        next_cursor = None
+        if next_position:
+            next_cursor = encode_cursor({'position': next_position})
+        serializer = self.get_serializer(page, many=True)
+        return Response({
+            "next_cursor": next_cursor,
+            "results": serializer.data,
+        })
     
     def get_queryset(self):
         """
@@ -51,11 +65,8 @@ class CommentView(viewsets.ModelViewSet):
         queryset = None
         if post: queryset = Comment.objects.filter(post=post)
         else: queryset = Comment.objects.all()
-        return queryset.\
-            prefetch_related("votes", "flags", "tags").\
-            prefetch_related("post__votes").\
-            prefetch_related("post__flags").\
-            prefetch_related("post__comments").\
-            select_related('author', 'post', 'post__author',).\
+        return annotate_comment_ratings(queryset).\
+            prefetch_related("tags").\
+            select_related('author', 'post', 'post__author', 'post__stats').\
             prefetch_related("author__badges").\
-            order_by('timestamp')
\ No newline at end of file
+            order_by('timestamp', 'id')
\ No newline at end of file
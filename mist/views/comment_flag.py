@@ -1,12 +1,11 @@
 from rest_framework import viewsets
-from mist.generics import is_beyond_impermissible_comment_limit
 from mist.permissions import FlagPermission
 from rest_framework.permissions import IsAuthenticated
 
 from users.models import Ban
 
-from ..serializers import CommentFlagSerializer, CommentSerializer
-from ..models import Comment, CommentFlag
+from ..serializers import CommentFlagSerializer
+from ..models import Comment, CommentFlag, ModerationLedger
 
 class CommentFlagView(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated, FlagPermission)
@@ -26,14 +25,6 @@ class CommentFlagView(viewsets.ModelViewSet):
         comment_flag_response = super().create(request, *args, **kwargs)
         comment_id = comment_flag_response.data.get("comment")
         comment_author = Comment.objects.get(id=comment_id).author
-        comments_by_author = Comment.objects.filter(
-            author=comment_author).\
-            prefetch_related("votes", "flags", "tags").\
-            select_related('author').\
-            prefetch_related("author__badges")
-        serialized_comments_by_author = [
-            CommentSerializer(comment).data for comment in comments_by_author
-        ]
-        if is_beyond_impermissible_comment_limit(serialized_comments_by_author):
+        if ModerationLedger.is_beyond_impermissible_comment_limit(comment_author.id):
             Ban.objects.get_or_create(phone_number=comment_author.phone_number)
         return comment_flag_response
\ No newline at end of file
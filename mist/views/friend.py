@@ -8,7 +8,7 @@ from users.models import User
 from users.serializers import ReadOnlyUserSerializer
 
 from ..serializers import FriendRequestSerializer
-from ..models import FriendRequest
+from ..models import FriendRequest, Friendship
 
 
 class FriendRequestView(viewsets.ModelViewSet):
@@ -49,14 +49,4 @@ class FriendshipView(generics.ListAPIView):
     
     def get_queryset(self):
         user = get_user_from_request(self.request)
-        sent_friend_requests = FriendRequest.objects.filter(
-            friend_requesting_user=user,
-        )
-        requested_user_pks = sent_friend_requests.values_list('friend_requested_user_id')
-        matched_friend_requests = FriendRequest.objects.filter(
-            friend_requesting_user__in=requested_user_pks,
-            friend_requested_user=user,
-        )
-        friend_pks = matched_friend_requests.values_list('friend_requesting_user')
-        friends = User.objects.filter(pk__in=friend_pks)
-        return friends
\ No newline at end of file
+        return User.objects.filter(id__in=Friendship.get_friend_ids(user.id))
@@ -10,7 +10,7 @@ from users.generics import get_user_from_request
 from users.models import UserNotification, User
 
 from ..serializers import MatchRequestSerializer, ReadOnlyUserSerializer
-from ..models import MatchRequest, Message
+from ..models import Match, MatchRequest, Message
 
 class MatchRequestView(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated, MatchRequestPermission)
@@ -47,8 +47,9 @@ class MatchRequestView(viewsets.ModelViewSet):
         match_request_response = super().create(request, *args, **kwargs)
         match_requested_user_id = match_request_response.data.get("match_requested_user")
 
-        request_will_complete_match = MatchRequest.objects.filter(
-            match_requesting_user_id=match_requested_user_id).exists()
+        match_requesting_user_id = match_request_response.data.get("match_requesting_user")
+        request_will_complete_match = Match.are_matched(
+            match_requesting_user_id, match_requested_user_id)
         
         # if request_will_complete_match:
         #     matched_post = MatchRequest.objects.filter(
@@ -78,7 +79,7 @@ class MatchRequestView(viewsets.ModelViewSet):
         message_sent_to_match = Q(sender=requesting, receiver=requested)
         messages_sent_from_match = Q(sender=requested, receiver=requesting)
         
-        Message.objects.filter(message_sent_to_match | messages_sent_from_match).update(is_hidden=True)
+        Message.hide(Message.objects.filter(message_sent_to_match | messages_sent_from_match))
 
         self.perform_destroy(instance)
 
@@ -90,14 +91,4 @@ class MatchView(generics.ListAPIView):
 
     def get_queryset(self):
         user = get_user_from_request(self.request)
-        sent_match_requests = MatchRequest.objects.filter(
-            match_requesting_user=user,
-        )
-        requested_user_pks = sent_match_requests.values_list('match_requested_user_id')
-        matched_match_requests = MatchRequest.objects.filter(
-            match_requesting_user__in=requested_user_pks,
-            match_requested_user=user,
-        )
-        matched_user_pks = matched_match_requests.values_list('match_requesting_user')
-        matched_users = User.objects.filter(pk__in=matched_user_pks)
-        return matched_users
+        return User.objects.filter(id__in=Match.get_matched_user_ids(user.id))
@@ -1,6 +1,7 @@
 from django.db.models import Q
 from push_notifications.models import APNSDevice
 from rest_framework import viewsets, generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
@@ -8,8 +9,9 @@ from mist.permissions import MessagePermission
 from users.generics import get_user_from_request
 from users.models import UserNotification, User
 
-from ..serializers import MessageSerializer
-from ..models import MatchRequest, Message
+from ..pagination import decode_cursor, encode_cursor, keyset_paginate
+from ..serializers import ConversationSerializer, MessageSerializer
+from ..models import Block, Conversation, Match, Message
 
 class MessageView(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated, MessagePermission)
@@ -31,16 +33,7 @@ class MessageView(viewsets.ModelViewSet):
         receiver = message_response.data.get("receiver")
         body = message_response.data.get("body")
 
-        sender_match_request = MatchRequest.objects.filter(
-            match_requesting_user=sender,
-            match_requested_user=receiver
-        )
-        receiver_match_request = MatchRequest.objects.filter(
-            match_requesting_user=receiver,
-            match_requested_user=sender,
-        )
-
-        if sender_match_request.exists() and receiver_match_request.exists():
+        if Match.are_matched(sender, receiver):
             username = User.objects.get(id=sender).username
             UserNotification.objects.create(
                 user_id=receiver,
@@ -53,39 +46,61 @@ class MessageView(viewsets.ModelViewSet):
 
 class ConversationView(generics.ListAPIView):
     permission_classes = (IsAuthenticated,)
+    serializer_class = ConversationSerializer
 
-    def list(self, request, *args, **kwargs):
-        requesting_user = get_user_from_request(request)
+    def get_queryset(self):
+        requesting_user = get_user_from_request(self.request)
+        return Conversation.objects.\
+            filter(user=requesting_user).\
+            exclude(counterpart__blockings__blocked_user=requesting_user).\
+            exclude(counterpart__blocks__blocking_user=requesting_user).\
+            select_related('last_message').\
+            order_by('-last_timestamp', '-id')
+
+class ThreadView(generics.ListAPIView):
+    """
+    Messages between the user and a counterpart, newest first.
+    Reading the first page marks the conversation as read.
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = MessageSerializer
 
-        conversations = {}
+    PAGE_SIZE = 50
+    ORDERING_FIELDS = ('timestamp', 'id')
 
-        sender_or_receiver_query = Q(sender=requesting_user) | Q(receiver=requesting_user)
-        exclude_blocks_query = \
-            Q(sender__blockings__blocked_user=requesting_user) | \
-            Q(receiver__blockings__blocked_user=requesting_user) | \
-            Q(sender__blocks__blocking_user=requesting_user) | \
-            Q(receiver__blocks__blocking_user=requesting_user)
-        exclude_hidden_query = Q(is_hidden=True)
+    def get_counterpart_id(self):
+        try:
+            return int(self.request.query_params.get('counterpart'))
+        except (TypeError, ValueError):
+            raise ValidationError({"counterpart": "Invalid counterpart"})
 
-        sent_or_received_messages = Message.objects.\
-            filter(sender_or_receiver_query).\
-            exclude(exclude_blocks_query).\
-            exclude(exclude_hidden_query).\
-            select_related('receiver').\
-            select_related('sender')
-            
-        for message in sent_or_received_messages:
-            opposite_pk = None
+    def get_queryset(self):
+        requesting_user = get_user_from_request(self.request)
+        counterpart_id = self.get_counterpart_id()
+        is_blocked = Block.objects.filter(
+            Q(blocking_user=requesting_user, blocked_user_id=counterpart_id) |
+            Q(blocking_user_id=counterpart_id, blocked_user=requesting_user)).exists()
+        if is_blocked: return Message.objects.none()
+        return Conversation.get_messages(requesting_user.id, counterpart_id)
 
-            if requesting_user == message.sender:
-                opposite_pk = message.receiver.pk
-            else:
-                opposite_pk = message.sender.pk
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        cursor = decode_cursor(request.query_params.get('cursor'))
+        page, next_position = keyset_paginate(
+            queryset,
+            self.ORDERING_FIELDS,
+            cursor.get('position'),
+            self.PAGE_SIZE)
+        next_cursor = None
+        if next_position:
+            next_cursor = encode_cursor({'position': next_position})
 
-            if opposite_pk not in conversations:
-                conversations[opposite_pk] = []
-            
-            message_data = MessageSerializer(message).data
-            conversations[opposite_pk].append(message_data)
+        if not cursor:
+            requesting_user = get_user_from_request(request)
+            Conversation.mark_read(requesting_user.id, self.get_counterpart_id())
 
-        return Response(conversations, status.HTTP_200_OK)
\ No newline at end of file
+        serializer = self.get_serializer(page, many=True)
+        return Response({
+            "next_cursor": next_cursor,
+            "results": serializer.data,
+        })
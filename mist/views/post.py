@@ -1,19 +1,23 @@
 from decimal import Decimal
 from enum import Enum
 import math
-from django.core.paginator import Paginator
-from django.db.models import Q, Count, Sum
-from django.db.models.expressions import RawSQL
+from django.db import transaction
+from django.db.models import F, Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, generics, status
 from rest_framework.response import Response
 from mist.permissions import PostPermission
 from rest_framework.permissions import IsAuthenticated
 
-from users.generics import get_user_from_request
+from users.generics import filter_nearby_coords, get_user_from_request
 
+from ..pagination import decode_cursor, encode_cursor, keyset_paginate
 from ..serializers import MistboxSerializer, PostSerializer
-from ..models import Feature, FriendRequest, MatchRequest, Mistbox, Post, Tag, get_current_time
+from ..trending import TRENDING_SNAPSHOT_SIZE, get_trending_snapshot
+from ..models import Feature, Friendship, Match, MatchRequest, Mistbox, Post, Tag, View, get_current_time
+
+TRENDING_NORM_CONSTANT = Post.TRENDING_NORM_CONSTANT
 
 class Order(Enum):
     RECENT = 0
@@ -33,13 +37,12 @@ class Order(Enum):
         return sum([flag.rating for flag in post.flags.all()])
 
     def trendscore(post):
-        NORM_CONSTANT = 100000
         try: post.viewcount
         except: post.viewcount = 0
         return sum(
             [vote.rating*
             (Order.commentcount(post)+1)*
-            math.pow(2, (post.timestamp-get_current_time())/NORM_CONSTANT)*
+            math.pow(2, (post.timestamp-get_current_time())/TRENDING_NORM_CONSTANT)*
             (1/(post.viewcount+1))
             for vote in post.votes.all()])
 
@@ -47,56 +50,168 @@ class Order(Enum):
         if Order.flagcount(post) > 0: return False
         return Order.votecount(post)*Order.votecount(post) >= Order.flagcount(post)
 
+    def annotate_scores(queryset, user):
+        """
+        SQL equivalents of the counts above, read from each
+        post's stats and a subquery of the user's views.
+        The trendscore itself is stored on the post.
+        """
+        views = View.objects.\
+            filter(post=OuterRef('pk'), user=user).\
+            values('post').\
+            annotate(total=Count('id')).\
+            values('total')
+        return queryset.annotate(
+            # uncoalesced, so BEST pages can seek the votecount index of the stats
+            total_votecount=F('stats__votecount'),
+            total_flagcount=Coalesce(F('stats__flagcount'), Value(0.0)),
+            total_commentcount=Coalesce(F('stats__commentcount'), Value(0)),
+            viewcount=Coalesce(Subquery(views, output_field=IntegerField()), Value(0)),
+        )
+
+    def viewed_trendscore(post):
+        # log-space equivalent of dividing the trendscore by viewcount+1
+        return post.trendscore - math.log2(post.viewcount+1)
+
+    def permissible_posts(queryset):
+        # votecount^2 >= flagcount always holds once flagcount <= 0
+        return queryset.filter(total_flagcount__lte=0)
+
 class PostView(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated, PostPermission,)
     serializer_class = PostSerializer
 
     # Max distance around post is 5 kilometers
     MAX_DISTANCE = Decimal(5)
+    PAGE_SIZE = 100
+    FILTER_PARAMETERS = (
+        'ids', 'latitude', 'longitude', 'radius', 'words', 'start_timestamp', 
+        'end_timestamp', 'location_description', 'author', 'cursor',
+    )
+    # unfiltered trending requests are served from
+    # the snapshot built by build_trending_snapshot_task
+    SERVES_TRENDING_SNAPSHOT = True
 
     def list(self, request, *args, **kwargs):
         user = get_user_from_request(request)
+        if self.is_trending_snapshot_request():
+            page = self.get_trending_snapshot_page(user)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return Response(serializer.data)
+
+        cursor = decode_cursor(request.query_params.get('cursor'))
 
         queryset = self.filter_queryset(self.get_queryset())
-        queryset = queryset.\
-            prefetch_related("votes", "comments", "flags", "views").\
-            annotate(viewcount=Count("views", filter=Q(views__user=user)))
+        queryset = Order.annotate_scores(queryset, user)
+        if self.is_search_request():
+            queryset = Post.rank_search(queryset, request.query_params.getlist('words'))
+        queryset = self.remove_impermissible_posts(queryset)
+        if self.get_ordering_fields()[0] == 'total_votecount':
+            # posts whose stats are missing until reconcile_post_stats have no votecount
+            queryset = queryset.filter(stats__isnull=False)
+
+        if 'cursor' in request.query_params:
+            page, next_position = keyset_paginate(
+                queryset, 
+                self.get_ordering_fields(), 
+                cursor.get('position'),
+                self.PAGE_SIZE)
+            next_cursor = None
+            if next_position:
+                next_cursor = encode_cursor({'position': next_position})
+            serializer = self.get_serializer(self.rank_page(page), many=True)
+            return Response({
+                "next_cursor": next_cursor,
+                "results": serializer.data,
+            })
 
         queryset = self.order_queryset(queryset)
         queryset = self.custom_paginate_queryset(queryset)
-        queryset = self.remove_impermissible_posts(queryset)
         
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(self.rank_page(queryset), many=True)
         return Response(serializer.data)
 
-    def custom_paginate_queryset(self, queryset):
+    def is_trending_snapshot_request(self):
+        if not self.SERVES_TRENDING_SNAPSHOT: return False
+        if self.get_ordering_fields()[0] != 'trendscore': return False
+        for parameter in self.FILTER_PARAMETERS:
+            if parameter in self.request.query_params: return False
+        return True
+
+    def get_trending_snapshot_page(self, user):
+        """
+        Hydrates only the posts of the requested page of the snapshot.
+        Returns None if the page has to come from the database instead.
+        """
+        trending_post_ids = get_trending_snapshot()
+        if trending_post_ids is None: return None
+
+        page_num = self.get_page_number()
+        if page_num < 1: return []
+        start = (page_num-1)*self.PAGE_SIZE
+        # pages beyond a full snapshot are left to the database
+        beyond_snapshot = start+self.PAGE_SIZE > len(trending_post_ids)
+        if beyond_snapshot and len(trending_post_ids) >= TRENDING_SNAPSHOT_SIZE: return None
+
+        page_post_ids = trending_post_ids[start:start+self.PAGE_SIZE]
+        # posts may have been hidden or flagged since the snapshot
+        queryset = Post.objects.filter(id__in=page_post_ids).\
+            select_related("stats").\
+            exclude(is_hidden=True).\
+            filter(is_moderated=True)
+        queryset = Order.annotate_scores(queryset, user)
+        queryset = self.remove_impermissible_posts(queryset)
+        return self.rank_page(queryset)
+
+    def get_page_number(self):
         page = self.request.query_params.get('page')
-        order = self.request.query_params.get('order')
-        paginator = Paginator(queryset, 100)
-        try:
-            page_num = int(page)
-            try: return paginator.page(page_num).object_list
-            except: return []
-        except:
-            if not order: return queryset
-            return paginator.page(1).object_list
+        try: return int(page)
+        except: return 1
 
-    def order_queryset(self, queryset):
+    def custom_paginate_queryset(self, queryset):
+        page_num = self.get_page_number()
+        if page_num < 1: return []
+        start = (page_num-1)*self.PAGE_SIZE
+        return queryset[start:start+self.PAGE_SIZE]
+
+    def is_search_request(self):
+        return any(self.request.query_params.getlist('words'))
+
+    def get_ordering_fields(self):
         order = self.request.query_params.get('order')
+        # searches are ranked by similarity unless an order is requested
+        if order is None and self.is_search_request():
+            return ('search_similarity', 'id')
 
         try:
             order_num = int(order)
             if order_num == Order.BEST.value:
-                return sorted(queryset, key=Order.votecount, reverse=True)
+                return ('total_votecount', 'id')
             elif order_num == Order.RECENT.value:
-                return sorted(queryset, key=Order.recent, reverse=True)
+                return ('timestamp', 'id')
             else:
-                return sorted(queryset, key=Order.trendscore, reverse=True)
+                return ('trendscore', 'id')
         except:
-            return sorted(queryset, key=Order.trendscore, reverse=True)
+            return ('trendscore', 'id')
+
+    def order_queryset(self, queryset):
+        ordering_fields = self.get_ordering_fields()
+        return queryset.order_by(*[f'-{field}' for field in ordering_fields])
+
+    def rank_page(self, page):
+        """
+        Pages are cut from the shared trendscore index, so the
+        user's views only reorder posts within their page.
+        """
+        if self.get_ordering_fields()[0] != 'trendscore': return page
+        return sorted(
+            page, 
+            key=lambda post: (Order.viewed_trendscore(post), post.id),
+            reverse=True)
 
     def remove_impermissible_posts(self, queryset):
-        return filter(Order.permissible_post, queryset)
+        return Order.permissible_posts(queryset)
 
     def get_queryset(self):
         """
@@ -126,11 +241,7 @@ class PostView(viewsets.ModelViewSet):
         if ids:
             queryset = queryset.filter(pk__in=ids)
         if words:
-            q = Q()
-            for word in words:
-                q &= (Q(title__icontains=word) | Q(body__icontains=word))
-                #q &= Q(body__icontains=word)
-            queryset = Post.objects.filter(q)
+            queryset = Post.search(words, queryset)
         if start_timestamp and end_timestamp:
             queryset = queryset.filter(
                 timestamp__gte=start_timestamp,
@@ -143,54 +254,35 @@ class PostView(viewsets.ModelViewSet):
             queryset = queryset.filter(author=author)
         
         return queryset.\
-            prefetch_related("votes", "comments", "flags").\
-            exclude(is_hidden=True)
+            select_related("stats").\
+            exclude(is_hidden=True).\
+            filter(is_moderated=True)
 
     def get_locations_nearby_coords(self, latitude, longitude, max_distance=MAX_DISTANCE):
         """
         Return objects sorted by distance to specified coordinates
         which distance is less than max_distance given in kilometers
         """
-        # Great circle distance formula
-        gcd_formula = "6371 * acos(least(greatest(\
-        cos(radians(%s)) * cos(radians(latitude)) \
-        * cos(radians(longitude) - radians(%s)) + \
-        sin(radians(%s)) * sin(radians(latitude)) \
-        , -1), 1))"
-        distance_raw_sql = RawSQL(
-            gcd_formula,
-            (latitude, longitude, latitude)
-        )
-        # make sure the latitude + longtitude exists
-        # make sure the distance is under the max
-        qs = Post.objects.all()\
-        .filter(latitude__isnull=False)\
-        .filter(longitude__isnull=False)\
-        .annotate(distance=distance_raw_sql)\
-        .order_by('distance')
-        # distance must be less than max distance
-        qs = qs.filter(distance__lt=max_distance)
-        return qs
+        return filter_nearby_coords(
+            Post.objects.all(), latitude, longitude, max_distance)
 
 
 class MatchedPostsView(PostView):
     permission_classes = (IsAuthenticated,)
     serializer_class = PostSerializer
 
+    SERVES_TRENDING_SNAPSHOT = False
+
     def get_queryset(self):
-        match_requests = MatchRequest.objects.all()
-        sent_request_pks = match_requests.values_list('match_requested_user_id',
-                                                    'match_requesting_user_id')
-        matched_requests = MatchRequest.objects.none()
-        for requested_user_pk, requesting_user_pk in sent_request_pks:
-            received_requests = MatchRequest.objects.filter(
-                                match_requesting_user=requested_user_pk,
-                                match_requested_user=requesting_user_pk)
-            matched_requests = matched_requests | received_requests
-        matched_post_pks = matched_requests.values_list('post')
+        mutual_matches = Match.objects.filter(
+            user=OuterRef('match_requesting_user'),
+            matched_user=OuterRef('match_requested_user'))
+        matched_post_pks = MatchRequest.objects.\
+            filter(Exists(mutual_matches)).\
+            values_list('post')
         matched_posts = Post.objects.filter(
             pk__in=matched_post_pks).\
-            prefetch_related("votes", "comments", "flags").\
+            select_related("stats").\
             order_by('-creation_time')
         return matched_posts
 
@@ -199,11 +291,13 @@ class FeaturedPostsView(PostView):
     permission_classes = (IsAuthenticated,)
     serializer_class = PostSerializer
 
+    SERVES_TRENDING_SNAPSHOT = False
+
     def get_queryset(self):
         featured_post_pks = Feature.objects.values_list('post')
         featured_posts = Post.objects.filter(
             pk__in=featured_post_pks).\
-            prefetch_related("votes", "comments", "flags").\
+            select_related("stats").\
             order_by('-creation_time')
         return featured_posts
 
@@ -212,47 +306,74 @@ class FriendPostsView(PostView):
     permission_classes = (IsAuthenticated,)
     serializer_class = PostSerializer
 
+    SERVES_TRENDING_SNAPSHOT = False
+
     def get_queryset(self):
         user = get_user_from_request(self.request)
-        sent_friend_requests = FriendRequest.objects.filter(
-            friend_requesting_user=user,
-        )
-        requested_user_pks = sent_friend_requests.values_list('friend_requested_user_id')
-        matched_friend_requests = FriendRequest.objects.filter(
-            friend_requesting_user__in=requested_user_pks,
-            friend_requested_user=user,
-        )
-        friend_pks = matched_friend_requests.values_list('friend_requesting_user')
-        return Post.objects.filter(author_id__in=friend_pks).\
-            prefetch_related("votes", "comments", "flags").\
+        return Post.objects.filter(author_id__in=Friendship.get_friend_ids(user.id)).\
+            select_related("stats").\
             order_by('-creation_time')
 
 
-class FavoritedPostsView(viewsets.ModelViewSet):
+class CreationTimePostsView(viewsets.ModelViewSet):
+    """
+    Lists posts newest first, one keyset page
+    at a time if a cursor parameter is given.
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = PostSerializer
+
+    PAGE_SIZE = 100
+    ORDERING_FIELDS = ('creation_time', 'id')
+
+    def list(self, request, *args, **kwargs):
+        if 'cursor' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        cursor = decode_cursor(request.query_params.get('cursor'))
+        queryset = self.filter_queryset(self.get_queryset())
+        page, next_position = keyset_paginate(
+            queryset, 
+            self.ORDERING_FIELDS, 
+            cursor.get('position'),
+            self.PAGE_SIZE)
+        next_cursor = None
+        if next_position:
+            next_cursor = encode_cursor({'position': next_position})
+        serializer = self.get_serializer(page, many=True)
+        return Response({
+            "next_cursor": next_cursor,
+            "results": serializer.data,
+        })
+
+
+class FavoritedPostsView(CreationTimePostsView):
     permission_classes = (IsAuthenticated,)
     serializer_class = PostSerializer
 
     def get_queryset(self):
         user = get_user_from_request(self.request)
         return Post.objects.filter(favorite__favoriting_user=user).\
-            prefetch_related("votes", "comments", "flags").\
+            select_related("stats").\
             order_by('-creation_time')
 
 
-class SubmittedPostsView(viewsets.ModelViewSet):
+class SubmittedPostsView(CreationTimePostsView):
     permission_classes = (IsAuthenticated,)
     serializer_class = PostSerializer
 
     def get_queryset(self):
         user = get_user_from_request(self.request)
         return Post.objects.filter(author=user).\
-            prefetch_related("votes", "comments", "flags").\
+            select_related("stats").\
             order_by('-creation_time')
 
 class TaggedPostsView(PostView):
     permission_classes = (IsAuthenticated, )
     serializer_class = PostSerializer
 
+    SERVES_TRENDING_SNAPSHOT = False
+
     def get_queryset(self):
         user = get_user_from_request(self.request)
         tags = Tag.objects.filter(tagged_user=user)
@@ -260,7 +381,7 @@ class TaggedPostsView(PostView):
             tagged_numbers = Tag.objects.filter(tagged_phone_number=user.phone_number)
             tags = (tags | tagged_numbers).distinct()
         tagged_posts = Post.objects.filter(comments__tags__in=tags).\
-            prefetch_related("votes", "comments", "flags").\
+            select_related("stats").\
             order_by('-comments__tags__timestamp')
         return tagged_posts
 
@@ -271,26 +392,27 @@ class MistboxView(generics.RetrieveUpdateAPIView):
     def retrieve(self, request, *args, **kwargs):
         mistbox = self.get_object()
         user = get_user_from_request(request)
-        
-        self.filter_mistbox_posts(mistbox, user)
 
-        serializer = self.get_serializer(mistbox)
+        context = self.get_serializer_context()
+        context['posts'] = self.get_unseen_posts(mistbox, user)
+        serializer = self.get_serializer(mistbox, context=context)
         return Response(serializer.data)
 
-    def filter_mistbox_posts(self, mistbox, user):
-        mistbox.posts.set(
-            sorted(
-                mistbox.posts.exclude(
-                    views__user=user
-                ).all(),
-                key=Order.recent,
-            )
-        )
+    def get_unseen_posts(self, mistbox, user):
+        """
+        Seen posts are left in the mistbox until prune_mistboxes_task
+        removes them, so reads never write to the mistbox.
+        """
+        return mistbox.posts.\
+            exclude(views__user=user).\
+            filter(is_moderated=True).\
+            select_related("stats").\
+            order_by('-timestamp', '-id')
 
     def get_object(self):
         user = get_user_from_request(self.request)
         return get_object_or_404(
-            Mistbox.objects.all().prefetch_related('posts'),
+            Mistbox.objects.all(),
             user=user,
         )
 
@@ -320,29 +442,27 @@ class DeleteMistboxPostView(generics.DestroyAPIView):
         post_id = self.request.query_params.get("post")
         opened = self.request.query_params.get("opened")
 
-        post = get_object_or_404(
-            Post.objects.all(),
-            id=post_id,
-        )
-        mistbox = get_object_or_404(
-            Mistbox.objects.all(),
-            user=user,
-        )
-
-        if post not in mistbox.posts.all():
-            return Response(None, status.HTTP_404_NOT_FOUND)
-        
-        mistbox.posts.remove(post)
-
-        if opened: mistbox.opens_used_today += 1
-
-        if opened and mistbox.opens_used_today + 1 > Mistbox.MAX_DAILY_SWIPES:
-            return Response(
-            {
-                "detail": "no opens left today"
-            }, 
-            status.HTTP_400_BAD_REQUEST)
-
-        mistbox.save()
+        # a swipe is a constant number of statements, and the
+        # open is only counted while the daily limit isn't reached
+        with transaction.atomic():
+            removed_posts, _ = Mistbox.posts.through.objects.filter(
+                mistbox__user=user,
+                post_id=post_id,
+            ).delete()
+            if not removed_posts:
+                return Response(None, status.HTTP_404_NOT_FOUND)
+
+            if opened:
+                counted_opens = Mistbox.objects.filter(
+                    user=user,
+                    opens_used_today__lt=Mistbox.MAX_DAILY_SWIPES,
+                ).update(opens_used_today=F('opens_used_today')+1)
+                if not counted_opens:
+                    transaction.set_rollback(True)
+                    return Response(
+                    {
+                        "detail": "no opens left today"
+                    }, 
+                    status.HTTP_400_BAD_REQUEST)
         
         return Response(None, status.HTTP_204_NO_CONTENT)
\ No newline at end of file
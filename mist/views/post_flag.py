@@ -1,12 +1,11 @@
 from rest_framework import viewsets
-from mist.generics import is_beyond_impermissible_post_limit
 from mist.permissions import FlagPermission
 from rest_framework.permissions import IsAuthenticated
 
 from users.models import Ban
 
-from ..serializers import PostFlagSerializer, PostSerializer
-from ..models import Post, PostFlag
+from ..serializers import PostFlagSerializer
+from ..models import ModerationLedger, Post, PostFlag
 
 class PostFlagView(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated, FlagPermission)
@@ -26,10 +25,6 @@ class PostFlagView(viewsets.ModelViewSet):
         post_flag_response = super().create(request, *args, **kwargs)
         post_id = post_flag_response.data.get("post")
         post_author = Post.objects.get(id=post_id).author
-        posts_by_author = Post.objects.filter(author=post_author)
-        serialized_posts_by_author = [
-            PostSerializer(post).data for post in posts_by_author
-        ]
-        if is_beyond_impermissible_post_limit(serialized_posts_by_author):
+        if ModerationLedger.is_beyond_impermissible_post_limit(post_author.id):
             Ban.objects.get_or_create(phone_number=post_author.phone_number)
         return post_flag_response
\ No newline at end of file
@@ -36,8 +36,7 @@ class TagView(viewsets.ModelViewSet):
             queryset = queryset.filter(tagged_name=tagged_name)
         if comment:
             queryset = queryset.filter(comment=comment)
-        return queryset.select_related('comment', 'comment__post').\
-            prefetch_related("comment__post__votes", "comment__post__comments", "comment__post__flags")
+        return queryset.select_related('comment', 'comment__post', 'comment__post__stats')
     
     def get_first_twenty_or_less_words(self, post_id):
         tagged_post = Post.objects.get(id=post_id)
@@ -2,6 +2,9 @@ import os
 import uuid
 import requests
 from celery import shared_task
+from celery.utils.log import get_task_logger
+
+logger = get_task_logger(__name__)
 
 @shared_task(name="send_mistbox_notifications_task")
 def send_mistbox_notifications_task():
@@ -43,9 +46,10 @@ def reset_mistbox_opens_task():
 
 def reset_mistbox_opens():
     from mist.models import Mistbox
-    for mistbox in Mistbox.objects.all():
-        mistbox.opens_used_today = 0
-        mistbox.save()
+    reset_mistboxes = Mistbox.objects.\
+        filter(opens_used_today__gt=0).\
+        update(opens_used_today=0)
+    logger.info(f"reset the opens of {reset_mistboxes} mistboxes")
 
 @shared_task(name="tally_random_upvotes_task")
 def tally_random_upvotes_task():
@@ -149,36 +153,315 @@ def send_daily_prompts_notification():
 def reset_prompts_task():
     reset_prompts()
 
-def reset_prompts():
+def reset_prompts(batch_size=1000):
+    """
+    Assigns every user new daily prompts among their unclaimed
+    collectibles, batch_size users at a time. Progress is saved after
+    each batch, so a rerun on the same day resumes where it stopped.
+    """
+    import datetime
     import random
 
+    from django.core.cache import cache
+
     from mist.models import Post
     from users.models import User
 
     NUMBER_OF_DAILY_COLLECTIBLES = 3
+    ALL_COLLECTIBLES = range(1, Post.NUMBER_OF_TOTAL_COLLECTIBLES+1)
+
+    progress_key = f'reset-prompts:{datetime.date.today().isoformat()}'
+    last_id = cache.get(progress_key, 0)
+    while True:
+        users = list(User.objects.\
+            filter(id__gt=last_id).\
+            order_by('id').\
+            only('id', 'collectibles')[:batch_size])
+        if not users: break
+
+        for user in users:
+            unclaimed_collectibles = [
+                collectible for collectible in ALL_COLLECTIBLES
+                if collectible not in user.collectibles
+            ]
+            user.daily_prompts = random.sample(
+                unclaimed_collectibles,
+                min(NUMBER_OF_DAILY_COLLECTIBLES, len(unclaimed_collectibles)))
+        User.objects.bulk_update(users, ['daily_prompts'])
+
+        last_id = users[-1].id
+        cache.set(progress_key, last_id, 24*60*60)
+        logger.info(f"reset the prompts of users up to {last_id}")
+
+@shared_task(name="renormalize_trendscores_task")
+def renormalize_trendscores_task():
+    renormalize_trendscores()
+
+def renormalize_trendscores(batch_size=10000):
+    """
+    Trendscores are kept up to date by votes and comments, so this
+    only repairs the ones that drifted, e.g. after bulk deletes.
+    Posts are compared batch_size ids at a time and only drifted
+    ones are rewritten. Returns the number of repaired posts.
+    """
+    from django.db.models import F, Max
+    from mist.models import Post
+
+    drifted_posts = Post.objects.\
+        annotate(expected_trendscore=Post.trendscore_expression()).\
+        exclude(trendscore=F('expected_trendscore'))
+    max_id = Post.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    repaired = 0
+    for start in range(0, max_id+1, batch_size):
+        drifted_ids = list(drifted_posts.\
+            filter(id__gte=start, id__lt=start+batch_size).\
+            values_list('id', flat=True))
+        if not drifted_ids: continue
+        Post.update_trendscores(Post.objects.filter(id__in=drifted_ids))
+        repaired += len(drifted_ids)
+    logger.info(f"repaired {repaired} trendscores")
+    return repaired
+
+@shared_task(name="build_trending_snapshot_task")
+def build_trending_snapshot_task():
+    build_trending_snapshot()
+
+def build_trending_snapshot():
+    from django.core.cache import cache
+    from mist.models import Post
+    from mist.trending import TRENDING_SNAPSHOT_KEY, TRENDING_SNAPSHOT_SIZE, TRENDING_SNAPSHOT_TIMEOUT
+
+    trending_post_ids = list(Post.objects.\
+        exclude(is_hidden=True).\
+        filter(is_moderated=True, stats__flagcount__lte=0).\
+        order_by('-trendscore', '-id').\
+        values_list('id', flat=True)[:TRENDING_SNAPSHOT_SIZE])
+    cache.set(TRENDING_SNAPSHOT_KEY, trending_post_ids, TRENDING_SNAPSHOT_TIMEOUT)
+    return trending_post_ids
+
+# lost tasks are left to requeue_pending_posts
+@shared_task(
+    name="ingest_post_task",
+    acks_late=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=5)
+def ingest_post_task(post_id):
+    ingest_post(post_id)
+
+def ingest_post(post_id):
+    """
+    Moderates a saved post and, the first time it is ingested, indexes
+    its words and delivers it to matching mistboxes. The post's
+    ingestion_key records which content was ingested, so retries and
+    duplicate deliveries of the task do nothing.
+    """
+    from django.db import transaction
+    from mist.models import Post
+
+    with transaction.atomic():
+        post = Post.objects.select_for_update().filter(id=post_id).first()
+        if not post: return False
+
+        ingestion_key = post.get_ingestion_key()
+        if post.ingestion_key == ingestion_key:
+            # the content may have been edited back to what was moderated
+            if not post.is_moderated:
+                Post.objects.filter(id=post_id).update(is_moderated=True)
+            return False
+
+        is_hidden = post.is_hidden or post.is_profane()
+        if post.ingestion_key is None:
+            words = post.get_words()
+            post.index_words(words)
+            post.deliver_to_mistboxes(words)
+
+        Post.objects.filter(id=post_id).update(
+            is_hidden=is_hidden,
+            ingestion_key=ingestion_key,
+            is_moderated=True)
+    return True
+
+# increments aren't idempotent, so lost adjustments are left to reconcile_words
+@shared_task(
+    name="adjust_word_occurrences_task",
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=5)
+def adjust_word_occurrences_task(texts, change):
+    adjust_word_occurrences(texts, change)
+
+def adjust_word_occurrences(texts, change):
+    from django.db import transaction
+    from mist.models import Word
+
+    # retries never apply part of an adjustment twice
+    with transaction.atomic():
+        Word.adjust_occurrences(texts, change)
+
+@shared_task(name="requeue_pending_posts_task")
+def requeue_pending_posts_task():
+    requeue_pending_posts()
+
+def requeue_pending_posts(batch_size=1000):
+    """
+    Restarts the ingestion of posts that are still unmoderated,
+    whose tasks may have been lost or run out of retries.
+    Duplicates of queued tasks do nothing, like retries.
+    """
+    from backend import celery_app
+    from mist.models import Post
+
+    post_ids = list(Post.objects.\
+        filter(is_moderated=False).\
+        order_by('id').\
+        values_list('id', flat=True)[:batch_size])
+    for post_id in post_ids:
+        celery_app.send_task(name="ingest_post_task", args=[post_id])
+    logger.info(f"requeued {len(post_ids)} pending posts")
+    return post_ids
+
+@shared_task(name="prune_mistboxes_task")
+def prune_mistboxes_task():
+    prune_mistboxes()
+
+def prune_mistboxes():
+    """
+    Removes the posts that mistbox owners have already seen,
+    which mistbox reads only filter out.
+    """
+    from django.db.models import Exists, OuterRef
+    from mist.models import Mistbox, View
+
+    MistboxPost = Mistbox.posts.through
+    seen_posts = View.objects.filter(
+        user_id=OuterRef('mistbox__user_id'),
+        post_id=OuterRef('post_id'))
+    MistboxPost.objects.filter(Exists(seen_posts)).delete()
 
-    users_to_update = User.objects.all().prefetch_related('posts')
-    for user in users_to_update:
+@shared_task(name="ban_impermissible_authors_task")
+def ban_impermissible_authors_task():
+    ban_impermissible_authors()
 
-        collectible_posts = user.posts.filter(collectible_type__isnull=False)
+def ban_impermissible_authors():
+    """
+    Bans the authors whose ledgers are beyond either impermissible
+    limit, catching up on ledgers fixed by reconcile_moderation_ledgers.
+    """
+    from django.db.models import Q
+    from mist.generics import IMPERMISSIBLE_COMMENT_LIMIT, IMPERMISSIBLE_POST_LIMIT
+    from mist.models import ModerationLedger
+    from users.models import Ban
 
-        claimed_collectibles = []
+    phone_numbers = list(ModerationLedger.objects.\
+        filter(
+            Q(impermissible_posts__gt=IMPERMISSIBLE_POST_LIMIT) |
+            Q(impermissible_comments__gt=IMPERMISSIBLE_COMMENT_LIMIT)).\
+        filter(user__is_banned=False, user__phone_number__isnull=False).\
+        values_list('user__phone_number', flat=True))
+    for phone_number in phone_numbers:
+        Ban.objects.get_or_create(phone_number=phone_number)
+    logger.info(f"banned {len(phone_numbers)} impermissible authors")
 
-        for post in collectible_posts:
-            claimed_collectibles.append(post.collectible_type)
-        
-        unclaimed_collectibles = [
-            collectible for collectible in range(1, Post.NUMBER_OF_TOTAL_COLLECTIBLES+1)
-            if collectible not in claimed_collectibles
+@shared_task(name="dispatch_notifications_task")
+def dispatch_notifications_task():
+    dispatch_notifications()
+
+def dispatch_notifications(batch_size=500):
+    """
+    Drains the notification outbox batch_size rows at a time. Each user's
+    pending notifications are coalesced into one push with the latest alert
+    and the current badge count, and a batch's pushes share one connection.
+    Pushes that fail are retried with exponential backoff.
+
+    Rows are claimed for CLAIM_TIMEOUT seconds in one short transaction
+    and marked in another, so no locks are held while APNS is sending.
+    """
+    from collections import defaultdict
+    from django.db import transaction
+    from django.db.models import Count, F, Value
+    from django.db.models.functions import Power
+    from push_notifications.models import APNSDevice
+    from users.generics import get_current_time
+    from users.models import NotificationOutbox, User, UserNotification
+    from users.push import SUCCESS, UNREGISTERED_REASONS, Push, get_push_sender
+
+    while True:
+        with transaction.atomic():
+            now = get_current_time()
+            batch = list(NotificationOutbox.objects.\
+                filter(next_attempt_time__lte=now).\
+                select_related('notification').\
+                select_for_update(skip_locked=True, of=('self',)).\
+                order_by('id')[:batch_size])
+            if not batch: return
+            # rows of runs that died while sending are claimed again later
+            NotificationOutbox.objects.\
+                filter(id__in=[row.id for row in batch]).\
+                update(next_attempt_time=now+NotificationOutbox.CLAIM_TIMEOUT)
+
+        rows_by_user = defaultdict(list)
+        for row in batch:
+            rows_by_user[row.user_id].append(row)
+        badgecounts = dict(UserNotification.objects.\
+            filter(user_id__in=rows_by_user.keys()).\
+            filter(type__in=UserNotification.COUNTABLE_BADGES).\
+            exclude(has_been_seen=True).\
+            values('user_id').\
+            annotate(count=Count('id')).\
+            values_list('user_id', 'count'))
+        badges_enabled = dict(User.objects.\
+            filter(id__in=rows_by_user.keys()).\
+            values_list('id', 'notification_badges_enabled'))
+        registration_ids = defaultdict(list)
+        for user_id, registration_id in APNSDevice.objects.\
+            filter(user_id__in=rows_by_user.keys(), active=True).\
+            values_list('user_id', 'registration_id'):
+            registration_ids[user_id].append(registration_id)
+
+        pushes = []
+        for user_id, rows in rows_by_user.items():
+            if not registration_ids[user_id]: continue
+            notifications = [row.notification for row in rows if row.notification]
+            latest = max(notifications, key=lambda notification: (notification.timestamp, notification.id), default=None)
+            pushes.append(Push(
+                user_id=user_id,
+                registration_ids=registration_ids[user_id],
+                alert=latest.message if latest else None,
+                badge=badgecounts.get(user_id, 0) if badges_enabled.get(user_id) else 0,
+                extra={"type": latest.type, "data": latest.data} if latest else None,
+            ))
+
+        try:
+            results = get_push_sender().send(pushes)
+        except Exception:
+            logger.exception(f"failed to send {len(pushes)} pushes")
+            results = {}
+        unregistered_ids = [
+            registration_id for registration_id, result in results.items()
+            if result in UNREGISTERED_REASONS
         ]
-        
-        daily_prompts = []
-        for _ in range(NUMBER_OF_DAILY_COLLECTIBLES):
-            if unclaimed_collectibles:
-                prompt = random.choice(unclaimed_collectibles)
-                unclaimed_collectibles.remove(prompt)
-                daily_prompts.append(prompt)
-        
-        user.daily_prompts = daily_prompts
-
-    users_to_update.bulk_update(users_to_update, ['daily_prompts']) 
\ No newline at end of file
+        failed_users = set(
+            push.user_id for push in pushes
+            if any(results.get(registration_id) not in (SUCCESS, *UNREGISTERED_REASONS)
+                for registration_id in push.registration_ids)
+        )
+        failed_rows = [row.id for row in batch if row.user_id in failed_users]
+
+        with transaction.atomic():
+            APNSDevice.objects.filter(registration_id__in=unregistered_ids).update(active=False)
+            NotificationOutbox.objects.\
+                filter(id__in=[row.id for row in batch]).\
+                exclude(id__in=failed_rows).\
+                delete()
+            abandoned_rows = NotificationOutbox.objects.\
+                filter(id__in=failed_rows, attempts__gte=NotificationOutbox.MAX_ATTEMPTS-1)
+            if abandoned_rows.exists():
+                logger.warning(f"abandoned {abandoned_rows.count()} notifications")
+            abandoned_rows.delete()
+            NotificationOutbox.objects.\
+                filter(id__in=failed_rows).\
+                update(
+                    attempts=F('attempts')+1,
+                    next_attempt_time=Value(get_current_time())+NotificationOutbox.RETRY_DELAY*Power(2, F('attempts')))
+        logger.info(f"sent {len(pushes)-len(failed_users)} pushes, retrying {len(failed_users)}")
@@ -1,15 +1,19 @@
 import os
 from unittest import skipIf
+from django.core.cache import cache
 from django.test import TestCase
 
 # Create your tests here.
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from unittest.mock import patch
 
-from mist_worker.tasks import reset_mistbox_opens, reset_prompts, send_mistbox_notifications, tally_random_upvotes, verify_profile_picture
-from mist.models import Mistbox, Post, PostVote
+from mist_worker.tasks import ban_impermissible_authors, build_trending_snapshot, dispatch_notifications, ingest_post, prune_mistboxes, renormalize_trendscores, requeue_pending_posts, reset_mistbox_opens, reset_prompts, send_mistbox_notifications, tally_random_upvotes, verify_profile_picture
+from mist.models import Mistbox, ModerationLedger, Post, PostStats, PostVote, View, Word
+from mist.trending import get_trending_snapshot
 from push_notifications.models import APNSDevice
-from users.models import User
+from users.generics import get_current_time
+from users.models import Ban, NotificationOutbox, User, UserNotification
+from users.push import FakeAPNSSender
 from users.tests.generics import create_dummy_user_and_token_given_id, create_simple_uploaded_file_from_image_path
 
 # Create your tests here.
@@ -87,6 +91,79 @@ class TasksTest(TestCase):
         for mistbox in Mistbox.objects.all():
             self.assertEqual(mistbox.opens_used_today, 0)
 
+    def test_renormalize_trendscores(self):
+        PostVote.objects.create(voter=self.user1, post=self.post1)
+        trendscore = Post.objects.get(id=self.post1.id).trendscore
+        Post.objects.update(trendscore=0)
+        PostStats.objects.filter(post=self.post2).update(votecount=2)
+
+        self.assertEqual(renormalize_trendscores(batch_size=1), Post.objects.count())
+
+        self.assertEqual(Post.objects.get(id=self.post1.id).trendscore, trendscore)
+        self.assertGreater(Post.objects.get(id=self.post2.id).trendscore, trendscore)
+        self.assertEqual(Post.objects.get(id=self.post3.id).trendscore, float('-inf'))
+        self.assertEqual(renormalize_trendscores(), 0)
+
+    def test_build_trending_snapshot(self):
+        self.addCleanup(cache.clear)
+        PostVote.objects.create(voter=self.user1, post=self.post1)
+        self.post2.is_hidden = True
+        self.post2.save()
+
+        build_trending_snapshot()
+
+        self.assertEqual(get_trending_snapshot(), [self.post1.id, self.post3.id])
+
+    def test_ingest_post_should_not_deliver_twice(self):
+        mistbox = Mistbox.objects.create(user=self.user1, keywords=['delivered'])
+        post = Post.objects.create(
+            title='delivered',
+            body='once',
+            author=self.user2,
+        )
+        mistbox.posts.remove(post)
+
+        self.assertFalse(ingest_post(post.id))
+        self.assertNotIn(post, mistbox.posts.all())
+        self.assertEqual(Word.objects.filter(text='delivered').count(), 1)
+
+    def test_ingest_post_should_moderate_edited_post(self):
+        self.post1.body = 'fuck'
+        self.post1.save()
+
+        self.assertTrue(Post.objects.get(id=self.post1.id).is_hidden)
+        self.assertFalse(ingest_post(self.post1.id))
+        self.assertFalse(Word.objects.filter(text='fuck').exists())
+
+    @patch('backend.celery_app.send_task')
+    def test_requeue_pending_posts(self, send_task):
+        with override_settings(POST_INGESTION_SYNC=False):
+            post = Post.objects.create(
+                title='pending',
+                body='post',
+                author=self.user2,
+            )
+
+        self.assertEqual(requeue_pending_posts(), [post.id])
+        send_task.assert_called_once_with(name="ingest_post_task", args=[post.id])
+
+        ingest_post(post.id)
+
+        self.assertTrue(Post.objects.get(id=post.id).is_moderated)
+        self.assertEqual(requeue_pending_posts(), [])
+
+    def test_prune_mistboxes(self):
+        mistbox = Mistbox.objects.create(user=self.user1, keywords=['these'])
+        mistbox.posts.add(self.post1, self.post2)
+        other_mistbox = Mistbox.objects.create(user=self.user3, keywords=['these'])
+        other_mistbox.posts.add(self.post1)
+        View.objects.create(post=self.post1, user=self.user1)
+
+        prune_mistboxes()
+
+        self.assertEqual(list(mistbox.posts.all()), [self.post2])
+        self.assertEqual(list(other_mistbox.posts.all()), [self.post1])
+
     def test_tally_random_upvotes(self):
         tally_random_upvotes()
         post_votes_1 = PostVote.objects.filter(post=self.post1)
@@ -118,6 +195,8 @@ class TasksTest(TestCase):
     #         self.assertIn('mist', notification)
 
     def test_reset_prompts(self):
+        self.addCleanup(cache.clear)
+
         def exhaust_all_minus_one_collectible(user):
             for i in range(1, Post.NUMBER_OF_TOTAL_COLLECTIBLES):
                 Post.objects.create(
@@ -138,4 +217,102 @@ class TasksTest(TestCase):
         self.assertEqual(len(User.objects.get(id=self.user2.id).daily_prompts), 3)
         self.assertEqual(len(User.objects.get(id=self.user3.id).daily_prompts), 3)
 
-        self.assertNotEqual(User.objects.get(id=self.user2.id).daily_prompts, [0, 0, 0])
\ No newline at end of file
+        self.assertNotEqual(User.objects.get(id=self.user2.id).daily_prompts, [0, 0, 0])
+
+    def test_reset_prompts_should_resume_after_last_batch(self):
+        self.addCleanup(cache.clear)
+        User.objects.update(daily_prompts=[0, 0, 0])
+
+        reset_prompts(batch_size=2)
+        User.objects.update(daily_prompts=[0, 0, 0])
+        reset_prompts(batch_size=2)
+
+        for user in User.objects.all():
+            self.assertEqual(user.daily_prompts, [0, 0, 0])
+
+    def test_reset_mistbox_opens_should_only_reset_used_opens(self):
+        Mistbox.objects.create(user=self.user1, opens_used_today=3)
+        Mistbox.objects.create(user=self.user2)
+
+        reset_mistbox_opens()
+
+        self.assertFalse(Mistbox.objects.filter(opens_used_today__gt=0).exists())
+
+    def test_ban_impermissible_authors(self):
+        ModerationLedger.objects.create(user=self.user1, impermissible_posts=11)
+        ModerationLedger.objects.create(user=self.user2, impermissible_comments=10)
+
+        ban_impermissible_authors()
+
+        self.assertTrue(Ban.objects.filter(phone_number=self.user1.phone_number))
+        self.assertFalse(Ban.objects.filter(phone_number=self.user2.phone_number))
+
+    def test_dispatch_notifications_coalesces_notifications_per_user(self):
+        FakeAPNSSender.reset()
+        self.addCleanup(FakeAPNSSender.reset)
+        UserNotification.objects.create(
+            user=self.user1,
+            type=UserNotification.NotificationTypes.COMMENT,
+            message='first',
+            timestamp=0)
+        UserNotification.objects.create(
+            user=self.user1,
+            type=UserNotification.NotificationTypes.MESSAGE,
+            message='second',
+            timestamp=1)
+
+        dispatch_notifications()
+
+        self.assertEqual(len(FakeAPNSSender.sent_pushes), 1)
+        push = FakeAPNSSender.sent_pushes[0]
+        self.assertEqual(sorted(push.registration_ids), ['1', '2'])
+        self.assertEqual(push.alert, 'second')
+        self.assertEqual(push.badge, 2)
+        self.assertEqual(push.extra['type'], UserNotification.NotificationTypes.MESSAGE)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_dispatch_notifications_retries_failed_pushes(self):
+        FakeAPNSSender.reset()
+        self.addCleanup(FakeAPNSSender.reset)
+        FakeAPNSSender.failures = {'1': 'ServiceUnavailable', '2': 'Unregistered'}
+        UserNotification.objects.create(
+            user=self.user1,
+            type=UserNotification.NotificationTypes.COMMENT,
+            message='retried')
+
+        dispatch_notifications()
+
+        outbox = NotificationOutbox.objects.get()
+        self.assertEqual(outbox.attempts, 1)
+        self.assertFalse(APNSDevice.objects.get(registration_id='2').active)
+
+        FakeAPNSSender.failures = {}
+        dispatch_notifications()
+        self.assertEqual(len(FakeAPNSSender.sent_pushes), 1)
+
+        NotificationOutbox.objects.update(next_attempt_time=0)
+        dispatch_notifications()
+        self.assertEqual(len(FakeAPNSSender.sent_pushes), 2)
+        self.assertEqual(FakeAPNSSender.sent_pushes[1].registration_ids, ['1'])
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_dispatch_notifications_claims_rows_before_sending(self):
+        FakeAPNSSender.reset()
+        self.addCleanup(FakeAPNSSender.reset)
+        UserNotification.objects.create(
+            user=self.user1,
+            type=UserNotification.NotificationTypes.COMMENT,
+            message='claimed')
+        claimed_rows = []
+        send = FakeAPNSSender.send
+        def send_and_record_claims(sender, pushes):
+            claimed_rows.extend(NotificationOutbox.objects.\
+                filter(next_attempt_time__gt=get_current_time()))
+            return send(sender, pushes)
+
+        with patch.object(FakeAPNSSender, 'send', send_and_record_claims):
+            dispatch_notifications()
+
+        self.assertEqual(len(claimed_rows), 1)
+        self.assertEqual(len(FakeAPNSSender.sent_pushes), 1)
+        self.assertFalse(NotificationOutbox.objects.exists())
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+import time
+import uuid
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Token Authentication
+TOKENS_VERSION_KEY = 'auth-tokens-version'
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TIMEOUT = 60
+
+class TokenCache:
+    """
+    Least recently used token keys mapped to their users' ids,
+    each kept for at most TOKEN_CACHE_TIMEOUT seconds.
+    """
+    def __init__(self):
+        self.user_ids = OrderedDict()
+
+    def get(self, key):
+        if key not in self.user_ids: return None
+        user_id, expiration_time = self.user_ids[key]
+        if time.monotonic() > expiration_time:
+            del self.user_ids[key]
+            return None
+        self.user_ids.move_to_end(key)
+        return user_id
+
+    def set(self, key, user_id):
+        self.user_ids[key] = (user_id, time.monotonic()+TOKEN_CACHE_TIMEOUT)
+        self.user_ids.move_to_end(key)
+        if len(self.user_ids) > TOKEN_CACHE_SIZE:
+            self.user_ids.popitem(last=False)
+
+    def delete(self, key):
+        self.user_ids.pop(key, None)
+
+_tokens = TokenCache()
+_tokens_version = None
+
+def invalidate_token_cache():
+    cache.set(TOKENS_VERSION_KEY, str(uuid.uuid4()), None)
+
+def get_token_cache():
+    """
+    Returns this process's token cache, emptied whenever
+    tokens were deleted in any process since.
+    """
+    global _tokens, _tokens_version
+    version = cache.get(TOKENS_VERSION_KEY)
+    if version is None:
+        invalidate_token_cache()
+        version = cache.get(TOKENS_VERSION_KEY)
+    if _tokens_version != version:
+        _tokens = TokenCache()
+        _tokens_version = version
+    return _tokens
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that skips the token lookup for
+    recently seen keys, leaving a single user fetch.
+    """
+    def authenticate_credentials(self, key):
+        from .models import User
+
+        tokens = get_token_cache()
+        user_id = tokens.get(key)
+        if user_id is None:
+            user, token = super().authenticate_credentials(key)
+            tokens.set(key, user.id)
+            return (user, token)
+
+        user = User.objects.filter(id=user_id).first()
+        if not user:
+            tokens.delete(key)
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return (user, Token(key=key, user=user))
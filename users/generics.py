@@ -1,15 +1,79 @@
+import math
 import uuid
+from django.db.models.expressions import RawSQL
 from rest_framework.authtoken.models import Token
 from datetime import datetime
 import random
 
+EARTH_RADIUS = 6371
+
 def get_user_from_request(request):
     if not request or not request.auth: return None
+    # authentication already resolved the token's user once per request
+    user = getattr(request, 'user', None)
+    if user and user.is_authenticated: return user
     matching_tokens = Token.objects.filter(key=request.auth)
     if not matching_tokens: return None
     matching_token = matching_tokens[0]
     return matching_token.user
 
+def get_bounding_box(latitude, longitude, distance):
+    """
+    Return the (min_latitude, max_latitude, min_longitude, max_longitude)
+    box containing every point within distance kilometers of the coordinates.
+    Longitudes are unbounded (None) if the box reaches a pole or the antimeridian.
+    """
+    angular_distance = distance/EARTH_RADIUS
+    latitude_delta = math.degrees(angular_distance)
+    min_latitude = latitude - latitude_delta
+    max_latitude = latitude + latitude_delta
+    if min_latitude <= -90 or max_latitude >= 90:
+        return (min_latitude, max_latitude, None, None)
+
+    longitude_delta = math.degrees(math.asin(
+        math.sin(angular_distance)/math.cos(math.radians(latitude))))
+    min_longitude = longitude - longitude_delta
+    max_longitude = longitude + longitude_delta
+    if min_longitude < -180 or max_longitude > 180:
+        return (min_latitude, max_latitude, None, None)
+    return (min_latitude, max_latitude, min_longitude, max_longitude)
+
+def filter_nearby_coords(queryset, latitude, longitude, max_distance):
+    """
+    Return objects sorted by distance to specified coordinates
+    which distance is less than max_distance given in kilometers.
+    The (latitude, longitude) index narrows the rows down to a
+    bounding box, so the exact distance is only computed for those.
+    """
+    if latitude is None or longitude is None: return queryset.none()
+    latitude, longitude, max_distance = float(latitude), float(longitude), float(max_distance)
+
+    min_latitude, max_latitude, min_longitude, max_longitude = get_bounding_box(
+        latitude, longitude, max_distance)
+    queryset = queryset.filter(
+        latitude__gte=min_latitude,
+        latitude__lte=max_latitude)
+    if min_longitude is not None:
+        queryset = queryset.filter(
+            longitude__gte=min_longitude,
+            longitude__lte=max_longitude)
+
+    # Great circle distance formula
+    gcd_formula = "%s * acos(least(greatest(\
+    cos(radians(%s)) * cos(radians(latitude)) \
+    * cos(radians(longitude) - radians(%s)) + \
+    sin(radians(%s)) * sin(radians(latitude)) \
+    , -1), 1))"
+    distance_raw_sql = RawSQL(
+        gcd_formula,
+        (EARTH_RADIUS, latitude, longitude, latitude)
+    )
+    return queryset.\
+        filter(longitude__isnull=False).\
+        annotate(distance=distance_raw_sql).\
+        filter(distance__lt=max_distance).\
+        order_by('distance')
+
 def get_random_code():
     return f'{random.randint(0, 999_999):06}'
 
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.10 on 2026-10-18 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0054_alter_usernotification_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['latitude', 'longitude'], name='user_latitude_longitude_idx'),
+        ),
+    ]
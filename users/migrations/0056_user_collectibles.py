@@ -0,0 +1,34 @@
+# Generated by Django 4.0.10 on 2026-10-18 02:20
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mist', '0074_alter_post_author'),
+        ('users', '0055_user_latitude_longitude_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='collectibles',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), blank=True, default=list, size=None),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE auth_user
+            SET collectibles = collected.collectibles
+            FROM (
+                SELECT author_id, ARRAY_AGG(collectible_type ORDER BY collectible_type) AS collectibles
+                FROM mist_post
+                WHERE collectible_type IS NOT NULL
+                GROUP BY author_id
+            ) AS collected
+            WHERE auth_user.id = collected.author_id;
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,15 +1,16 @@
 import os
-from push_notifications.models import APNSDevice
 import random
 from datetime import datetime
 from django.contrib.auth.models import AbstractUser
 from django.contrib.postgres.fields import ArrayField
 from django.core.files.base import ContentFile
 from rest_framework.authtoken.models import Token
-from django.db import models
+from django.db import models, transaction
 from phonenumber_field.modelfields import PhoneNumberField
 from sorl.thumbnail import get_thumbnail
 
+from .authentication import invalidate_token_cache
+from .realtime import RealtimeEventTypes, publish_event
 from .generics import get_current_time, get_default_date_of_birth, get_empty_prompts, get_random_sillouhette_image, get_random_code, get_random_email
 
 class User(AbstractUser):
@@ -61,12 +62,25 @@ class User(AbstractUser):
     is_banned = models.BooleanField(default=False)
     notification_badges_enabled = models.BooleanField(default=False)
     daily_prompts = ArrayField(models.PositiveIntegerField(), size=NUMBER_OF_PROMPTS, default=get_empty_prompts)
+    # sorted collectible types of the user's posts, kept by Post.save and Post.delete
+    collectibles = ArrayField(models.PositiveIntegerField(), default=list, blank=True)
     is_test_user = models.BooleanField(default=False)
 
     class Meta:
         db_table = 'auth_user'
+        indexes = [
+            # nearby bounding box prefilter
+            models.Index(fields=['latitude', 'longitude'], name='user_latitude_longitude_idx'),
+        ]
     
     def save(self, *args, **kwargs):
+        # collectibles are only written by Post.update_collectibles,
+        # so saving a stale user never overwrites them
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'collectibles'
+            ]
         super().save(*args, **kwargs)
         
         if not self.picture and not self.is_test_user:
@@ -140,6 +154,7 @@ class Ban(models.Model):
             Token.objects.filter(user=user).delete()
             user.is_banned = True
             user.save()
+        invalidate_token_cache()
 
 class UserNotification(models.Model):
     class NotificationTypes:
@@ -172,34 +187,35 @@ class UserNotification(models.Model):
     has_been_seen = models.BooleanField(default=False)
 
     def update_badges(user):
-        badgecount = UserNotification.objects.\
-            filter(user=user).\
-            filter(type__in=UserNotification.COUNTABLE_BADGES).\
-            exclude(has_been_seen=True).\
-            count()
-        if not user.notification_badges_enabled:
-            badgecount = 0
-        APNSDevice.objects.filter(user=user).\
-            send_message(
-                None, 
-                badge=badgecount,
-                extra=None,
-            )
+        NotificationOutbox.objects.create(user=user)
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        badgecount = UserNotification.objects.\
-            filter(user=self.user).\
-            filter(type__in=UserNotification.COUNTABLE_BADGES).\
-            exclude(has_been_seen=True).\
-            count()
-        if not self.user.notification_badges_enabled:
-            badgecount = 0
-        APNSDevice.objects.filter(user=self.user).send_message(
-            self.message,
-            badge=badgecount,
-            extra={
+        is_new = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                NotificationOutbox.objects.create(user_id=self.user_id, notification=self)
+        if is_new:
+            publish_event([self.user_id], RealtimeEventTypes.NOTIFICATION, {
+                "id": self.id,
                 "type": self.type,
+                "message": self.message,
                 "data": self.data,
-            }
-        )
\ No newline at end of file
+                "timestamp": self.timestamp,
+            })
+
+class NotificationOutbox(models.Model):
+    """
+    Pushes waiting to be sent, written in the same transaction as their
+    notifications and drained by dispatch_notifications. Rows without
+    a notification only refresh the user's badge.
+    """
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = 30
+    # seconds a dispatch has to send its claimed rows
+    CLAIM_TIMEOUT = 300
+
+    user = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    notification = models.ForeignKey(UserNotification, related_name='+', null=True, on_delete=models.CASCADE)
+    attempts = models.IntegerField(default=0)
+    next_attempt_time = models.FloatField(default=get_current_time, db_index=True)
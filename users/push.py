@@ -0,0 +1,63 @@
+from collections import namedtuple
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Push Notifications
+SUCCESS = "Success"
+# the device is gone for good, so retrying would never succeed
+UNREGISTERED_REASONS = ("Unregistered", "BadDeviceToken", "DeviceTokenNotForTopic")
+
+Push = namedtuple('Push', ['user_id', 'registration_ids', 'alert', 'badge', 'extra'])
+
+class APNSSender:
+    """
+    Sends every push of a batch over a single APNS connection.
+    """
+    def send(self, pushes):
+        """
+        Returns each registration id's result, either SUCCESS
+        or the reason APNS gave for rejecting it.
+        """
+        from apns2.client import Notification
+        from push_notifications.apns import _apns_create_socket, _apns_prepare
+        from push_notifications.conf import get_manager
+
+        notifications = [
+            Notification(
+                token=registration_id,
+                payload=_apns_prepare(registration_id, push.alert, badge=push.badge, extra=push.extra))
+            for push in pushes
+            for registration_id in push.registration_ids
+        ]
+        if not notifications: return {}
+
+        client = _apns_create_socket()
+        results = client.send_notification_batch(notifications, get_manager().get_apns_topic())
+        # rejections of unregistered devices come with a timestamp
+        return {
+            registration_id: result[0] if isinstance(result, tuple) else result
+            for registration_id, result in results.items()
+        }
+
+class FakeAPNSSender:
+    """
+    Records pushes instead of sending them, for tests and local development.
+    Registration ids in failures are rejected with their reason.
+    """
+    sent_pushes = []
+    failures = {}
+
+    def send(self, pushes):
+        results = {}
+        for push in pushes:
+            for registration_id in push.registration_ids:
+                results[registration_id] = FakeAPNSSender.failures.get(registration_id, SUCCESS)
+            FakeAPNSSender.sent_pushes.append(push)
+        return results
+
+    def reset():
+        FakeAPNSSender.sent_pushes = []
+        FakeAPNSSender.failures = {}
+
+def get_push_sender():
+    return import_string(settings.PUSH_NOTIFICATION_SENDER)()
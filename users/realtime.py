@@ -0,0 +1,171 @@
+import asyncio
+from contextlib import asynccontextmanager
+import json
+import logging
+import threading
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework import exceptions
+
+from .authentication import CachedTokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+# Realtime Events
+class RealtimeEventTypes:
+    MESSAGE = "message"
+    MATCH_REQUEST = "matchrequest"
+    NOTIFICATION = "notification"
+
+WEBSOCKET_PATH = '/ws/'
+UNAUTHORIZED_CLOSE_CODE = 4001
+
+def get_user_channel(user_id):
+    return f'realtime:user:{user_id}'
+
+class InMemoryPubSub:
+    """
+    Pub/sub between the threads of a single process,
+    standing in for redis in tests and local development.
+    """
+    def __init__(self):
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self.lock:
+            self.subscribers.setdefault(channel, set()).add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self.lock:
+                self.subscribers[channel].discard(subscriber)
+                if not self.subscribers[channel]: del self.subscribers[channel]
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self):
+        while True:
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            if message and message['type'] == 'message':
+                return message['data'].decode()
+
+class RedisPubSub:
+    """
+    Pub/sub across every web and worker process through redis.
+    """
+    def __init__(self):
+        import redis
+        self.url = settings.REALTIME_REDIS_URL
+        self.options = getattr(settings, 'REALTIME_REDIS_OPTIONS', {})
+        self.client = redis.Redis.from_url(self.url, **self.options)
+
+    def publish(self, channel, message):
+        import redis
+        try:
+            self.client.publish(channel, message)
+        except redis.RedisError:
+            # clients fall back to polling, so a lost event isn't fatal
+            logger.exception(f"failed to publish to {channel}")
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        from redis import asyncio as aioredis
+        client = aioredis.Redis.from_url(self.url, **self.options)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            yield RedisSubscription(pubsub)
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+_pubsub = None
+
+def get_pubsub():
+    """
+    Returns this process's REALTIME_PUBSUB_BACKEND.
+    """
+    global _pubsub
+    if _pubsub is None:
+        _pubsub = import_string(settings.REALTIME_PUBSUB_BACKEND)()
+    return _pubsub
+
+def publish_event(user_ids, type, data):
+    """
+    Pushes the event to every connection of the users once the
+    current transaction commits, so rolled back writes are never pushed.
+    """
+    message = json.dumps({"type": type, "data": data}, cls=DjangoJSONEncoder)
+
+    def publish():
+        for user_id in set(user_ids):
+            get_pubsub().publish(get_user_channel(user_id), message)
+    transaction.on_commit(publish)
+
+def get_token_key(scope):
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    if token: return token[0]
+    headers = dict(scope.get('headers', []))
+    authorization = headers.get(b'authorization', b'').decode().split()
+    if len(authorization) == 2 and authorization[0] == 'Token':
+        return authorization[1]
+    return None
+
+async def authenticate_websocket(scope):
+    key = get_token_key(scope)
+    if not key: return None
+    authenticate = CachedTokenAuthentication().authenticate_credentials
+    try:
+        user, _ = await sync_to_async(authenticate)(key)
+    except exceptions.AuthenticationFailed:
+        return None
+    return user
+
+async def websocket_application(scope, receive, send):
+    """
+    Streams the authenticated user's events until they disconnect.
+    Clients authenticate with ?token=<key> or a Token authorization header.
+    """
+    event = await receive()
+    if event['type'] != 'websocket.connect': return
+
+    user = await authenticate_websocket(scope)
+    if not user:
+        await send({"type": "websocket.close", "code": UNAUTHORIZED_CLOSE_CODE})
+        return
+
+    async with get_pubsub().subscribe(get_user_channel(user.id)) as subscription:
+        await send({"type": "websocket.accept"})
+        receiving = asyncio.ensure_future(receive())
+        publishing = asyncio.ensure_future(subscription.get())
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    {receiving, publishing},
+                    return_when=asyncio.FIRST_COMPLETED)
+                if receiving in done:
+                    # clients only listen, so anything but a disconnect is ignored
+                    if receiving.result()['type'] == 'websocket.disconnect': return
+                    receiving = asyncio.ensure_future(receive())
+                if publishing in done:
+                    await send({"type": "websocket.send", "text": publishing.result()})
+                    publishing = asyncio.ensure_future(subscription.get())
+        finally:
+            receiving.cancel()
+            publishing.cancel()
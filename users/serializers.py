@@ -3,7 +3,7 @@ import re
 from django.forms import ValidationError
 # from profanity_check import predict
 from rest_framework import serializers
-from mist.models import Badge, Post
+from mist.models import Badge
 
 from users.generics import get_current_time
 from .models import Ban, UserNotification, PhoneNumberAuthentication, PhoneNumberReset, User, EmailAuthentication
@@ -11,7 +11,6 @@ from phonenumber_field.serializerfields import PhoneNumberField
 
 class ReadOnlyUserSerializer(serializers.ModelSerializer):
     badges = serializers.SerializerMethodField()
-    collectibles = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -26,18 +25,11 @@ class ReadOnlyUserSerializer(serializers.ModelSerializer):
         except: badges = Badge.objects.filter(user_id=obj.id)
         return [badge.badge_type for badge in badges.all()]
 
-    def get_collectibles(self, obj):
-        try: obj.posts
-        except: obj.posts = Post.objects.filter(author_id=obj.id)
-        collectible_posts = obj.posts.filter(collectible_type__isnull=False)
-        return sorted([post.collectible_type for post in collectible_posts])
-
 class CompleteUserSerializer(serializers.ModelSerializer):
     EXPIRATION_TIME = timedelta(minutes=60).total_seconds()
     MEGABYTE_LIMIT = 10
 
     badges = serializers.SerializerMethodField()
-    collectibles = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -54,12 +46,6 @@ class CompleteUserSerializer(serializers.ModelSerializer):
             'phone_number': {'required': True},
         }
 
-    def get_collectibles(self, obj):
-        try: obj.posts
-        except: obj.posts = Post.objects.filter(author_id=obj.id)
-        collectible_posts = obj.posts.filter(collectible_type__isnull=False)
-        return sorted([post.collectible_type for post in collectible_posts])
-    
     def get_badges(self, obj):
         badges = []
         try: badges = obj.badges
@@ -48,3 +48,19 @@ def create_simple_uploaded_file_from_image_path(image_path, new_file_name):
 
     return SimpleUploadedFile(new_file_name, image_io.getvalue(), content_type='image/jpeg')
 
+
+def create_dummy_device(user):
+    from push_notifications.models import APNSDevice
+
+    device, _ = APNSDevice.objects.get_or_create(
+        user=user,
+        registration_id=f'randomRegistrationId{user.id}')
+    return device
+
+def dispatch_fake_notifications():
+    from mist_worker.tasks import dispatch_notifications
+    from users.push import FakeAPNSSender
+
+    number_of_sent_pushes = len(FakeAPNSSender.sent_pushes)
+    dispatch_notifications()
+    return FakeAPNSSender.sent_pushes[number_of_sent_pushes:]
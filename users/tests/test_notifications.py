@@ -1,26 +1,20 @@
-from unittest.mock import patch
 from django.test import TestCase
 from freezegun import freeze_time
 from users.generics import get_current_time
 from users.models import UserNotification, User
 from rest_framework import status
 from rest_framework.test import APIRequestFactory
-from mist.tests.generics import NotificationServiceMock
-from users.tests.generics import create_dummy_user_and_token_given_id
+from users.tests.generics import create_dummy_device, create_dummy_user_and_token_given_id, dispatch_fake_notifications
 from users.views.notifications import LastOpenedNotificationTime, OpenNotifications
 
 @freeze_time("2020-01-01")
-@patch('push_notifications.models.APNSDeviceQuerySet.send_message',
-    NotificationServiceMock.send_fake_notification)
 class NotificationsTest(TestCase):
     def setUp(self):
         self.user1, self.auth_token1 = create_dummy_user_and_token_given_id(1)
         self.user2, self.auth_token2 = create_dummy_user_and_token_given_id(2)
+        create_dummy_device(self.user1)
 
     def test_save_should_send_apns_notification_with_correct_badgecount(self):
-        NotificationServiceMock.sent_notifications = []
-        NotificationServiceMock.badges = 0
-
         UserNotification.objects.create(
             user=self.user1,
             type=UserNotification.NotificationTypes.MESSAGE,
@@ -28,28 +22,25 @@ class NotificationsTest(TestCase):
             message='this is a test',
         )
 
-        self.assertEqual(NotificationServiceMock.badges, 1)
+        pushes = dispatch_fake_notifications()
+        self.assertEqual(len(pushes), 1)
+        self.assertEqual(pushes[0].alert, 'this is a test')
+        self.assertEqual(pushes[0].badge, 1)
 
     def test_save_should_exclude_automated_notifications_in_badgecount(self):
-        NotificationServiceMock.sent_notifications = []
-        NotificationServiceMock.badges = 0
-
         UserNotification.objects.create(
             user=self.user1,
             type=UserNotification.NotificationTypes.PROMPTS,
         )
 
-        self.assertEqual(NotificationServiceMock.badges, 0)
+        self.assertEqual(dispatch_fake_notifications()[0].badge, 0)
     
 @freeze_time("2020-01-01")
-@patch('push_notifications.models.APNSDeviceQuerySet.send_message',
-    NotificationServiceMock.send_fake_notification)
 class OpenedNotificationsViewTest(TestCase):
     def setUp(self):
-        NotificationServiceMock.badges = 0
-
         self.user1, self.auth_token1 = create_dummy_user_and_token_given_id(1)
         self.user2, self.auth_token2 = create_dummy_user_and_token_given_id(2)
+        create_dummy_device(self.user1)
 
     def test_post_should_enable_badges_given_notification(self):
         self.user1.notification_badges_enabled = False
@@ -81,7 +72,7 @@ class OpenedNotificationsViewTest(TestCase):
             message='this is a test',
         )
 
-        self.assertEqual(NotificationServiceMock.badges, 2)
+        self.assertEqual(dispatch_fake_notifications()[-1].badge, 2)
 
         request = APIRequestFactory().post(
             'api/open-notification/',
@@ -94,7 +85,7 @@ class OpenedNotificationsViewTest(TestCase):
         response = OpenNotifications.as_view()(request)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(NotificationServiceMock.badges, 0)
+        self.assertEqual(dispatch_fake_notifications()[-1].badge, 0)
 
     def test_post_should_updage_badges_correctly_given_message_notification(self):
         UserNotification.objects.create(
@@ -116,7 +107,7 @@ class OpenedNotificationsViewTest(TestCase):
             message='this is a test',
         )
 
-        self.assertEqual(NotificationServiceMock.badges, 3)
+        self.assertEqual(dispatch_fake_notifications()[-1].badge, 3)
 
         request = APIRequestFactory().post(
             'api/open-notification/',
@@ -130,7 +121,7 @@ class OpenedNotificationsViewTest(TestCase):
         response = OpenNotifications.as_view()(request)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(NotificationServiceMock.badges, 2)
+        self.assertEqual(dispatch_fake_notifications()[-1].badge, 2)
 
     def test_post_should_not_update_badges_given_invalid_notification_type(self):
         UserNotification.objects.create(
@@ -156,7 +147,7 @@ class OpenedNotificationsViewTest(TestCase):
         response = OpenNotifications.as_view()(request)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertEqual(NotificationServiceMock.badges, 2)
+        self.assertEqual([push.badge for push in dispatch_fake_notifications()], [2])
 
     def test_post_should_not_update_badges_given_no_timestamp(self):
         UserNotification.objects.create(
@@ -181,11 +172,9 @@ class OpenedNotificationsViewTest(TestCase):
         response = OpenNotifications.as_view()(request)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertEqual(NotificationServiceMock.badges, 2)
+        self.assertEqual([push.badge for push in dispatch_fake_notifications()], [2])
 
 @freeze_time("2020-01-01")
-@patch('push_notifications.models.APNSDeviceQuerySet.send_message',
-    NotificationServiceMock.send_fake_notification)
 class LastOpenedNotificationViewTest(TestCase):
     def setUp(self):
         self.user1, self.auth_token1 = create_dummy_user_and_token_given_id(1)
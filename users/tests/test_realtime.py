@@ -0,0 +1,114 @@
+import asyncio
+import json
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import TestCase
+from mist.models import MatchRequest, Message
+from mist.serializers import MessageSerializer
+from users.models import UserNotification
+from users.realtime import UNAUTHORIZED_CLOSE_CODE, WEBSOCKET_PATH, RealtimeEventTypes, websocket_application
+
+from users.tests.generics import create_dummy_user_and_token_given_id
+
+class RealtimeTest(TestCase):
+    def setUp(self):
+        self.user1, self.auth_token1 = create_dummy_user_and_token_given_id(1)
+        self.user2, self.auth_token2 = create_dummy_user_and_token_given_id(2)
+        return
+
+    def connect_and_receive(self, token, write, number_of_events):
+        """
+        Connects as the token's user, writes once connected
+        and returns everything the websocket sent.
+        """
+        async def run():
+            received = asyncio.Queue()
+            sent = asyncio.Queue()
+            await received.put({"type": "websocket.connect"})
+            scope = {
+                "type": "websocket",
+                "path": WEBSOCKET_PATH,
+                "query_string": f"token={token}".encode(),
+                "headers": [],
+            }
+            connection = asyncio.ensure_future(websocket_application(scope, received.get, sent.put))
+
+            events = [await asyncio.wait_for(sent.get(), 5)]
+            if events[0]["type"] == "websocket.accept":
+                await sync_to_async(write)()
+                for _ in range(number_of_events):
+                    events.append(await asyncio.wait_for(sent.get(), 5))
+                await received.put({"type": "websocket.disconnect"})
+            await asyncio.wait_for(connection, 5)
+            return events
+        return async_to_sync(run)()
+
+    def test_connect_should_close_given_invalid_token(self):
+        events = self.connect_and_receive('INVALIDTOKEN', lambda: None, 0)
+
+        self.assertEqual(events, [{"type": "websocket.close", "code": UNAUTHORIZED_CLOSE_CODE}])
+        return
+
+    def test_message_should_be_pushed_to_receiver(self):
+        messages = []
+        def write():
+            with self.captureOnCommitCallbacks(execute=True):
+                messages.append(Message.objects.create(
+                    sender=self.user2,
+                    receiver=self.user1,
+                    body='TestMessageBody'))
+
+        events = self.connect_and_receive(self.auth_token1, write, 1)
+
+        self.assertEqual(events[0], {"type": "websocket.accept"})
+        self.assertEqual(json.loads(events[1]["text"]), {
+            "type": RealtimeEventTypes.MESSAGE,
+            "data": json.loads(json.dumps(MessageSerializer(messages[0]).data)),
+        })
+        return
+
+    def test_match_request_and_notification_should_be_pushed_to_requested_user(self):
+        def write():
+            with self.captureOnCommitCallbacks(execute=True):
+                MatchRequest.objects.create(
+                    match_requesting_user=self.user2,
+                    match_requested_user=self.user1)
+                UserNotification.objects.create(
+                    user=self.user1,
+                    type=UserNotification.NotificationTypes.MATCH,
+                    message='TestNotification')
+
+        events = self.connect_and_receive(self.auth_token1, write, 2)
+        pushed_events = [json.loads(event["text"]) for event in events[1:]]
+
+        self.assertEqual(
+            [event["type"] for event in pushed_events],
+            [RealtimeEventTypes.MATCH_REQUEST, RealtimeEventTypes.NOTIFICATION])
+        self.assertEqual(pushed_events[0]["data"]["match_requesting_user"], self.user2.id)
+        self.assertEqual(pushed_events[1]["data"]["message"], 'TestNotification')
+        return
+
+    def test_events_should_not_be_pushed_before_commit(self):
+        def write():
+            Message.objects.create(
+                sender=self.user2,
+                receiver=self.user1,
+                body='TestMessageBody')
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            events = self.connect_and_receive(self.auth_token1, write, 0)
+
+        self.assertEqual(events, [{"type": "websocket.accept"}])
+        self.assertEqual(len(callbacks), 1)
+        return
+
+    def test_notification_should_only_be_pushed_when_created(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            notification = UserNotification.objects.create(
+                user=self.user1,
+                type=UserNotification.NotificationTypes.MATCH,
+                message='TestNotification')
+            notification.has_been_seen = True
+            notification.save()
+
+        self.assertEqual(len(callbacks), 1)
+        return
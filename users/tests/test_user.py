@@ -12,8 +12,10 @@ from django.test.client import MULTIPART_CONTENT, encode_multipart, BOUNDARY
 from mist.models import Badge
 from users.models import User
 from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIRequestFactory
+from users.authentication import CachedTokenAuthentication, TokenCache
 from users.tests.generics import create_simple_uploaded_file_from_image_path
 
 from users.views.register import RegisterUserEmailView
@@ -1195,6 +1197,35 @@ class NearbyUsersViewTest(TestCase):
         self.assertCountEqual(response_users, serialized_users)
         return
 
+    def test_get_should_return_nearby_users_across_antimeridian(self):
+        self.user1.latitude = 0
+        self.user1.longitude = 179.9999
+        self.user1.save()
+
+        self.user2.latitude = 0
+        self.user2.longitude = -179.9999
+        self.user2.save()
+
+        self.user3.latitude = 0
+        self.user3.longitude = 179
+        self.user3.save()
+
+        serialized_users = [
+            ReadOnlyUserSerializer(self.user1).data,
+            ReadOnlyUserSerializer(self.user2).data,
+        ]
+
+        request = APIRequestFactory().get(
+            'api/nearby-users/',
+            HTTP_AUTHORIZATION=f"Token {self.auth_token1}"
+        )
+        response = NearbyUsersView.as_view()(request)
+        response_users = response.data
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(response_users, serialized_users)
+        return
+
 class UserPopulationViewTest(TestCase):
     def setUp(self):
         self.population_size = 10
@@ -1222,4 +1253,60 @@ class BanTest(TestCase):
         Ban.objects.create(phone_number=self.user1.phone_number)
         
         self.assertFalse(Token.objects.filter(user=self.user1))
-        self.assertTrue(User.objects.get(pk=self.user1.pk).is_banned)
\ No newline at end of file
+        self.assertTrue(User.objects.get(pk=self.user1.pk).is_banned)
+
+    def test_ban_will_reject_cached_auth_token(self):
+        self.addCleanup(cache.cache.clear)
+        request = APIRequestFactory().get(
+            'api/users/',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        response = UserView.as_view({'get':'retrieve'})(request, pk=self.user1.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        Ban.objects.create(phone_number=self.user1.phone_number)
+
+        request = APIRequestFactory().get(
+            'api/users/',
+            format='json',
+            HTTP_AUTHORIZATION=f'Token {self.auth_token1}',
+        )
+        response = UserView.as_view({'get':'retrieve'})(request, pk=self.user1.id)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class CachedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.cache.clear()
+        self.addCleanup(cache.cache.clear)
+        self.user1, self.auth_token1 = create_dummy_user_and_token_given_id(1)
+
+    def test_authenticate_should_skip_token_lookup_given_cached_token(self):
+        authentication = CachedTokenAuthentication()
+        user, _ = authentication.authenticate_credentials(self.auth_token1.key)
+
+        with self.assertNumQueries(1):
+            cached_user, token = authentication.authenticate_credentials(self.auth_token1.key)
+
+        self.assertEqual(user, cached_user)
+        self.assertEqual(token.key, self.auth_token1.key)
+
+    def test_authenticate_should_reject_cached_token_of_deleted_user(self):
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(self.auth_token1.key)
+        User.objects.filter(id=self.user1.id).delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate_credentials(self.auth_token1.key)
+
+    def test_token_cache_should_evict_least_recently_used_token(self):
+        tokens = TokenCache()
+        with patch('users.authentication.TOKEN_CACHE_SIZE', 2):
+            tokens.set('first', 1)
+            tokens.set('second', 2)
+            tokens.get('first')
+            tokens.set('third', 3)
+
+        self.assertEqual(tokens.get('first'), 1)
+        self.assertIsNone(tokens.get('second'))
+        self.assertEqual(tokens.get('third'), 3)
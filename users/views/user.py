@@ -3,10 +3,9 @@ from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from users.generics import get_user_from_request
+from users.generics import filter_nearby_coords, get_user_from_request
 from users.permissions import UserPermissions
 from django.db.models import Q
-from django.db.models.expressions import RawSQL
 
 from ..serializers import (
     MatchingPhoneNumberRequestSerializer,
@@ -133,27 +132,8 @@ class NearbyUsersView(generics.ListAPIView):
         Return objects sorted by distance to specified coordinates
         which distance is less than max_distance given in kilometers
         """
-        # Great circle distance formula
-        gcd_formula = "6371 * acos(least(greatest(\
-        cos(radians(%s)) * cos(radians(latitude)) \
-        * cos(radians(longitude) - radians(%s)) + \
-        sin(radians(%s)) * sin(radians(latitude)) \
-        , -1), 1))"
-        distance_raw_sql = RawSQL(
-            gcd_formula,
-            (latitude, longitude, latitude)
-        )
-        # make sure the latitude + longtitude exists
-        # make sure the distance is under the max
-        qs = User.objects.all()\
-        .filter(latitude__isnull=False)\
-        .filter(longitude__isnull=False)\
-        .annotate(distance=distance_raw_sql)\
-        .order_by('distance')\
-        .exclude(is_hidden=True)
-        # distance must be less than max distance
-        qs = qs.filter(distance__lt=max_distance)
-        return qs
+        return filter_nearby_coords(
+            User.objects.exclude(is_hidden=True), latitude, longitude, max_distance)
 
     def get_queryset(self):
         requesting_user = get_user_from_request(self.request)